@@ -0,0 +1,127 @@
+"""
+Программа: Бенчмарк ядра признаков - стоимость одной строки в батчевом пути
+(столбцы датасета) и в пути для записей (словари -> массивы),
+с проверкой побитового совпадения признаков обоих путей
+Запуск из каталога backend:
+python -m benchmarks.features_per_row --data ../data/check/test.csv
+Версия: 1.0
+"""
+
+import time
+import argparse
+import warnings
+import yaml
+import pandas as pd
+
+from src.data.get_data import get_dataset
+from src.transform.imputer import FillnaImputer
+from src.transform.transform import (
+    pipeline_preprocess, pipeline_preprocess_input, get_dtype_plan, cast_columns
+)
+
+warnings.filterwarnings('ignore')
+
+# поля запроса /predict_input
+INPUT_FIELDS = [
+    'ID', 'Date', 'LAT', 'LON', 'Precipitation', 'LST', 'AAI', 'CloudFraction',
+    'NO2_strat', 'NO2_total', 'NO2_trop', 'TropopausePressure',
+]
+
+
+def to_records(data: pd.DataFrame) -> list:
+    """
+    Строки исходного датасета в виде тел запросов: дата - date, пропуски - None
+    :param data: исходный датасет с приведенной датой
+    :return: список записей
+    """
+    data = data[INPUT_FIELDS].astype(object)
+    data['Date'] = [value.date() for value in data['Date']]
+    data = data.where(data.notna(), None)
+    return data.to_dict('records')
+
+
+def assert_identical(frame: pd.DataFrame, records_frame: pd.DataFrame) -> None:
+    """
+    Побитовое сравнение признаков двух путей
+    :param frame: признаки батчевого пути
+    :param records_frame: признаки пути для записей
+    :return: None
+    """
+    assert list(frame.columns) == list(records_frame.columns), 'Разный порядок признаков'
+    for col in frame.columns:
+        left, right = frame[col], records_frame[col]
+        if isinstance(left.dtype, pd.CategoricalDtype):
+            assert left.astype(str).tolist() == right.astype(str).tolist(), col
+            continue
+        assert left.dtype == right.dtype, f'{col}: {left.dtype} != {right.dtype}'
+        left, right = left.to_numpy(), right.to_numpy()
+        assert left.tobytes() == right.tobytes(), f'{col}: значения отличаются'
+
+
+def timeit(func, repeat: int) -> float:
+    """
+    Среднее время вызова
+    :param func: функция без аргументов
+    :param repeat: кол-во повторов
+    :return: секунды на вызов
+    """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    """
+    Проверка совпадения и замеры
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Стоимость строки в ядре признаков')
+    parser.add_argument('--data', default='../data/check/test.csv')
+    parser.add_argument('--config', default='../config/params.yml')
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    with open(args.config) as file:
+        preprocessing_config = yaml.load(file, Loader=yaml.FullLoader)['preprocessing']
+
+    data = get_dataset(
+        dataset_path=args.data, dtype=get_dtype_plan(preprocessing_config.get('dtype_plan')))
+    data = cast_columns(data, preprocessing_config['change_type_columns'])
+    data = data.dropna(subset=['Date']).reset_index(drop=True)
+
+    imputer = FillnaImputer(
+        list_median=preprocessing_config['list_median'],
+        list_mean=preprocessing_config['list_mean'])
+    frame = pipeline_preprocess(
+        data=data, flg_evaluate=False, imputer=imputer, flg_fit=True, **preprocessing_config)
+    column_sequence = frame.columns.tolist()
+    categories = {'ID': frame['ID'].cat.categories.tolist()}
+
+    def preprocess_records(batch: list) -> pd.DataFrame:
+        return pipeline_preprocess_input(
+            records=batch,
+            column_sequence=column_sequence,
+            imputer=imputer,
+            categories=categories,
+            **preprocessing_config)
+
+    records = to_records(data)
+    assert_identical(frame, preprocess_records(records))
+    print(f'признаки совпадают побитово: {len(records)} строк, {len(column_sequence)} признаков')
+
+    big = pd.concat([data] * (args.rows // len(data) + 1), ignore_index=True)[:args.rows]
+    batch_seconds = timeit(
+        lambda: pipeline_preprocess(
+            data=big, flg_evaluate=False, imputer=imputer, **preprocessing_config),
+        repeat=3)
+    print(f'батч {len(big)} строк: {1e6 * batch_seconds / len(big):.3f} мкс/строка')
+
+    for size in (1, 64):
+        batch = records[:size]
+        seconds = timeit(lambda: preprocess_records(batch), repeat=max(200 // size, 20))
+        print(f'записи по {size}: {1e6 * seconds / size:.1f} мкс/строка')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Программа: Бенчмарк памяти предобработки - пиковый RSS до (float64, копии на каждом шаге)
+и после (план типов, работа на месте) на train, размноженном в 10-100 раз
+Запуск из каталога backend:
+python -m benchmarks.memory_preprocess --scale 10 50 100
+Версия: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import warnings
+import yaml
+import pandas as pd
+
+from src.data.get_data import get_dataset
+from src.transform.imputer import FillnaImputer
+from src.transform.transform import pipeline_preprocess, get_dtype_plan
+
+warnings.filterwarnings('ignore')
+
+MODES = ('before', 'after')
+
+
+def peak_rss_mb() -> float:
+    """
+    Пиковый RSS текущего процесса (Linux: ru_maxrss в КБ)
+    :return: МБ
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def preprocess_before(data: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """
+    Предобработка в прежнем виде: float64/int64 и новый датасет на каждом шаге
+    :param data: датасет
+    :param kwargs: preprocessing конфигурация
+    :return: итоговый датасет
+    """
+    data = data.drop(kwargs['drop_columns'][0], axis=1, errors='ignore')
+    data = data.drop(kwargs['bins_columns'], axis=1, errors='ignore')
+    data = data.astype(kwargs['change_type_columns'])
+
+    data['month'] = data['Date'].dt.month
+    data['year'] = data['Date'].dt.year
+    data['NO2_ratio'] = data['NO2_trop'] / data['NO2_strat']
+    data['Sum_Concentration'] = data['NO2_strat'] + data['NO2_total'] + data['NO2_trop']
+    data['LST'] = data['LST'] - 273.15
+    data = data.drop(kwargs['drop_columns'][1:], axis=1)
+
+    imputer = FillnaImputer(
+        list_median=kwargs['list_median'],
+        list_mean=kwargs['list_mean'],
+        target_column=kwargs['target_column'])
+    values = imputer.fit(data).fill_values
+    data = data.fillna(value=values)
+    return data.astype({key: 'category' for key in data.select_dtypes(['object']).columns})
+
+
+def run_worker(mode: str, dataset_path: str, config_path: str) -> dict:
+    """
+    Один замер в отдельном процессе, чтобы пиковый RSS не смешивался между режимами
+    :param mode: before или after
+    :param dataset_path: путь до размноженного датасета
+    :param config_path: путь до конфигурационного файла
+    :return: результаты замера
+    """
+    with open(config_path) as file:
+        preprocessing_config = yaml.load(file, Loader=yaml.FullLoader)['preprocessing']
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+
+    if mode == 'before':
+        data = get_dataset(dataset_path=dataset_path)
+        data = preprocess_before(data, **preprocessing_config)
+    else:
+        data = get_dataset(
+            dataset_path=dataset_path,
+            dtype=get_dtype_plan(preprocessing_config.get('dtype_plan')))
+        imputer = FillnaImputer(
+            list_median=preprocessing_config['list_median'],
+            list_mean=preprocessing_config['list_mean'],
+            target_column=preprocessing_config['target_column'])
+        data = pipeline_preprocess(
+            data=data, flg_evaluate=False, imputer=imputer, flg_fit=True, **preprocessing_config)
+
+    return {
+        'mode': mode,
+        'rows': len(data),
+        'seconds': round(time.perf_counter() - started, 3),
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'result_mb': round(data.memory_usage(deep=True).sum() / 2 ** 20, 1),
+    }
+
+
+def scale_dataset(dataset_path: str, scale: int, output_dir: str) -> str:
+    """
+    Датасет, размноженный в scale раз (csv, как исходный train)
+    :param dataset_path: путь до исходного датасета
+    :param scale: во сколько раз размножить
+    :param output_dir: каталог для результата
+    :return: путь до размноженного датасета
+    """
+    data = get_dataset(dataset_path=dataset_path)
+    output_path = os.path.join(output_dir, f'train_x{scale}.csv')
+    pd.concat([data] * scale, ignore_index=True).to_csv(output_path, index=False)
+    return output_path
+
+
+def main() -> None:
+    """
+    Замеры для каждого масштаба и режима
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Пиковый RSS предобработки')
+    parser.add_argument('--data', default='../data/raw/train.csv')
+    parser.add_argument('--config', default='../config/params.yml')
+    parser.add_argument('--scale', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.data, args.config)))
+        return
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for scale in args.scale:
+            dataset_path = scale_dataset(args.data, scale, output_dir)
+            for mode in MODES:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.memory_preprocess',
+                     '--worker', mode, '--data', dataset_path, '--config', args.config],
+                    check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"x{scale:<4} {mode:<7} rows={result['rows']:<9} "
+                    f"peak={result['peak_rss_mb']:>8.1f} MB "
+                    f"(+{result['peak_rss_mb'] - result['baseline_rss_mb']:.1f}) "
+                    f"result={result['result_mb']:>7.1f} MB  {result['seconds']:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Программа: Бенчмарк задержки предсказания - LGBMRegressor.predict по DataFrame (joblib)
+против нативного бустера по float32 матрице на 1, 100 и 100k строк
+Запуск из каталога backend после обучения модели:
+python -m benchmarks.predict_latency --data ../data/check/test.csv
+Версия: 1.0
+"""
+
+import time
+import argparse
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.data.get_data import get_dataset
+from src.evaluate.native import NativePredictor
+from src.evaluate.registry import load_config
+from src.transform.imputer import FillnaImputer
+from src.transform.transform import pipeline_preprocess
+
+warnings.filterwarnings('ignore')
+
+
+def best_of(func, repeat: int) -> float:
+    """
+    Минимальное время вызова из repeat повторов
+    :param func: функция без аргументов
+    :param repeat: кол-во повторов
+    :return: секунды
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    """
+    Замеры для каждого размера батча
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Задержка predict: joblib против бустера')
+    parser.add_argument('--data', default='../data/check/test.csv')
+    parser.add_argument('--config', default='../config/params.yml')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 100000])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1])
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    preprocessing_config = config['preprocessing']
+    model = joblib.load(config['train']['model_path'])
+
+    features = pipeline_preprocess(
+        data=get_dataset(dataset_path=args.data),
+        imputer=FillnaImputer.load(preprocessing_config['imputer_path']),
+        **preprocessing_config)
+    features = pd.concat(
+        [features] * (max(args.sizes) // len(features) + 1), ignore_index=True)
+
+    for threads in args.threads:
+        predictor = NativePredictor(
+            booster_path=config['train']['booster_path'], num_threads=threads)
+        for size in args.sizes:
+            batch = features[:size]
+            repeat = 3 if size > 10000 else 50
+
+            diff = np.abs(model.predict(batch) - predictor.predict(batch)).max()
+            joblib_seconds = best_of(lambda: model.predict(batch), repeat)
+            native_seconds = best_of(lambda: predictor.predict(batch), repeat)
+            print(
+                f'rows={size:<7} threads={threads} '
+                f'joblib={1000 * joblib_seconds:9.3f} ms  '
+                f'native={1000 * native_seconds:9.3f} ms  '
+                f'x{joblib_seconds / native_seconds:5.1f}  max|diff|={diff:.2e}')
+
+
+if __name__ == '__main__':
+    main()
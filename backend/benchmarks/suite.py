@@ -0,0 +1,432 @@
+"""
+Программа: Воспроизводимый набор бенчмарков обучения и инференса на синтетических данных
+(10k, 1M, 10M строк): pipeline_preprocess, find_optimal_params с фиксированным бюджетом,
+train_model, /predict, /predict_batch и /predict_input через ASGI-клиент в том же процессе.
+Пропускная способность, p50/p99 задержки и пиковый RSS пишутся в JSON и сравниваются
+с baseline: при регрессии больше порога - код выхода 1
+Запуск из каталога backend:
+python -m benchmarks.suite --sizes 10000 --update-baseline
+python -m benchmarks.suite --sizes 10000 --threshold 0.25
+Версия: 1.0
+"""
+
+import os
+import sys
+import importlib
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import warnings
+from typing import Callable, Dict, List
+
+import numpy as np
+import optuna
+import yaml
+
+from benchmarks.synthetic import make_dataset
+from src.data.get_data import get_columns, get_dataset, save_dataset
+from src.data.split_dataset import split_train_test
+from src.pipeline.pipeline import export_model
+from src.train.train import data_fingerprint, find_optimal_params, get_study, train_model
+from src.transform.imputer import FillnaImputer
+from src.transform.schema import build_schema, save_schema
+from src.transform.transform import get_dtype_plan, pipeline_preprocess
+
+warnings.filterwarnings('ignore')
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+CASES = ('preprocess', 'find_optimal_params', 'train_model', 'predict', 'predict_batch',
+         'predict_input')
+# метрика -> True, если больше - лучше
+METRICS = {
+    'seconds': False,
+    'rows_per_s': True,
+    'requests_per_s': True,
+    'p50_ms': False,
+    'p99_ms': False,
+    'peak_rss_mb': False,
+}
+
+
+def peak_rss_mb() -> float:
+    """
+    Пиковый RSS текущего процесса (Linux: ru_maxrss в КБ)
+    :return: МБ
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def latency_stats(func: Callable, n_requests: int, n_warmup: int = 5) -> dict:
+    """
+    Задержка последовательных вызовов после прогрева
+    :param func: вызов, принимает номер вызова
+    :param n_requests: кол-во замеряемых вызовов
+    :param n_warmup: кол-во вызовов прогрева
+    :return: p50/p99 (мс) и кол-во вызовов в секунду
+    """
+    for idx in range(n_warmup):
+        func(idx)
+    timings = np.empty(n_requests)
+    for idx in range(n_requests):
+        started = time.perf_counter()
+        func(n_warmup + idx)
+        timings[idx] = time.perf_counter() - started
+    return {
+        'p50_ms': round(1000 * float(np.percentile(timings, 50)), 3),
+        'p99_ms': round(1000 * float(np.percentile(timings, 99)), 3),
+        'requests_per_s': round(n_requests / float(timings.sum()), 1),
+    }
+
+
+def make_config(config_path: str, workdir: str, n_trials: int, n_estimators_max: int) -> str:
+    """
+    Конфигурация бенчмарка: все артефакты - во временном каталоге,
+    подбор параметров с фиксированным бюджетом, кэш /predict_input выключен
+    :param config_path: путь до конфигурационного файла проекта
+    :param workdir: каталог бенчмарка
+    :param n_trials: кол-во trials optuna
+    :param n_estimators_max: максимальное кол-во деревьев
+    :return: путь до конфигурации бенчмарка
+    """
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+
+    def path(name: str) -> str:
+        return os.path.join(workdir, name)
+
+    config['preprocessing'].update(
+        train_path=path('train.parquet'),
+        new_data_path=path('new.csv'),
+        train_path_proc=path('train_proc.parquet'),
+        test_path_proc=path('test_proc.parquet'),
+        schema_path=path('schema.json'),
+        imputer_path=path('fill_values.json'),
+        unique_values_path=path('unique_values.json'),
+        flg_save_unique=False)
+    config['train'].update(
+        n_trials=n_trials,
+        n_estimators_max=n_estimators_max,
+        params_path=path('best_params.json'),
+        model_path=path('model_lgbm.joblib'),
+        booster_path=path('model_lgbm.txt'),
+        metrics_path=path('metrics.json'),
+        study_storage=f"sqlite:///{path('study.db')}",
+        jobs_path=path('jobs.db'),
+        flg_resume_study=False)
+    config['evaluate'].update(predict_path=path('predict.csv'))
+    config['evaluate']['cache']['max_entries'] = 0
+
+    output_path = path('params.yml')
+    with open(output_path, 'w') as file:
+        yaml.dump(config, file)
+    return output_path
+
+
+def prepare_data(config: dict, size: int) -> None:
+    """
+    Синтетический train (parquet) и файл для предсказания без целевой переменной (csv)
+    :param config: конфигурация бенчмарка
+    :param size: кол-во строк train
+    :return: None
+    """
+    data = make_dataset(n_rows=size)
+    save_dataset(data, config['preprocessing']['train_path'])
+    data.drop(config['preprocessing']['target_column'], axis=1).to_csv(
+        config['evaluate']['predict_path'], index=False)
+
+
+def run_preprocess(config: dict, workdir: str) -> dict:
+    """
+    Чтение train, разбиение и pipeline_preprocess (train с обучением imputer, test);
+    признаки сохраняются для замеров обучения
+    """
+    preprocessing_config = config['preprocessing']
+    skip_columns = [preprocessing_config['drop_columns'][0]] + preprocessing_config['bins_columns']
+    train_path = preprocessing_config['train_path']
+    data = get_dataset(
+        dataset_path=train_path,
+        columns=[col for col in get_columns(train_path) if col not in skip_columns],
+        dtype=get_dtype_plan(preprocessing_config.get('dtype_plan')))
+    df_train_raw, df_test = split_train_test(dataset=data, **preprocessing_config)
+    del data
+
+    imputer = FillnaImputer(
+        list_median=preprocessing_config['list_median'],
+        list_mean=preprocessing_config['list_mean'],
+        target_column=preprocessing_config['target_column'])
+    started = time.perf_counter()
+    df_train = pipeline_preprocess(
+        data=df_train_raw, flg_evaluate=False, imputer=imputer, flg_fit=True,
+        **preprocessing_config)
+    df_test = pipeline_preprocess(
+        data=df_test, flg_evaluate=False, imputer=imputer, **preprocessing_config)
+    seconds = time.perf_counter() - started
+
+    save_schema(
+        schema=build_schema(
+            data=df_train,
+            drop_columns=preprocessing_config['drop_columns'],
+            target_column=preprocessing_config['target_column'],
+            raw_data=df_train_raw),
+        schema_path=preprocessing_config['schema_path'])
+    imputer.save(imputer_path=preprocessing_config['imputer_path'])
+    save_dataset(df_train, os.path.join(workdir, 'features_train.parquet'))
+    save_dataset(df_test, os.path.join(workdir, 'features_test.parquet'))
+
+    n_rows = len(df_train) + len(df_test)
+    return {'rows': n_rows, 'seconds': seconds, 'rows_per_s': n_rows / seconds}
+
+
+def load_features(workdir: str) -> tuple:
+    """
+    Признаки train/test из замера preprocess
+    :param workdir: каталог бенчмарка
+    :return: train, test
+    """
+    return (get_dataset(dataset_path=os.path.join(workdir, 'features_train.parquet')),
+            get_dataset(dataset_path=os.path.join(workdir, 'features_test.parquet')))
+
+
+def run_find_optimal_params(config: dict, workdir: str) -> dict:
+    """
+    Подбор параметров с фиксированным бюджетом (n_trials, n_estimators_max)
+    """
+    df_train, df_test = load_features(workdir)
+    started = time.perf_counter()
+    find_optimal_params(data_train=df_train, data_test=df_test, **config['train'])
+    seconds = time.perf_counter() - started
+    return {'rows': len(df_train), 'seconds': seconds, 'rows_per_s': len(df_train) / seconds}
+
+
+def run_train_model(config: dict, workdir: str) -> dict:
+    """
+    Обучение на лучших параметрах study и сохранение модели для замеров предсказаний
+    """
+    train_config = config['train']
+    df_train, df_test = load_features(workdir)
+    # study замера find_optimal_params: название - с отпечатком train
+    study = get_study(
+        study_name=f'{train_config["study_name"]}_{data_fingerprint(df_train)}',
+        storage=train_config['study_storage'])
+    started = time.perf_counter()
+    lgbm = train_model(
+        data_train=df_train,
+        data_test=df_test,
+        study=study,
+        target=config['preprocessing']['target_column'],
+        metric_path=train_config['metrics_path'])
+    seconds = time.perf_counter() - started
+    export_model(
+        lgbm, model_path=train_config['model_path'], booster_path=train_config.get('booster_path'))
+    return {'rows': len(df_train), 'seconds': seconds, 'rows_per_s': len(df_train) / seconds}
+
+
+def serve(config_path: str, func: Callable) -> dict:
+    """
+    Запуск сервиса в том же процессе (ASGI TestClient, с startup/shutdown)
+    :param config_path: конфигурация бенчмарка
+    :param func: замер, принимает клиент
+    :return: результат замера
+    """
+    from fastapi.testclient import TestClient
+
+    # конфигурация задается до импорта: задачи обучения и EDA создаются при импорте main
+    os.environ['CONFIG_PATH'] = config_path
+    import main
+
+    if main.CONFIG_PATH != config_path:
+        main = importlib.reload(main)
+    with TestClient(main.app) as client:
+        return func(client)
+
+
+def run_predict(config: dict, config_path: str, n_requests: int) -> dict:
+    """
+    /predict: превью по первым строкам загруженного csv
+    """
+    with open(config['evaluate']['predict_path'], 'rb') as file:
+        # в запрос уходит начало файла: /predict все равно читает только превью
+        content = b''.join(file.readline() for _ in range(1001))
+
+    def request(client):
+        def call(_):
+            response = client.post('/predict', files={'file': ('predict.csv', content, 'text/csv')})
+            assert response.status_code == 200, response.text
+        return latency_stats(call, n_requests)
+
+    return serve(config_path, request)
+
+
+def run_predict_batch(config: dict, config_path: str) -> dict:
+    """
+    /predict_batch: потоковая разметка всего файла
+    """
+    predict_path = config['evaluate']['predict_path']
+
+    def request(client):
+        started = time.perf_counter()
+        with open(predict_path, 'rb') as file:
+            response = client.post(
+                '/predict_batch', files={'file': ('predict.csv', file, 'text/csv')})
+        assert response.status_code == 200, response.text
+        seconds = time.perf_counter() - started
+        n_rows = response.text.count('\n')
+        return {'rows': n_rows, 'seconds': seconds, 'rows_per_s': n_rows / seconds}
+
+    return serve(config_path, request)
+
+
+def run_predict_input(config: dict, config_path: str, n_requests: int) -> dict:
+    """
+    /predict_input: последовательные запросы по разным записям (кэш выключен)
+    """
+    records = get_dataset(
+        dataset_path=config['evaluate']['predict_path'], nrows=n_requests + 5)
+    records = records.drop(config['preprocessing']['drop_columns'][0], axis=1)
+    records = json.loads(records.to_json(orient='records'))
+    for record in records:
+        record['Date'] = record['Date'][:10]
+
+    def request(client):
+        def call(idx):
+            response = client.post('/predict_input', json=records[idx % len(records)])
+            assert response.status_code == 200, response.text
+        return latency_stats(call, n_requests)
+
+    return serve(config_path, request)
+
+
+def run_worker(case: str, config_path: str, n_requests: int) -> dict:
+    """
+    Один замер в отдельном процессе: пиковый RSS не смешивается между замерами
+    :param case: название замера
+    :param config_path: конфигурация бенчмарка
+    :param n_requests: кол-во запросов для замеров задержки
+    :return: результаты замера
+    """
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+    workdir = os.path.dirname(config_path)
+
+    if case == 'preprocess':
+        result = run_preprocess(config, workdir)
+    elif case == 'find_optimal_params':
+        result = run_find_optimal_params(config, workdir)
+    elif case == 'train_model':
+        result = run_train_model(config, workdir)
+    elif case == 'predict':
+        result = run_predict(config, config_path, n_requests)
+    elif case == 'predict_batch':
+        result = run_predict_batch(config, config_path)
+    else:
+        result = run_predict_input(config, config_path, n_requests)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return {key: round(value, 4) if isinstance(value, float) else value
+            for key, value in result.items()}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Регрессии относительно baseline
+    :param results: текущие результаты {замер@размер: метрики}
+    :param baseline: результаты baseline
+    :param threshold: допустимое относительное ухудшение (0.2 - 20%)
+    :return: описания регрессий
+    """
+    regressions = []
+    for key, metrics in results.items():
+        for metric, flg_higher_better in METRICS.items():
+            current, previous = metrics.get(metric), baseline.get(key, {}).get(metric)
+            if current is None or not previous:
+                continue
+            change = (previous - current) / previous if flg_higher_better \
+                else (current - previous) / previous
+            if change > threshold:
+                regressions.append(
+                    f'{key} {metric}: {previous} -> {current} (хуже на {100 * change:.1f}%)')
+    return regressions
+
+
+def main() -> None:
+    """
+    Замеры для каждого размера датасета, сравнение с baseline
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Бенчмарки обучения и инференса')
+    parser.add_argument('--config', default='../config/params.yml')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 1000000, 10000000])
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--n-trials', type=int, default=2)
+    parser.add_argument('--n-estimators-max', type=int, default=100)
+    parser.add_argument('--n-requests', type=int, default=200)
+    parser.add_argument('--baseline', default='benchmarks/baseline.json')
+    parser.add_argument('--output', default='benchmarks/results.json')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--worker', choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.config, args.n_requests)))
+        return
+
+    results: Dict[str, dict] = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            config_path = make_config(
+                args.config, workdir, args.n_trials, args.n_estimators_max)
+            with open(config_path) as file:
+                prepare_data(yaml.load(file, Loader=yaml.FullLoader), size)
+
+            # предсказаниям нужна модель, обучению - признаки: замеры идут по порядку,
+            # предшествующие шаги обучения выполняются, даже если не выбраны
+            required = {
+                CASES[idx] for case in args.cases for idx in range(min(CASES.index(case), 3))
+            }
+            for case in CASES:
+                if case not in args.cases and case not in required:
+                    continue
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.suite', '--worker', case,
+                     '--config', config_path, '--n-requests', str(args.n_requests)],
+                    check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                if case not in args.cases:
+                    continue
+                results[f'{case}@{size}'] = result
+                print(f'{case + "@" + str(size):<30} ' + '  '.join(
+                    f'{metric}={result[metric]}' for metric in METRICS if metric in result))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'n_trials': args.n_trials,
+        'n_estimators_max': args.n_estimators_max,
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f'baseline сохранен: {args.baseline}')
+        return
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f'РЕГРЕССИЯ {regression}')
+    if regressions:
+        sys.exit(1)
+    print(f'регрессий нет (порог {100 * args.threshold:.0f}%)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Программа: Синтетический датасет со схемой исходных данных (ID_Zindi, Date, ID, LAT, LON,
+спутниковые признаки, GT_NO2) произвольного размера для бенчмарков
+Версия: 1.0
+"""
+
+import numpy as np
+import pandas as pd
+
+# границы Ломбардии и Венето, где расположены станции
+LAT_RANGE = (44.8, 46.6)
+LON_RANGE = (8.5, 13.0)
+DATE_RANGE = ('2019-01-01', '2021-12-31')
+
+
+def make_dataset(n_rows: int, n_stations: int = 80, seed: int = 10) -> pd.DataFrame:
+    """
+    Наблюдения станций: признаки в диапазонах исходных данных, пропуски в
+    NO2_trop и спутниковых признаках, целевая переменная зависит от признаков
+    :param n_rows: кол-во строк
+    :param n_stations: кол-во станций
+    :param seed: seed генератора (датасет воспроизводим)
+    :return: датасет
+    """
+    rng = np.random.default_rng(seed)
+
+    station_lat = rng.uniform(*LAT_RANGE, n_stations)
+    station_lon = rng.uniform(*LON_RANGE, n_stations)
+    station_level = rng.gamma(4.0, 6.0, n_stations)
+    station = rng.integers(0, n_stations, n_rows)
+
+    days = pd.date_range(*DATE_RANGE, freq='D')
+    day = rng.integers(0, len(days), n_rows)
+    season = np.cos(2 * np.pi * days.dayofyear.to_numpy()[day] / 365.25)
+
+    no2_strat = rng.normal(4.5e-05, 1.0e-05, n_rows)
+    no2_trop = rng.gamma(2.0, 4.0e-05, n_rows)
+    lst = 285.0 - 12.0 * season + rng.normal(0.0, 4.0, n_rows)
+
+    data = pd.DataFrame({
+        'ID_Zindi': 'ID_' + pd.Series(np.arange(n_rows)).astype(str),
+        'Date': days[day],
+        'ID': pd.Categorical.from_codes(
+            station, categories=[f'X{idx:04d}' for idx in range(n_stations)]),
+        'LAT': station_lat[station],
+        'LON': station_lon[station],
+        'Precipitation': rng.exponential(1.5, n_rows) * (rng.random(n_rows) < 0.4),
+        'LST': lst,
+        'AAI': rng.normal(-1.2, 0.6, n_rows),
+        'CloudFraction': rng.beta(1.2, 3.0, n_rows),
+        'NO2_strat': no2_strat,
+        'NO2_total': no2_strat + no2_trop,
+        'NO2_trop': no2_trop,
+        'TropopausePressure': rng.normal(17000.0, 2500.0, n_rows),
+    })
+    data['GT_NO2'] = np.clip(
+        station_level[station]
+        + 10.0 * season
+        + 1.5e05 * no2_trop
+        - 0.2 * (lst - 285.0)
+        + rng.normal(0.0, 5.0, n_rows),
+        0.0, None)
+
+    # пропуски, как в исходных спутниковых данных
+    for col, share in (('NO2_trop', 0.4), ('LST', 0.3), ('AAI', 0.1),
+                       ('CloudFraction', 0.1), ('TropopausePressure', 0.1)):
+        data.loc[rng.random(n_rows) < share, col] = np.nan
+    return data
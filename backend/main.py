@@ -3,48 +3,151 @@
 Версия: 1.0
 """
 
+import os
 import warnings
+from datetime import date
+from enum import Enum
+from typing import Any, Optional
 import optuna
-import pandas
-import pandas as pd
-import yaml
 
-import uvicorn
+from fastapi import Body
 from fastapi import FastAPI
+from fastapi import HTTPException
 from fastapi import File
+from fastapi import Query
 from fastapi import UploadFile
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from src.transform.transform import check_columns_evaluate
-from src.pipeline.pipeline import pipeline_training
-from src.evaluate.evaluate import pipeline_evaluate
-from src.train.metrics import load_metrics
+from src.pipeline.jobs import TrainingJobManager
+from src.pipeline.job_store import JobStore, TrainingInProgress
+from src.evaluate.evaluate import pipeline_evaluate, pipeline_evaluate_chunks
+from src.evaluate.registry import get_registry
+from src.evaluate.batcher import MicroBatcher
+from src.evaluate.cache import PredictionCache
+from src.evaluate.validation import BulkValidationError, to_frame, validate_frame
+from src.eda.aggregates import EdaAggregates
+from src.monitoring.metrics import render, render_values
+from src.monitoring.middleware import MetricsMiddleware
+from src.monitoring.shared import get_shared_metrics
+from src.serving.supervisor import serve
 
 warnings.filterwarnings('ignore')
 optuna.logging.set_verbosity(optuna.logging.WARNING)
 
 app = FastAPI()
-CONFIG_PATH = '../config/params.yml'
+# ответы от 1 КБ сжимаются, если клиент принимает gzip (потоковые - по блокам)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(MetricsMiddleware)
+# переменная окружения CONFIG_PATH читается при импорте: по ней строятся реестр,
+# задачи обучения и агрегаты EDA (бенчмарки запускают сервис на своей конфигурации)
+CONFIG_PATH = os.environ.get('CONFIG_PATH', '../config/params.yml')
+
 
 class Specifications(BaseModel):
     """
     Схема (проверка типов, валидация)
-    Признаки для получения результатов модели
+    Исходные поля наблюдения: новые признаки (month, year, NO2_ratio,
+    Sum_Concentration) строятся на сервере тем же ядром, что и для файлов
     """
 
     ID: str
+    Date: date
     LAT: float
     LON: float
     Precipitation: float
-    LST: float
-    AAI: float
-    CloudFraction: float
-    NO2_strat: float
-    TropopausePressure: float
-    month: int
-    year: int
-    NO2_ratio: float
-    Sum_Concentration: float
+    # признаки, пропуски в которых заполняются статистиками train
+    LST: Optional[float] = None  # в Кельвинах, как в исходных данных
+    AAI: Optional[float] = None
+    CloudFraction: Optional[float] = None
+    NO2_strat: Optional[float] = None
+    NO2_total: Optional[float] = None
+    NO2_trop: Optional[float] = None
+    TropopausePressure: Optional[float] = None
+
+
+class TrainingMode(str, Enum):
+    """
+    Режим обучения: full - полный цикл, incremental - дообучение на новой выгрузке
+    """
+
+    full = 'full'
+    incremental = 'incremental'
+
+
+class OutputFormat(str, Enum):
+    """
+    Формат потокового ответа /predict_batch
+    """
+
+    ndjson = 'ndjson'
+    csv = 'csv'
+
+
+# типы и обязательность полей для векторной проверки пакетов (/predict_bulk)
+BULK_FIELDS = {
+    name: (field.type_, field.required) for name, field in Specifications.__fields__.items()
+}
+
+
+def predict_records(records: list) -> list:
+    """
+    Предсказание по списку введенных записей одним батчем
+    :param records: список словарей с исходными полями
+    :return: предсказания
+    """
+    return pipeline_evaluate(config_path=CONFIG_PATH, dataset=records, flg_input=True)
+
+
+batcher = MicroBatcher(predict_fn=predict_records)
+cache = PredictionCache()
+jobs = TrainingJobManager(config_path=CONFIG_PATH)
+eda = EdaAggregates(config_path=CONFIG_PATH)
+
+
+@app.on_event('startup')
+async def startup():
+    """
+    Загрузка модели и конфигурации в память при старте сервиса,
+    запуск микробатчера
+    """
+    config = get_registry(CONFIG_PATH).reload().config
+    jobs.n_trials = config['train']['n_trials']
+    jobs.nice = config['train']['job_nice']
+    jobs.heartbeat = config['train']['job_heartbeat']
+    jobs.store = JobStore(path=config['train']['jobs_path'], timeout=config['train']['job_timeout'])
+    batcher.max_rows = config['evaluate']['batching']['max_rows']
+    batcher.max_wait = config['evaluate']['batching']['max_wait_ms'] / 1000
+    cache.max_entries = config['evaluate']['cache']['max_entries']
+    cache.ttl_seconds = config['evaluate']['cache']['ttl_seconds']
+    await batcher.start()
+    shared = get_shared_metrics()
+    if shared is not None:
+        shared.start(stats_fn=worker_stats)
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    """
+    Остановка микробатчера; обучение, запущенное этим воркером, отменяется
+    (процесс обучения не переживает воркер)
+    """
+    await batcher.stop()
+    jobs.shutdown()
+    shared = get_shared_metrics()
+    if shared is not None:
+        shared.stop()
+
+
+def worker_stats() -> dict:
+    """
+    Статистика микробатчера и кэша этого воркера; перед снимком для общих метрик
+    читается время trials и фолдов обучения, запущенного этим воркером
+    :return: статистика
+    """
+    jobs.refresh()
+    return {**batcher.stats.to_dict(), 'cache': cache.to_dict()}
 
 
 @app.get('/hello')
@@ -56,67 +159,92 @@ def welcome():
     return {'message': 'Hello!'}
 
 
-@app.post('/train')
-def training():
+@app.post('/train', status_code=202)
+def training(mode: TrainingMode = TrainingMode.full):
     """
-    Обучение модели, логирование метрик
+    Запуск обучения модели в отдельном процессе (неизвестный режим - 422)
+    :param mode: full - полный цикл, incremental - дообучение на новой выгрузке
+    :return: идентификатор и статус задачи
     """
-    pipeline_training(config_path=CONFIG_PATH)
-    metrics = load_metrics(config_path=CONFIG_PATH)
-    return {'metrics': metrics}
+    try:
+        return jobs.submit(mode=mode.value)
+    except TrainingInProgress as exc:
+        raise HTTPException(
+            status_code=409, detail={'message': str(exc), 'job_id': exc.job_id}
+        )
+
+
+@app.get('/train/{job_id}')
+def training_status(job_id: str):
+    """
+    Статус задачи обучения: прогресс trials, лучшая MAE, итоговые метрики
+    """
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail='Задача не найдена')
+    return status
+
+
+@app.delete('/train/{job_id}')
+def training_cancel(job_id: str):
+    """
+    Отмена задачи обучения
+    """
+    status = jobs.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail='Задача не найдена')
+    return status
 
 
 @app.post('/predict')
 def prediction(file: UploadFile = File(...)):
     """
-    Предсказание модели по данным из файла
+    Предсказание модели по первым строкам файла (превью),
+    остальная часть файла не читается (и не распаковывается, если сжат gzip/zstd)
     """
-    result = pipeline_evaluate(config_path=CONFIG_PATH, data_path=file.file)
+    preview_rows = get_registry(CONFIG_PATH).get().config['evaluate']['preview_rows']
+    result = pipeline_evaluate(config_path=CONFIG_PATH, data_path=file.file, nrows=preview_rows)
     assert isinstance(result, list), 'Результат не соответствует типу list'
-    return {'prediction': result[:5]}
+    return {'prediction': result}
+
+
+@app.post('/predict_batch')
+def prediction_batch(
+    file: UploadFile = File(...),
+    output_format: OutputFormat = OutputFormat.ndjson,
+    chunksize: int = Query(None, gt=0),
+):
+    """
+    Потоковое предсказание модели по всему файлу блоками (ndjson или csv).
+    Следующий блок читается и размечается только после отправки предыдущего;
+    сжатый gzip/zstd csv распаковывается потоком по мере чтения блоков.
+    Неверный формат или размер блока - 422 до начала ответа
+    """
+    stream = pipeline_evaluate_chunks(
+        config_path=CONFIG_PATH,
+        data_path=file.file,
+        output_format=output_format.value,
+        chunksize=chunksize)
+    media_type = 'text/csv' if output_format is OutputFormat.csv else 'application/x-ndjson'
+    return StreamingResponse(stream, media_type=media_type)
 
 
 @app.post('/predict_input')
-def prediction_input(specifications: Specifications):
-    """
-    Предсказание модели по введенным данным
-    """
-    features = [
-        [
-            specifications.ID,
-            specifications.LAT,
-            specifications.LON,
-            specifications.Precipitation,
-            specifications.LST,
-            specifications.AAI,
-            specifications.CloudFraction,
-            specifications.NO2_strat,
-            specifications.TropopausePressure,
-            specifications.month,
-            specifications.year,
-            specifications.NO2_ratio,
-            specifications.Sum_Concentration,
-        ]
-    ]
-
-    cols = [
-        'ID',
-        'LAT',
-        'LON',
-        'Precipitation',
-        'LST',
-        'AAI',
-        'CloudFraction',
-        'NO2_strat',
-        'TropopausePressure',
-        'month',
-        'year',
-        'NO2_ratio',
-        'Sum_Concentration'
-    ]
-
-    data = pd.DataFrame(features, columns=cols)
-    predictions = pipeline_evaluate(config_path=CONFIG_PATH, dataset=data, flg_input=True)[0]
+async def prediction_input(specifications: Specifications):
+    """
+    Предсказание модели по введенным данным.
+    Повторные запросы отдаются из кэша (до переобучения модели),
+    одновременные запросы объединяются микробатчером в один predict
+    """
+    record = specifications.dict()
+    model_version = get_registry(CONFIG_PATH).get().model_version
+    cache.sync_version(model_version)
+    key = cache.make_key(record, model_version)
+
+    predictions = cache.get(key)
+    if predictions is None:
+        predictions = await batcher.submit(record)
+        cache.put(key, predictions)
 
     result = (
         {'High concentration'}
@@ -128,6 +256,119 @@ def prediction_input(specifications: Specifications):
     return result
 
 
+@app.post('/predict_bulk')
+def prediction_bulk(payload: Any = Body(...)):
+    """
+    Предсказание по пакету записей: столбцы ({"LAT": [...], ...}) или массив записей.
+    Поля те же, что у /predict_input; проверка - целыми столбцами, ошибки - по полям
+    с номерами строк. Ответ - массивы ID и предсказаний
+    """
+    max_rows = get_registry(CONFIG_PATH).get().config['evaluate']['bulk_max_rows']
+    try:
+        data = validate_frame(to_frame(payload, max_rows=max_rows), fields=BULK_FIELDS)
+    except BulkValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors)
+
+    predictions = pipeline_evaluate(config_path=CONFIG_PATH, dataset=data, source='bulk')
+    # готовый ответ: без поэлементного jsonable_encoder
+    return JSONResponse({'ID': data['ID'].tolist(), 'prediction': predictions})
+
+
+def eda_aggregates() -> dict:
+    """
+    Агрегаты графиков EDA актуальной версии датасета
+    :return: агрегаты
+    """
+    try:
+        return eda.get()
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+
+def eda_feature(chart: str, feature: str) -> dict:
+    """
+    Агрегаты графика по признаку
+    :param chart: kde или bin_means
+    :param feature: признак из preprocessing.bins_features
+    :return: агрегаты и версия датасета
+    """
+    aggregates = eda_aggregates()
+    if feature not in aggregates[chart]:
+        raise HTTPException(status_code=404, detail=f'Признак {feature} не бинаризуется')
+    return {**aggregates[chart][feature], 'version': aggregates['version']}
+
+
+@app.get('/eda/kde/{feature}')
+def eda_kde(feature: str):
+    """
+    Плотность целевой переменной по квартильным бинам признака (кривые на общей сетке)
+    """
+    return JSONResponse(eda_feature('kde', feature))
+
+
+@app.get('/eda/bin_means/{feature}')
+def eda_bin_means(feature: str):
+    """
+    Средние целевой переменной по квартильным бинам признака с доверительным интервалом
+    """
+    return JSONResponse(eda_feature('bin_means', feature))
+
+
+@app.get('/eda/timeseries')
+def eda_timeseries():
+    """
+    Средняя целевая переменная по датам с доверительным интервалом
+    """
+    aggregates = eda_aggregates()
+    return JSONResponse({**aggregates['timeseries'], 'version': aggregates['version']})
+
+
+@app.get('/predict_input/stats')
+def prediction_input_stats():
+    """
+    Статистика микробатчера (размеры батчей и время ожидания в очереди)
+    и кэша предсказаний (попадания, промахи, вытеснения) этого воркера;
+    при нескольких воркерах - также pid воркера и статистика всех воркеров
+    """
+    stats = worker_stats()
+    shared = get_shared_metrics()
+    if shared is None:
+        return stats
+    return {**stats, 'worker': os.getpid(), 'workers': shared.stats()}
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+def metrics():
+    """
+    Метрики сервиса в текстовом формате Prometheus: запросы и задержки по endpoint,
+    этапы конвейера, размеченные строки, версия модели, длительность обучения,
+    trials и фолдов, счетчики микробатчера и кэша.
+    При нескольких воркерах счетчики и гистограммы складываются по всем воркерам
+    (включая остановленные при выкатке), текущие значения - с меткой worker
+    """
+    shared = get_shared_metrics()
+    stats = {None: worker_stats()} if shared is None else shared.stats()
+    labelnames = ('name',) if shared is None else ('name', 'worker')
+
+    def labels(key: str, pid: Optional[int]) -> tuple:
+        return (key,) if pid is None else (key, pid)
+
+    extra = render_values(
+        'predict_input_batcher', 'Статистика микробатчера /predict_input', 'gauge',
+        {labels(key, pid): value for pid, worker in stats.items()
+         for key, value in worker.items() if isinstance(value, (int, float))},
+        labelnames=labelnames,
+    ) + render_values(
+        'predict_input_cache', 'Статистика кэша предсказаний /predict_input', 'gauge',
+        {labels(key, pid): value for pid, worker in stats.items()
+         for key, value in worker['cache'].items()
+         if isinstance(value, (int, float)) and not isinstance(value, bool)},
+        labelnames=labelnames,
+    )
+    text = render(extra=extra) if shared is None else shared.render(extra=extra)
+    return PlainTextResponse(text, media_type='text/plain; version=0.0.4')
+
+
 if __name__ == '__main__':
-    uvicorn.run(app, host='127.0.0.1', port=80)
+    serve(app, CONFIG_PATH)
 
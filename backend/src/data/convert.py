@@ -0,0 +1,83 @@
+"""
+Программа: Однократная конвертация csv в колоночный формат (parquet/feather)
+с сохранением типов признаков
+Запуск из каталога backend:
+python -m src.data.convert ../data/raw/train.csv ../data/raw/train.parquet
+Версия: 1.0
+"""
+
+import os
+import argparse
+import yaml
+import pandas as pd
+
+from .get_data import get_dataset, save_dataset
+from ..transform.transform import get_dtype_plan
+
+
+def convert_dataset(
+    dataset_path: str, output_path: str, change_type_columns: dict, dtype_plan: dict = None
+) -> pd.DataFrame:
+    """
+    Чтение csv, приведение типов и сохранение в колоночном формате:
+    дата и категории больше не разбираются из строк при каждом чтении
+    :param dataset_path: путь до csv
+    :param output_path: путь до результата (.parquet или .feather)
+    :param change_type_columns: словарь с признаками и типами данных
+    :param dtype_plan: план типов {тип: [признаки]} (float32 для спутниковых признаков)
+    :return: датасет
+    """
+    data = get_dataset(dataset_path=dataset_path, dtype=get_dtype_plan(dtype_plan))
+    data = data.astype(
+        {col: dtype for col, dtype in change_type_columns.items() if col in data},
+        errors='raise')
+    save_dataset(data, output_path)
+    return data
+
+
+def resolve_dataset_path(dataset_path: str, **kwargs) -> str:
+    """
+    Путь до датасета для чтения: если колоночного файла еще нет, а рядом лежит
+    исходный csv (развертывания до перехода на parquet), csv один раз
+    конвертируется в путь из конфигурации
+    :param dataset_path: путь до данных из конфигурации
+    :param kwargs: переменная (preprocessing конфигурация)
+    :return: путь до существующего файла
+    """
+    stem, extension = os.path.splitext(dataset_path)
+    if extension.lower() != '.csv' and not os.path.exists(dataset_path):
+        csv_path = f'{stem}.csv'
+        if os.path.exists(csv_path):
+            convert_dataset(
+                dataset_path=csv_path,
+                output_path=dataset_path,
+                change_type_columns=kwargs['change_type_columns'],
+                dtype_plan=kwargs.get('dtype_plan'))
+    return dataset_path
+
+
+def main() -> None:
+    """
+    Конвертация из командной строки
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='csv -> parquet/feather')
+    parser.add_argument('dataset_path', help='путь до csv')
+    parser.add_argument('output_path', nargs='?', help='по умолчанию - рядом, .parquet')
+    parser.add_argument('--config', default='../config/params.yml')
+    args = parser.parse_args()
+
+    with open(args.config) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+    output_path = args.output_path or f'{os.path.splitext(args.dataset_path)[0]}.parquet'
+
+    data = convert_dataset(
+        dataset_path=args.dataset_path,
+        output_path=output_path,
+        change_type_columns=config['preprocessing']['change_type_columns'],
+        dtype_plan=config['preprocessing'].get('dtype_plan'))
+    print(f'{args.dataset_path} -> {output_path}: {len(data)} строк')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,214 @@
 Версия: 1.0
 """
 
-from typing import Text
+import io
+import os
+import gzip
+import shutil
+import tempfile
+from typing import IO, Iterator, List, Optional, Text
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+# колоночные форматы хранят типы (datetime, category, float32) вместе с данными
+COLUMNAR_FORMATS = ('.parquet', '.feather')
+# сигнатуры сжатых загрузок: gzip - стандартная библиотека, zstd - кодек pyarrow
+COMPRESSION_SIGNATURES = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+# распакованный колоночный файл держится в памяти до этого размера, дальше - на диске
+SPOOL_MAX_SIZE = 64 * 2 ** 20
 
-def get_dataset(dataset_path: Text) -> pd.DataFrame:
+
+def get_format(dataset_path: Text) -> str:
+    """
+    Формат файла по расширению; у загруженного файла (file-like) - по сигнатуре
+    :param dataset_path: путь до данных или file-like объект
+    :return: parquet, feather или csv
+    """
+    if not isinstance(dataset_path, (str, os.PathLike)):
+        if hasattr(dataset_path, 'peek'):
+            # поток распаковки не перематывается: сигнатура читается из буфера
+            magic = dataset_path.peek(6)[:6]
+        else:
+            position = dataset_path.tell()
+            magic = dataset_path.read(6)
+            dataset_path.seek(position)
+        if magic[:4] == b'PAR1':
+            return 'parquet'
+        return 'feather' if magic == b'ARROW1' else 'csv'
+    extension = os.path.splitext(dataset_path)[1].lower()
+    return extension[1:] if extension in COLUMNAR_FORMATS else 'csv'
+
+
+def get_compression(file: IO) -> Optional[str]:
+    """
+    Сжатие загруженного файла по сигнатуре
+    :param file: file-like объект
+    :return: gzip, zstd или None
+    """
+    if hasattr(file, 'peek'):
+        # уже открытый поток распаковки не перематывается
+        magic = file.peek(4)[:4]
+    else:
+        position = file.tell()
+        magic = file.read(4)
+        file.seek(position)
+    for signature, codec in COMPRESSION_SIGNATURES.items():
+        if magic.startswith(signature):
+            return codec
+    return None
+
+
+def open_upload(file: IO) -> IO:
     """
-    Получение данных по заданному пути
+    Загруженный файл для чтения: сжатый (gzip/zstd) распаковывается потоком.
+    csv читается блоками прямо из потока распаковки, колоночным форматам нужен
+    произвольный доступ - они распаковываются во временный файл
+    :param file: file-like объект
+    :return: file-like объект с несжатыми данными
+    """
+    codec = get_compression(file)
+    if codec is None:
+        return file
+    if codec == 'gzip':
+        stream = gzip.GzipFile(fileobj=file, mode='rb')
+    else:
+        stream = io.BufferedReader(
+            pa.CompressedInputStream(pa.PythonFile(file, mode='r'), 'zstd'))
+    if get_format(stream) == 'csv':
+        return stream
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    shutil.copyfileobj(stream, spooled)
+    spooled.seek(0)
+    return spooled
+
+
+def _feather_tables(
+    reader: pa.ipc.RecordBatchFileReader, batch_size: int, columns: List[str] = None
+) -> Iterator[pa.Table]:
+    """
+    Блоки feather-файла по batch_size строк: record batch читается по одному
+    (get_batch), файл целиком в память не загружается
+    :param reader: feather-файл (pa.ipc.open_file)
+    :param batch_size: кол-во строк в блоке
+    :param columns: какие столбцы прочитать (None - все)
+    :return: итератор по блокам (последний может быть короче)
+    """
+    if batch_size <= 0:
+        return
+    pending, rows = [], 0
+    for idx in range(reader.num_record_batches):
+        batch = reader.get_batch(idx)
+        if columns is not None:
+            batch = batch.select(columns)
+        while batch.num_rows:
+            taken = batch.slice(0, batch_size - rows)
+            pending.append(taken)
+            rows += taken.num_rows
+            batch = batch.slice(taken.num_rows)
+            if rows == batch_size:
+                yield pa.Table.from_batches(pending)
+                pending, rows = [], 0
+    if rows:
+        yield pa.Table.from_batches(pending)
+
+
+def get_columns(dataset_path: Text) -> List[str]:
+    """
+    Список столбцов без чтения данных
+    :param dataset_path: путь до данных
+    :return: названия столбцов
+    """
+    data_format = get_format(dataset_path)
+    if data_format == 'parquet':
+        return pq.ParquetFile(dataset_path).schema_arrow.names
+    if data_format == 'feather':
+        return pa.ipc.open_file(dataset_path).schema.names
+    return pd.read_csv(dataset_path, nrows=0).columns.tolist()
+
+
+def get_dataset(
+    dataset_path: Text, nrows: int = None, columns: List[str] = None, dtype: dict = None
+) -> pd.DataFrame:
+    """
+    Получение данных по заданному пути (csv, parquet, feather)
     :param dataset_path: путь до данных
+    :param nrows: сколько первых строк прочитать (None - весь файл)
+    :param columns: какие столбцы прочитать (None - все)
+    :param dtype: типы столбцов при разборе csv (колоночные форматы хранят свои)
     :return: датасет
     """
-    return pd.read_csv(dataset_path)
+    if not isinstance(dataset_path, (str, os.PathLike)):
+        dataset_path = open_upload(dataset_path)
+    data_format = get_format(dataset_path)
+    if data_format == 'parquet':
+        if nrows is None:
+            return pd.read_parquet(dataset_path, columns=columns)
+        # читаются только первые row group, а не весь файл
+        batches, rows = [], 0
+        for batch in pq.ParquetFile(dataset_path).iter_batches(
+                batch_size=nrows, columns=columns):
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= nrows:
+                break
+        if not batches:
+            return pd.read_parquet(dataset_path, columns=columns)
+        return pa.Table.from_batches(batches).slice(0, nrows).to_pandas()
+    if data_format == 'feather':
+        if nrows is None:
+            return pd.read_feather(dataset_path, columns=columns)
+        # читаются только первые record batch, а не весь файл
+        reader = pa.ipc.open_file(dataset_path)
+        table = next(_feather_tables(reader, batch_size=nrows, columns=columns), None)
+        if table is None:
+            table = reader.schema.empty_table()
+            table = table if columns is None else table.select(columns)
+        return table.to_pandas()
+    return pd.read_csv(dataset_path, nrows=nrows, usecols=columns, dtype=dtype)
+
+
+def get_dataset_chunks(
+    dataset_path: Text, chunksize: int, columns: List[str] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Построчное чтение данных блоками фиксированного размера
+    :param dataset_path: путь до данных
+    :param chunksize: кол-во строк в блоке
+    :param columns: какие столбцы прочитать (None - все)
+    :return: итератор по блокам датасета
+    """
+    if not isinstance(dataset_path, (str, os.PathLike)):
+        dataset_path = open_upload(dataset_path)
+    data_format = get_format(dataset_path)
+    if data_format == 'parquet':
+        for batch in pq.ParquetFile(dataset_path).iter_batches(
+                batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    if data_format == 'feather':
+        for table in _feather_tables(
+                pa.ipc.open_file(dataset_path), batch_size=chunksize, columns=columns):
+            yield table.to_pandas()
+        return
+    with pd.read_csv(dataset_path, chunksize=chunksize, usecols=columns) as reader:
+        yield from reader
+
+
+def save_dataset(dataset: pd.DataFrame, dataset_path: Text) -> None:
+    """
+    Сохранение датасета в формате по расширению файла (через временный файл)
+    :param dataset: датасет
+    :param dataset_path: путь до данных
+    :return: None
+    """
+    data_format = get_format(dataset_path)
+    tmp_path = f'{dataset_path}.tmp'
+    if data_format == 'parquet':
+        dataset.to_parquet(tmp_path, index=False)
+    elif data_format == 'feather':
+        dataset.reset_index(drop=True).to_feather(tmp_path)
+    else:
+        dataset.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, dataset_path)
@@ -3,10 +3,13 @@
 Версия: 1.0
 """
 
+import os
 from typing import Tuple
 import pandas as pd
 from sklearn.model_selection import train_test_split
 
+from .get_data import get_dataset, get_columns, get_format, save_dataset
+
 
 def split_train_test(dataset: pd.DataFrame, **kwargs):
     """
@@ -22,12 +25,42 @@ def split_train_test(dataset: pd.DataFrame, **kwargs):
         test_size=kwargs['test_size'],
         random_state=kwargs['random_state']
     )
-    # сохранение
-    df_train.to_csv(kwargs['train_path_proc'], index=False)
-    df_test.to_csv(kwargs['test_path_proc'], index=False)
+    # сохранение (формат - по расширению пути)
+    save_dataset(df_train, kwargs['train_path_proc'])
+    save_dataset(df_test, kwargs['test_path_proc'])
     return df_train, df_test
 
 
+def append_dataset(dataset: pd.DataFrame, dataset_path: str) -> None:
+    """
+    Дозапись строк в конец сохраненного датасета (порядок столбцов - как в файле).
+    Колоночные форматы не поддерживают дозапись: файл переписывается целиком
+    :param dataset: новые строки
+    :param dataset_path: путь до датасета
+    :return: None
+    """
+    if not os.path.exists(dataset_path):
+        save_dataset(dataset, dataset_path)
+        return
+
+    columns = get_columns(dataset_path)
+    if get_format(dataset_path) == 'csv':
+        dataset.reindex(columns=columns).to_csv(
+            dataset_path, mode='a', header=False, index=False)
+        return
+
+    data = get_dataset(dataset_path)
+    new_data = dataset.reindex(columns=columns)
+    dtypes = data.dtypes.to_dict()
+    for col, dtype in dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            # новые станции добавляются в категории, а не превращаются в NaN
+            dtypes[col] = pd.CategoricalDtype(
+                dtype.categories.union(new_data[col].dropna().astype(str).unique()))
+    data, new_data = data.astype(dtypes), new_data.astype(dtypes)
+    save_dataset(pd.concat([data, new_data], ignore_index=True), dataset_path)
+
+
 def get_train_test_data(
     data_train: pd.DataFrame, data_test: pd.DataFrame, target: str
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
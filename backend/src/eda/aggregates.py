@@ -0,0 +1,207 @@
+"""
+Программа: Агрегаты для графиков разведочного анализа (KDE по бинам признака,
+средние по бинам с доверительным интервалом, динамика целевой переменной по датам).
+Считаются один раз на версию датасета, фронтенд рисует по готовым массивам
+Версия: 1.0
+"""
+
+import threading
+from statistics import NormalDist
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from ..data.get_data import get_dataset
+from ..data.convert import resolve_dataset_path
+from ..evaluate.registry import file_version, get_registry
+from ..monitoring.metrics import stage_timer
+
+BIN_QUANTILES = [0, 0.25, 0.5, 0.75, 1]
+BIN_LABELS = ['low', 'middle', 'middle+', 'high']
+# гистограмма, по которой считается KDE: ее шаг много меньше ширины ядра
+KDE_HIST_SIZE = 2048
+# хвосты кривой за пределами данных - в ширинах ядра (как cut у seaborn)
+KDE_CUT = 3
+
+
+def get_bins(values: pd.Series, edges: np.ndarray) -> pd.Series:
+    """
+    Разделение признака по квартилям, минимум - в первом бине
+    :param values: значения признака
+    :param edges: границы квартилей
+    :return: бины (категориальный столбец)
+    """
+    return pd.cut(values, bins=edges, labels=BIN_LABELS, include_lowest=True)
+
+
+def _z_value(ci: float) -> float:
+    """
+    Квантиль нормального распределения для двустороннего интервала
+    :param ci: уровень доверия (0.95)
+    :return: z
+    """
+    return NormalDist().inv_cdf(0.5 + ci / 2)
+
+
+def group_means(target: pd.Series, groups: pd.Series, ci: float) -> pd.DataFrame:
+    """
+    Средние по группам с нормальным доверительным интервалом (mean ± z * sem)
+    :param target: целевая переменная
+    :param groups: группы (бины или даты)
+    :param ci: уровень доверия
+    :return: mean, ci_low, ci_high, n по группам
+    """
+    stats = target.groupby(groups, observed=True).agg(['mean', 'std', 'count'])
+    half_width = _z_value(ci) * stats['std'].fillna(0) / np.sqrt(stats['count'])
+    return pd.DataFrame({
+        'mean': stats['mean'],
+        'ci_low': stats['mean'] - half_width,
+        'ci_high': stats['mean'] + half_width,
+        'n': stats['count'],
+    })
+
+
+def kde_curves(target: pd.Series, bins: pd.Series, grid_size: int) -> dict:
+    """
+    Плотность целевой переменной по бинам признака на общей сетке.
+    Ядро гауссово, ширина - по правилу Скотта для каждого бина; площадь кривой
+    бина равна его доле наблюдений (как common_norm у seaborn). Плотность
+    считается по гистограмме: O(строк + сетка * KDE_HIST_SIZE) вместо O(строк * сетка)
+    :param target: целевая переменная
+    :param bins: бины признака
+    :param grid_size: кол-во точек сетки
+    :return: сетка и плотности по бинам
+    """
+    flg_valid = target.notna() & bins.notna()
+    values = target[flg_valid].to_numpy(dtype=np.float64)
+    codes = bins[flg_valid].cat.codes.to_numpy()
+    labels = list(bins.cat.categories)
+
+    bandwidths = {}
+    for code in range(len(labels)):
+        group = values[codes == code]
+        if len(group) > 1 and group.std(ddof=1) > 0:
+            bandwidths[code] = group.std(ddof=1) * len(group) ** (-1 / 5)
+    if not bandwidths:
+        return {'x': [], 'density': {}}
+
+    max_bandwidth = max(bandwidths.values())
+    low = values.min() - KDE_CUT * max_bandwidth
+    high = values.max() + KDE_CUT * max_bandwidth
+    grid = np.linspace(low, high, grid_size)
+    hist_edges = np.linspace(low, high, KDE_HIST_SIZE + 1)
+    centers = (hist_edges[:-1] + hist_edges[1:]) / 2
+
+    density = {}
+    for code, label in enumerate(labels):
+        if code not in bandwidths:
+            continue
+        counts, _ = np.histogram(values[codes == code], bins=hist_edges)
+        bandwidth = bandwidths[code]
+        kernel = np.exp(-0.5 * ((grid[:, None] - centers[None, :]) / bandwidth) ** 2)
+        curve = kernel @ counts / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+        density[label] = curve.round(8).tolist()
+    return {'x': grid.tolist(), 'density': density}
+
+
+def build_aggregates(
+    data: pd.DataFrame,
+    features: List[str],
+    names: List[str],
+    target: str,
+    date_column: str,
+    grid_size: int,
+    ci: float,
+) -> dict:
+    """
+    Все агрегаты графиков за одно чтение датасета:
+    квартили признаков считаются одним вызовом quantile
+    :param data: датасет
+    :param features: признаки, делимые по квартилям
+    :param names: названия бинаризованных признаков (подписи осей)
+    :param target: целевая переменная
+    :param date_column: столбец даты
+    :param grid_size: кол-во точек сетки KDE
+    :param ci: уровень доверия средних
+    :return: {'kde': {признак: ...}, 'bin_means': {признак: ...}, 'timeseries': ...}
+    """
+    edges = data[features].quantile(BIN_QUANTILES)
+    kde, means = {}, {}
+    for feature, name in zip(features, names):
+        bins = get_bins(data[feature], edges[feature].to_numpy())
+        kde[feature] = {
+            'name': name,
+            'target': target,
+            'edges': edges[feature].tolist(),
+            **kde_curves(data[target], bins, grid_size),
+        }
+        stats = group_means(data[target], bins, ci)
+        means[feature] = {
+            'name': name,
+            'target': target,
+            'bins': stats.index.astype(str).tolist(),
+            **{column: stats[column].tolist() for column in stats.columns},
+        }
+
+    dates = pd.to_datetime(data[date_column])
+    stats = group_means(data[target], dates, ci).sort_index()
+    timeseries = {
+        'name': date_column,
+        'target': target,
+        date_column: stats.index.strftime('%Y-%m-%d').tolist(),
+        **{column: stats[column].tolist() for column in stats.columns},
+    }
+    return {'kde': kde, 'bin_means': means, 'timeseries': timeseries}
+
+
+class EdaAggregates:
+    """
+    Агрегаты графиков EDA по датасету train из конфигурации.
+    Пересчитываются только при изменении файла датасета (mtime, размер),
+    одновременные запросы ждут один расчет
+    """
+
+    def __init__(self, config_path: str):
+        """
+        :param config_path: путь до конфигурационного файла
+        """
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple] = None
+        self._aggregates: Optional[dict] = None
+
+    def get(self) -> dict:
+        """
+        Агрегаты актуальной версии датасета
+        :return: агрегаты и версия датасета
+        """
+        config = get_registry(self.config_path).get().config
+        dataset_path = resolve_dataset_path(
+            config['preprocessing']['train_path'], **config['preprocessing'])
+        version = file_version(dataset_path)
+        if version is None:
+            raise FileNotFoundError(f'Нет датасета {dataset_path}')
+        if version == self._version:
+            return self._aggregates
+
+        with self._lock:
+            if version != self._version:
+                eda_config = config['eda']
+                features = config['preprocessing']['bins_features']
+                target = config['preprocessing']['target_column']
+                with stage_timer('read_data'):
+                    data = get_dataset(
+                        dataset_path,
+                        columns=[eda_config['date_column'], *features, target])
+                with stage_timer('eda_aggregates'):
+                    aggregates = build_aggregates(
+                        data,
+                        features=features,
+                        names=config['preprocessing']['bins_columns'],
+                        target=target,
+                        date_column=eda_config['date_column'],
+                        grid_size=eda_config['kde_grid_size'],
+                        ci=eda_config['ci'])
+                self._aggregates = {**aggregates, 'version': str(version[0])}
+                self._version = version
+            return self._aggregates
@@ -0,0 +1,170 @@
+"""
+Программа: Микробатчинг одиночных запросов на предсказание
+Версия: 1.0
+"""
+
+import time
+import asyncio
+import threading
+from typing import Callable, List
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class BatchStats:
+    """
+    Счетчики микробатчера: размер батчей и время ожидания в очереди
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.batch_size_max = 0
+        self.batch_size_buckets = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.wait_seconds_sum = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe(self, batch_size: int, waits: List[float], flg_error: bool = False) -> None:
+        """
+        Учет одного обработанного батча
+        :param batch_size: кол-во строк в батче
+        :param waits: время ожидания каждой строки в очереди (сек)
+        :param flg_error: батч завершился ошибкой
+        :return: None
+        """
+        with self._lock:
+            self.batches += 1
+            self.rows += batch_size
+            self.errors += int(flg_error)
+            self.batch_size_max = max(self.batch_size_max, batch_size)
+            for bucket in BATCH_SIZE_BUCKETS:
+                if batch_size <= bucket:
+                    self.batch_size_buckets[bucket] += 1
+                    break
+            self.wait_seconds_sum += sum(waits)
+            self.wait_seconds_max = max(self.wait_seconds_max, max(waits))
+
+    def to_dict(self) -> dict:
+        """
+        Снимок счетчиков
+        :return: словарь со счетчиками
+        """
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'errors': self.errors,
+                'batch_size_mean': self.rows / self.batches if self.batches else 0.0,
+                'batch_size_max': self.batch_size_max,
+                'batch_size_buckets': {
+                    f'le_{bucket}': count for bucket, count in self.batch_size_buckets.items()
+                },
+                'wait_ms_mean': 1000 * self.wait_seconds_sum / self.rows if self.rows else 0.0,
+                'wait_ms_max': 1000 * self.wait_seconds_max,
+            }
+
+
+class MicroBatcher:
+    """
+    Собирает одновременные одиночные запросы в батч (не больше max_rows строк
+    и не дольше max_wait_ms), делает один векторизованный predict
+    и раздает результаты ожидающим запросам
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[dict]], list],
+        max_rows: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        """
+        :param predict_fn: функция предсказания по списку записей
+        :param max_rows: максимальный размер батча
+        :param max_wait_ms: максимальное время сбора батча (мс)
+        """
+        self.predict_fn = predict_fn
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.stats = BatchStats()
+        self._queue = None
+        self._task = None
+
+    async def start(self) -> None:
+        """
+        Запуск фонового цикла сбора батчей в текущем event loop
+        :return: None
+        """
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Остановка фонового цикла
+        :return: None
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, record: dict):
+        """
+        Постановка записи в очередь и ожидание ее предсказания
+        :param record: признаки одного объекта
+        :return: предсказание
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> list:
+        """
+        Сбор батча: первая запись ждется без ограничения,
+        остальные - до max_rows или до истечения max_wait
+        :return: список (запись, future, время постановки в очередь)
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_rows:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """
+        Фоновый цикл: сбор батча -> predict в пуле потоков -> раздача результатов.
+        Пока идет predict, новые запросы копятся в очереди и образуют следующий батч
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            records = [record for record, _, _ in batch]
+
+            try:
+                predictions = await loop.run_in_executor(None, self.predict_fn, records)
+            except Exception as exc:  # ошибка батча отдается каждому запросу
+                self.stats.observe(len(batch), waits, flg_error=True)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.stats.observe(len(batch), waits)
+            for (_, future, _), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
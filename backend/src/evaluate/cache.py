@@ -0,0 +1,121 @@
+"""
+Программа: LRU/TTL кэш предсказаний по каноническому хэшу признаков и версии модели
+Версия: 1.0
+"""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class PredictionCache:
+    """
+    Кэш перед инференсом: ключ - хэш проверенной записи и версия модели.
+    Размер ограничен max_entries (вытесняется давно неиспользованная запись),
+    запись живет не дольше ttl_seconds; при смене версии модели кэш очищается
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 600.0):
+        """
+        :param max_entries: максимальное кол-во записей (0 - кэш выключен)
+        :param ttl_seconds: время жизни записи (сек)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(record: dict, model_version: Optional[str]) -> str:
+        """
+        Канонический ключ: порядок полей и представление значений не зависят от запроса
+        :param record: проверенная запись (после pydantic)
+        :param model_version: версия модели
+        :return: хэш
+        """
+        payload = json.dumps(
+            [model_version, record], sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def sync_version(self, model_version: Optional[str]) -> None:
+        """
+        Очистка кэша, если модель переобучена
+        :param model_version: текущая версия модели
+        :return: None
+        """
+        if model_version == self._model_version:
+            return
+        with self._lock:
+            if model_version != self._model_version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._model_version = model_version
+
+    def get(self, key: str) -> Any:
+        """
+        Значение по ключу
+        :param key: ключ
+        :return: значение или None (нет или истекло)
+        """
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Сохранение значения
+        :param key: ключ
+        :param value: значение
+        :return: None
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def to_dict(self) -> dict:
+        """
+        Снимок счетчиков
+        :return: словарь со счетчиками
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'model_version': self._model_version,
+            }
@@ -3,40 +3,145 @@
 Версия: 1.0
 """
 
-import os
-import yaml
-import joblib
+from typing import Iterator, Union
 import pandas as pd
-from ..data.get_data import get_dataset
+from ..data.get_data import get_dataset, get_dataset_chunks
 from ..transform.transform import pipeline_preprocess, pipeline_preprocess_input
+from .registry import ModelBundle, get_registry
+from ..monitoring.metrics import ROWS_SCORED, stage_timer
+
+# форматы потокового ответа pipeline_evaluate_chunks
+OUTPUT_FORMATS = ('ndjson', 'csv')
+
+
+def predict_bundle(
+    bundle: ModelBundle,
+    dataset: Union[pd.DataFrame, list],
+    flg_input: bool = False,
+    source: str = None,
+) -> list:
+    """
+    Предобработка и предсказание на заданном снимке модели
+    :param bundle: снимок модели и артефактов из реестра
+    :param dataset: датасет (для вводимых данных - также список записей)
+    :param flg_input: флаг для вводимых данных
+    :param source: источник строк для метрик (None - input/file по flg_input)
+    :return: предсказания
+    """
+    preprocessing_config = bundle.config['preprocessing']
+
+    with stage_timer('preprocess'):
+        if flg_input:
+            records = dataset if isinstance(dataset, list) else dataset.to_dict('records')
+            dataset = pipeline_preprocess_input(
+                records=records,
+                column_sequence=bundle.column_sequence,
+                imputer=bundle.imputer,
+                categories=None if bundle.schema is None else bundle.schema['categories'],
+                flg_frame=bundle.predictor is None,
+                **preprocessing_config)
+        else:
+            dataset = pipeline_preprocess(
+                data=dataset,
+                column_sequence=bundle.column_sequence,
+                imputer=bundle.imputer,
+                **preprocessing_config)
+
+    with stage_timer('predict'):
+        if bundle.predictor is not None:
+            predictions = bundle.predictor.predict(dataset).tolist()
+        else:
+            predictions = bundle.model.predict(dataset).tolist()
+
+    ROWS_SCORED.inc(len(predictions), (source or ('input' if flg_input else 'file'),))
+    return predictions
 
 
 def pipeline_evaluate(
-    config_path, dataset: pd.DataFrame = None,  data_path: str = None, flg_input: bool = False
+    config_path,
+    dataset: Union[pd.DataFrame, list] = None,
+    data_path: str = None,
+    flg_input: bool = False,
+    nrows: int = None,
+    source: str = None,
 ) -> list:
     """
-    Предобработка входных данных и получение предсказаний
+    Предобработка входных данных и получение предсказаний.
+    Конфигурация и модель берутся из реестра процесса, а не читаются с диска
     :param config_path: путь до конфигурационного файла
-    :param dataset: датасет
+    :param dataset: датасет (для вводимых данных - также список записей)
     :param data_path: путь до файла с данными
     :param flg_input: флаг для вводимых данных
+    :param nrows: сколько первых строк файла прочитать (None - весь файл)
+    :param source: источник строк для метрик (None - input/file по flg_input)
     :return: предсказания
     """
-    with open(config_path) as file:
-        config = yaml.load(file, Loader=yaml.FullLoader)
-
-    preprocessing_config = config['preprocessing']
-    train_config = config['train']
+    bundle = get_registry(config_path).get()
+    assert bundle.model is not None, 'Модель не обучена'
 
     if data_path:
-        dataset = get_dataset(dataset_path=data_path)
+        with stage_timer('read_data'):
+            dataset = get_dataset(dataset_path=data_path, nrows=nrows)
+
+    return predict_bundle(bundle=bundle, dataset=dataset, flg_input=flg_input, source=source)
 
-    if flg_input:
-        dataset = pipeline_preprocess_input(data=dataset, **preprocessing_config)
-    else:
-        dataset = pipeline_preprocess(data=dataset, **preprocessing_config)
 
-    model = joblib.load(os.path.join(train_config['model_path']))
-    prediction = model.predict(dataset).tolist()
+def _predict_chunks(
+    bundle: ModelBundle, data_path: str, output_format: str, chunksize: int
+) -> Iterator[str]:
+    """
+    Генератор сериализованных блоков предсказаний
+    :param bundle: снимок модели и артефактов из реестра
+    :param data_path: путь до файла с данными
+    :param output_format: формат ответа (ndjson/csv)
+    :param chunksize: кол-во строк в блоке
+    :return: итератор по сериализованным блокам предсказаний
+    """
+    id_column = bundle.config['preprocessing']['drop_columns'][0]
+
+    if output_format == 'csv':
+        yield f'{id_column},prediction\n'
+
+    chunks = get_dataset_chunks(dataset_path=data_path, chunksize=chunksize)
+    while True:
+        with stage_timer('read_data'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        ids = chunk[id_column] if id_column in chunk else chunk.index.to_series()
+        result = pd.DataFrame({
+            id_column: ids.to_numpy(),
+            'prediction': predict_bundle(bundle=bundle, dataset=chunk),
+        })
+
+        if output_format == 'csv':
+            yield result.to_csv(index=False, header=False)
+        else:
+            lines = result.to_json(orient='records', lines=True, double_precision=15)
+            yield lines if lines.endswith('\n') else lines + '\n'
+
+
+def pipeline_evaluate_chunks(
+    config_path, data_path: str, output_format: str = 'ndjson', chunksize: int = None
+) -> Iterator[str]:
+    """
+    Потоковое предсказание по файлу: чтение, предобработка и predict блоками,
+    в памяти одновременно находится только один блок.
+    Весь файл размечается одним снимком модели, даже если она обновилась в процессе
+    :param config_path: путь до конфигурационного файла
+    :param data_path: путь до файла с данными
+    :param output_format: формат ответа (ndjson/csv)
+    :param chunksize: кол-во строк в блоке (по умолчанию из конфигурации)
+    :return: итератор по сериализованным блокам предсказаний
+    """
+    # проверки до начала потока, чтобы ошибка не пришла посреди ответа
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f'Формат ответа: {" или ".join(OUTPUT_FORMATS)}')
+
+    bundle = get_registry(config_path).get()
+    assert bundle.model is not None, 'Модель не обучена'
 
-    return prediction
\ No newline at end of file
+    chunksize = chunksize or bundle.config['evaluate']['chunksize']
+    return _predict_chunks(
+        bundle=bundle, data_path=data_path, output_format=output_format, chunksize=chunksize
+    )
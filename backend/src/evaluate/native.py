@@ -0,0 +1,66 @@
+"""
+Программа: Предсказание нативным бустером LightGBM по float32 numpy-матрице
+без обертки sklearn и преобразования pandas -> numpy на каждом вызове
+Версия: 1.0
+"""
+
+from typing import Mapping
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+
+
+class NativePredictor:
+    """
+    Бустер загружается из текстового файла модели (save_model).
+    Признаки собираются в непрерывную float32 матрицу в порядке train,
+    категории переводятся в коды по категориям train (pandas_categorical)
+    """
+
+    def __init__(self, booster_path: str, num_threads: int = 1):
+        """
+        :param booster_path: путь до файла бустера
+        :param num_threads: кол-во потоков LightGBM на один predict
+        """
+        self.booster = lgb.Booster(model_file=booster_path)
+        self.num_threads = num_threads
+        self.feature_names = self.booster.feature_name()
+        self.categories = [
+            pd.CategoricalDtype(categories)
+            for categories in (self.booster.pandas_categorical or [])
+        ]
+
+    def to_matrix(self, columns: Mapping) -> np.ndarray:
+        """
+        Сборка float32 матрицы признаков
+        :param columns: датасет или {признак: массив} с признаками train
+        :return: матрица (строки x признаки), C-порядок
+        """
+        n_rows = len(columns[self.feature_names[0]])
+        matrix = np.empty((n_rows, len(self.feature_names)), dtype=np.float32)
+
+        # категориальные признаки идут в том же порядке, что и в pandas_categorical
+        n_category = 0
+        for idx, col in enumerate(self.feature_names):
+            values = columns[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.array if isinstance(values, pd.Series) else values
+                dtype = self.categories[n_category]
+                n_category += 1
+                if values.dtype != dtype:
+                    values = values.set_categories(dtype.categories)
+                codes = values.codes
+                matrix[:, idx] = codes
+                # неизвестная категория -> пропуск, как в LightGBM для pandas
+                matrix[codes < 0, idx] = np.nan
+            else:
+                matrix[:, idx] = values
+        return matrix
+
+    def predict(self, columns: Mapping) -> np.ndarray:
+        """
+        Предсказание
+        :param columns: датасет или {признак: массив} с признаками train
+        :return: предсказания
+        """
+        return self.booster.predict(self.to_matrix(columns), num_threads=self.num_threads)
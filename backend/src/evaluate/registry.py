@@ -0,0 +1,204 @@
+"""
+Программа: Реестр модели и артефактов предобработки в памяти процесса
+Версия: 1.0
+"""
+
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import joblib
+import yaml
+from ..transform.schema import load_schema
+from ..transform.imputer import FillnaImputer
+from .native import NativePredictor
+from ..monitoring.metrics import MODEL_INFO, stage_timer
+
+
+def load_config(config_path: str) -> dict:
+    """
+    Загрузка конфигурационного файла
+    :param config_path: путь до конфигурационного файла
+    :return: конфигурация
+    """
+    with open(config_path) as file:
+        return yaml.load(file, Loader=yaml.FullLoader)
+
+
+def file_version(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Версия файла по времени изменения и размеру
+    :param path: путь до файла
+    :return: (mtime_ns, size) или None, если файла нет
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    Неизменяемый снимок загруженных артефактов.
+    Запрос, получивший снимок, дорабатывает на нем даже после подмены модели
+    """
+
+    config: dict
+    model: Optional[object]
+    schema: Optional[dict]
+    imputer: Optional[FillnaImputer]
+    version: Tuple
+    predictor: Optional[NativePredictor] = None
+
+    @property
+    def column_sequence(self) -> Optional[list]:
+        """
+        Порядок признаков из train
+        """
+        return None if self.schema is None else self.schema['columns']
+
+    @property
+    def model_version(self) -> Optional[str]:
+        """
+        Строковая версия модели (mtime_ns файла модели)
+        """
+        model_stat = self.version[1]
+        return None if model_stat is None else str(model_stat[0])
+
+
+class ModelRegistry:
+    """
+    Процессный реестр: конфигурация, модель, схема признаков и статистики пропусков
+    загружаются один раз и атомарно подменяются при изменении конфигурации или модели
+    """
+
+    def __init__(self, config_path: str, check_interval: float = 1.0):
+        """
+        :param config_path: путь до конфигурационного файла
+        :param check_interval: как часто (сек) сверять версии файлов на диске
+        """
+        self.config_path = config_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._checked_at = 0.0
+
+    def _disk_version(self, config: dict) -> Tuple:
+        """
+        Текущие версии отслеживаемых файлов на диске: конфигурации и модели.
+        Схема, статистики пропусков и бустер пишутся обучением до модели и
+        перечитываются вместе с ней: снимок не смешивает артефакты разных обучений
+        :param config: конфигурация
+        :return: версии конфигурации и модели
+        """
+        return (
+            file_version(self.config_path),
+            file_version(config['train']['model_path']),
+        )
+
+    def disk_version(self) -> Optional[Tuple]:
+        """
+        Версии файлов загруженного снимка на диске (сравнение с bundle.version)
+        :return: версии или None, если снимок еще не загружен
+        """
+        bundle = self._bundle
+        return None if bundle is None else self._disk_version(bundle.config)
+
+    def _load(self) -> ModelBundle:
+        """
+        Загрузка артефактов с диска
+        :return: новый снимок
+        """
+        with stage_timer('load_config'):
+            config = load_config(self.config_path)
+        version = self._disk_version(config)
+
+        model_path = config['train']['model_path']
+        with stage_timer('load_model'):
+            model = joblib.load(model_path) if version[1] is not None else None
+
+        schema_path = config['preprocessing']['schema_path']
+        schema = load_schema(schema_path) if os.path.exists(schema_path) else None
+
+        preprocessing_config = config['preprocessing']
+        imputer = None
+        if os.path.exists(preprocessing_config['imputer_path']):
+            imputer = FillnaImputer.load(preprocessing_config['imputer_path'])
+        elif schema is not None:
+            # одни и те же статистики для файлов и записей
+            imputer = FillnaImputer.from_schema(
+                schema, list_median=preprocessing_config['list_median'],
+                list_mean=preprocessing_config['list_mean'])
+
+        # нативный бустер - основной путь предсказаний, joblib-модель - запасной
+        booster_path = config['train'].get('booster_path')
+        predictor = None
+        if booster_path and os.path.exists(booster_path) and model is not None:
+            with stage_timer('load_booster'):
+                predictor = NativePredictor(
+                    booster_path=config['train']['booster_path'],
+                    num_threads=config['evaluate'].get('predict_threads', 1))
+
+        MODEL_INFO.clear()
+        if model is not None:
+            MODEL_INFO.set(1, (str(version[1][0]), 'native' if predictor else 'joblib'))
+
+        return ModelBundle(
+            config=config,
+            model=model,
+            schema=schema,
+            imputer=imputer,
+            version=version,
+            predictor=predictor,
+        )
+
+    def reload(self, force: bool = False) -> ModelBundle:
+        """
+        Перезагрузка артефактов, если файлы на диске изменились
+        :param force: перезагрузить без сверки версий
+        :return: актуальный снимок
+        """
+        with self._lock:
+            bundle = self._bundle
+            if (
+                force
+                or bundle is None
+                or self._disk_version(bundle.config) != bundle.version
+            ):
+                bundle = self._load()
+                self._bundle = bundle
+            self._checked_at = time.monotonic()
+            return bundle
+
+    def get(self) -> ModelBundle:
+        """
+        Получение актуального снимка; сверка версий не чаще check_interval
+        :return: снимок артефактов
+        """
+        bundle = self._bundle
+        if bundle is None:
+            return self.reload()
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            if self._disk_version(bundle.config) != bundle.version:
+                return self.reload()
+            self._checked_at = time.monotonic()
+        return bundle
+
+
+_REGISTRIES: Dict[str, ModelRegistry] = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def get_registry(config_path: str) -> ModelRegistry:
+    """
+    Реестр для заданного конфигурационного файла (один на процесс)
+    :param config_path: путь до конфигурационного файла
+    :return: реестр
+    """
+    with _REGISTRIES_LOCK:
+        if config_path not in _REGISTRIES:
+            _REGISTRIES[config_path] = ModelRegistry(config_path=config_path)
+        return _REGISTRIES[config_path]
@@ -0,0 +1,112 @@
+"""
+Программа: Векторная проверка пакета записей для предсказания
+(столбцы -> массивы или массив записей) без построения pydantic-модели на каждую запись
+Версия: 1.0
+"""
+
+from datetime import date
+from typing import Dict, List, Tuple, Union
+import pandas as pd
+
+# сколько номеров ошибочных строк возвращать по каждому полю
+MAX_ERROR_ROWS = 10
+# to_datetime допускает и другие разделители, pydantic - только ISO
+DATE_PATTERN = r'\d{4}-\d{2}-\d{2}'
+
+
+class BulkValidationError(Exception):
+    """
+    Пакет не прошел проверку: ошибки по полям с номерами строк
+    """
+
+    def __init__(self, errors: List[dict]):
+        super().__init__(f'Ошибки в полях: {[error["loc"][-1] for error in errors]}')
+        self.errors = errors
+
+
+def _error(field: str, msg: str, mask: pd.Series = None) -> dict:
+    """
+    Описание ошибки в формате, близком к ошибкам валидации FastAPI
+    :param field: поле
+    :param msg: сообщение
+    :param mask: строки с ошибкой
+    :return: описание ошибки
+    """
+    error = {'loc': ['body', field], 'msg': msg}
+    if mask is not None:
+        rows = mask.to_numpy().nonzero()[0]
+        error.update(n_rows=len(rows), rows=rows[:MAX_ERROR_ROWS].tolist())
+    return error
+
+
+def to_frame(payload: Union[Dict[str, list], List[dict]], max_rows: int = None) -> pd.DataFrame:
+    """
+    Датасет из столбцов (поле -> массив значений) или из массива записей
+    :param payload: тело запроса
+    :param max_rows: максимальное кол-во строк (None - без ограничения)
+    :return: датасет
+    """
+    if isinstance(payload, dict):
+        lengths = {len(values) if isinstance(values, list) else -1 for values in payload.values()}
+        if -1 in lengths or len(lengths) > 1:
+            raise BulkValidationError(
+                [_error('__root__', 'Столбцы должны быть массивами одной длины')])
+        data = pd.DataFrame(payload)
+    elif isinstance(payload, list):
+        try:
+            data = pd.DataFrame.from_records(payload)
+        except (TypeError, ValueError, AttributeError):
+            raise BulkValidationError([_error('__root__', 'Записи должны быть объектами')])
+    else:
+        raise BulkValidationError(
+            [_error('__root__', 'Ожидается объект со столбцами или массив записей')])
+
+    if max_rows is not None and len(data) > max_rows:
+        raise BulkValidationError(
+            [_error('__root__', f'Строк больше допустимого: {len(data)} > {max_rows}')])
+    return data
+
+
+def validate_frame(data: pd.DataFrame, fields: Dict[str, Tuple[type, bool]]) -> pd.DataFrame:
+    """
+    Проверка и приведение типов целыми столбцами: числа - to_numeric, даты - ISO формат,
+    строки - str; обязательные поля не пустые. Неизвестные поля отбрасываются,
+    отсутствующие необязательные заполняются пропусками
+    :param data: датасет из to_frame
+    :param fields: {поле: (тип, обязательное)}, например из pydantic-модели
+    :return: датасет с полями в порядке fields
+    """
+    errors = []
+    missing = [name for name, (_, required) in fields.items()
+               if required and name not in data.columns]
+    errors.extend(_error(name, 'field required') for name in missing)
+
+    data = data.reindex(columns=list(fields))
+    for name, (field_type, required) in fields.items():
+        if name in missing:
+            continue
+        values = data[name]
+        flg_null = values.isna()
+
+        if field_type is float or field_type is int:
+            converted = pd.to_numeric(values, errors='coerce')
+            msg = 'value is not a valid float'
+        elif field_type is date:
+            flg_format = values.astype(str).str.fullmatch(DATE_PATTERN)
+            converted = pd.to_datetime(
+                values.where(flg_format), format='%Y-%m-%d', errors='coerce')
+            msg = 'invalid date format'
+        else:
+            converted = values.where(flg_null, values.astype(str))
+            msg = 'str type expected'
+
+        flg_invalid = ~flg_null & converted.isna()
+        if flg_invalid.any():
+            errors.append(_error(name, msg, flg_invalid))
+        if required and flg_null.any():
+            errors.append(_error(name, 'none is not an allowed value', flg_null))
+        data[name] = converted
+
+    if errors:
+        raise BulkValidationError(errors)
+    return data
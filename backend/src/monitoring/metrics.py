@@ -0,0 +1,297 @@
+"""
+Программа: Метрики сервиса в текстовом формате Prometheus
+(счетчики, гистограммы задержек по endpoint и по этапам конвейера)
+Версия: 1.0
+"""
+
+import copy
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+TRAINING_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    """
+    Метки в формате Prometheus
+    :param names: названия меток
+    :param values: значения меток
+    :param extra: дополнительная метка (le для гистограмм)
+    :return: строка {name="value",...}
+    """
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """
+    Базовая метрика: название, описание, метки.
+    Обновление - словарь под локом без выделения памяти для известных меток;
+    acquire/release без контекстного менеджера - обновление на горячем пути < 1 мкс
+    """
+
+    kind = 'untyped'
+    # значения воркеров складываются (счетчики, гистограммы);
+    # текущие значения (gauge) показываются по воркерам с меткой worker
+    flg_additive = False
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        """
+        :param name: название метрики
+        :param documentation: описание (# HELP)
+        :param labelnames: названия меток
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._acquire, self._release = self._lock.acquire, self._lock.release
+        self._values: Dict[Tuple, object] = {}
+        REGISTRY.append(self)
+
+    def snapshot(self) -> Dict[Tuple, object]:
+        """
+        Копия значений (для сбора метрик всех воркеров)
+        :return: {значения меток: значение}
+        """
+        with self._lock:
+            return copy.deepcopy(self._values)
+
+    def clear(self) -> None:
+        """
+        Удаление всех значений (например, метки прежней версии модели)
+        :return: None
+        """
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def add(total: object, value: object) -> object:
+        """
+        Сумма значений двух процессов
+        :param total: накопленное значение
+        :param value: значение процесса
+        :return: сумма
+        """
+        return total + value
+
+    def samples(self, values: Dict[Tuple, object] = None, labelnames: Tuple = None) -> Iterator[str]:
+        """
+        Строки значений
+        :param values: значения (None - значения процесса)
+        :param labelnames: названия меток (None - метки метрики)
+        :return: итератор по строкам
+        """
+        items = (self.snapshot() if values is None else values).items()
+        labelnames = labelnames or self.labelnames
+        for labels, value in items:
+            yield f'{self.name}{_format_labels(labelnames, labels)} {value}'
+
+    def render(self, values: Dict[Tuple, object] = None, labelnames: Tuple = None) -> List[str]:
+        """
+        Описание и значения метрики
+        :param values: значения (None - значения процесса)
+        :param labelnames: названия меток (None - метки метрики)
+        :return: строки
+        """
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+            *self.samples(values, labelnames),
+        ]
+
+
+class Counter(Metric):
+    """
+    Монотонный счетчик
+    """
+
+    kind = 'counter'
+    flg_additive = True
+
+    def inc(self, amount: float = 1.0, labels: Tuple = ()) -> None:
+        """
+        Увеличение счетчика
+        :param amount: на сколько увеличить
+        :param labels: значения меток
+        :return: None
+        """
+        self._acquire()
+        try:
+            self._values[labels] = self._values.get(labels, 0) + amount
+        finally:
+            self._release()
+
+
+class Gauge(Metric):
+    """
+    Текущее значение
+    """
+
+    kind = 'gauge'
+
+    def set(self, value: float, labels: Tuple = ()) -> None:
+        """
+        Установка значения
+        :param value: значение
+        :param labels: значения меток
+        :return: None
+        """
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма с фиксированными границами корзин
+    """
+
+    kind = 'histogram'
+    flg_additive = True
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        """
+        :param name: название метрики
+        :param documentation: описание (# HELP)
+        :param labelnames: названия меток
+        :param buckets: верхние границы корзин
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: Tuple = ()) -> None:
+        """
+        Учет одного наблюдения
+        :param value: значение
+        :param labels: значения меток
+        :return: None
+        """
+        idx = bisect.bisect_left(self.buckets, value)
+        self._acquire()
+        try:
+            state = self._values.get(labels)
+            if state is None:
+                # [счетчики корзин (+Inf последняя), сумма, кол-во]
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+        finally:
+            self._release()
+
+    @staticmethod
+    def add(total: list, value: list) -> list:
+        """
+        Сумма состояний двух процессов: корзины, сумма и кол-во
+        :param total: накопленное состояние
+        :param value: состояние процесса
+        :return: сумма
+        """
+        return [[a + b for a, b in zip(total[0], value[0])],
+                total[1] + value[1], total[2] + value[2]]
+
+    def samples(self, values: Dict[Tuple, list] = None, labelnames: Tuple = None) -> Iterator[str]:
+        """
+        Накопительные корзины, сумма и кол-во
+        :param values: состояния (None - состояния процесса)
+        :param labelnames: названия меток (None - метки метрики)
+        :return: итератор по строкам
+        """
+        items = (self.snapshot() if values is None else values).items()
+        labelnames = labelnames or self.labelnames
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                label = _format_labels(labelnames, labels, f'le="{bound}"')
+                yield f'{self.name}_bucket{label} {cumulative}'
+            label = _format_labels(labelnames, labels)
+            yield f'{self.name}_sum{label} {total}'
+            yield f'{self.name}_count{label} {count}'
+
+
+REGISTRY: List[Metric] = []
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'Запросы по endpoint и коду ответа', ('method', 'path', 'status'))
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса (для потоковых ответов - до первого байта)',
+    ('method', 'path'))
+STAGE_LATENCY = Histogram(
+    'pipeline_stage_duration_seconds',
+    'Время этапов конвейера предсказания и загрузки артефактов',
+    ('stage',))
+ROWS_SCORED = Counter('rows_scored_total', 'Кол-во размеченных строк', ('source',))
+MODEL_INFO = Gauge('model_info', 'Загруженная версия модели', ('version', 'predictor'))
+TRAINING_JOB_SECONDS = Histogram(
+    'training_job_duration_seconds', 'Длительность задач обучения', ('mode', 'state'),
+    buckets=TRAINING_BUCKETS)
+TRIAL_SECONDS = Histogram(
+    'optuna_trial_duration_seconds', 'Длительность trial optuna (все фолды)',
+    buckets=TRAINING_BUCKETS)
+FOLD_SECONDS = Histogram(
+    'cv_fold_duration_seconds', 'Длительность обучения одного фолда кросс-валидации',
+    buckets=TRAINING_BUCKETS)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Замер этапа конвейера
+    :param stage: название этапа
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, (stage,))
+
+
+def render_values(
+    name: str, documentation: str, kind: str, values: Dict, labelnames: Tuple[str, ...] = ('name',)
+) -> List[str]:
+    """
+    Метрика из готового словаря значений (счетчики микробатчера и кэша)
+    :param name: название метрики
+    :param documentation: описание
+    :param kind: тип (counter/gauge)
+    :param values: {значение метки name (или кортеж значений labelnames): значение}
+    :param labelnames: названия меток
+    :return: строки
+    """
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+    for key, value in values.items():
+        key = key if isinstance(key, tuple) else (key,)
+        lines.append(f'{name}{_format_labels(labelnames, key)} {value}')
+    return lines
+
+
+def render(extra: List[str] = None) -> str:
+    """
+    Все метрики процесса в текстовом формате Prometheus
+    :param extra: дополнительные строки
+    :return: текст
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra or [])
+    return '\n'.join(lines) + '\n'
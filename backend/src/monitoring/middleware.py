@@ -0,0 +1,49 @@
+"""
+Программа: ASGI middleware - кол-во запросов и задержка по endpoint
+Версия: 1.0
+"""
+
+import time
+
+from .metrics import HTTP_LATENCY, HTTP_REQUESTS
+
+
+class MetricsMiddleware:
+    """
+    Чистый ASGI middleware (без BaseHTTPMiddleware: не буферизует потоковые ответы).
+    Endpoint - шаблон маршрута (/train/{job_id}), а не фактический путь,
+    чтобы кол-во меток не росло с идентификаторами.
+    Задержка - до начала ответа (для потоковых ответов - до первого байта)
+    """
+
+    def __init__(self, app):
+        """
+        :param app: ASGI приложение
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = {'status': 500, 'latency': None}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+                state['latency'] = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # маршрут записывается роутером в тот же scope
+            route = scope.get('route')
+            path = getattr(route, 'path', 'unmatched')
+            latency = state['latency']
+            if latency is None:
+                latency = time.perf_counter() - started
+            HTTP_REQUESTS.inc(1, (scope['method'], path, state['status']))
+            HTTP_LATENCY.observe(latency, (scope['method'], path))
@@ -0,0 +1,267 @@
+"""
+Программа: Метрики всех воркеров супервизора: каждый воркер пишет снимок своих
+метрик в общий каталог, /metrics любого воркера складывает снимки
+Версия: 1.0
+"""
+
+import os
+import json
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .metrics import REGISTRY, Metric
+
+ARCHIVE_FILE = 'archive.json'
+# период записи снимка воркера (сек): на столько /metrics может отставать
+# по запросам, обработанным другими воркерами
+SNAPSHOT_INTERVAL = 1.0
+
+
+def _read_json(path: str) -> Optional[dict]:
+    """
+    Чтение снимка; файл мог быть удален после listdir
+    :param path: путь до файла
+    :return: снимок или None
+    """
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(data: dict, path: str) -> None:
+    """
+    Запись через временный файл: читатели не видят недописанный снимок
+    :param data: снимок
+    :param path: путь до файла
+    :return: None
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def _to_state(values: Dict[Tuple, object]) -> list:
+    return [[list(labels), value] for labels, value in values.items()]
+
+
+def _from_state(state: list) -> Dict[Tuple, object]:
+    return {tuple(labels): value for labels, value in state}
+
+
+def _add_state(metric: Metric, total: Dict[Tuple, object], state: list) -> Dict[Tuple, object]:
+    """
+    Прибавление значений процесса к сумме по меткам
+    :param metric: метрика (способ сложения)
+    :param total: сумма (изменяется)
+    :param state: значения процесса из снимка
+    :return: та же сумма
+    """
+    for labels, value in _from_state(state).items():
+        total[labels] = metric.add(total[labels], value) if labels in total else value
+    return total
+
+
+class SharedMetrics:
+    """
+    Каталог снимков: {pid}.json - метрики и статистика живого воркера
+    (и метрики загрузки артефактов в супервизоре), archive.json - сумма счетчиков и гистограмм остановленных воркеров.
+    Счетчики не уменьшаются при смене поколения воркеров: супервизор переносит
+    снимки остановленных воркеров в архив (воркеры из списка pids архива уже учтены)
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: каталог снимков
+        """
+        self.path = path
+        self.stats_fn: Optional[Callable[[], dict]] = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+
+    def _worker_path(self, pid: int) -> str:
+        return os.path.join(self.path, f'{pid}.json')
+
+    def snapshot(self) -> dict:
+        """
+        Снимок метрик и статистики текущего процесса
+        :return: снимок
+        """
+        return {
+            'metrics': {metric.name: _to_state(metric.snapshot()) for metric in REGISTRY},
+            'stats': None if self.stats_fn is None else self.stats_fn(),
+        }
+
+    def write(self) -> None:
+        """
+        Запись снимка текущего процесса; под локом - более ранний снимок
+        фонового потока не заменит более поздний
+        :return: None
+        """
+        with self._write_lock:
+            _write_json(self.snapshot(), self._worker_path(os.getpid()))
+
+    def reset(self) -> None:
+        """
+        Воркер после fork: счетчики и гистограммы супервизора (загрузка артефактов)
+        учитываются в его собственном снимке, а не в каждом воркере
+        :return: None
+        """
+        for metric in REGISTRY:
+            if metric.flg_additive:
+                metric.clear()
+
+    def start(self, stats_fn: Callable[[], dict] = None) -> None:
+        """
+        Периодическая запись снимка воркера в фоновом потоке
+        :param stats_fn: статистика воркера (микробатчер, кэш)
+        :return: None
+        """
+        if stats_fn is not None:
+            self.stats_fn = stats_fn
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(SNAPSHOT_INTERVAL):
+            self.write()
+
+    def stop(self) -> None:
+        """
+        Остановка фоновой записи и запись итогового снимка (до завершения воркера)
+        :return: None
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+    def _archive(self) -> dict:
+        return _read_json(os.path.join(self.path, ARCHIVE_FILE)) or {'pids': [], 'metrics': {}}
+
+    def collect(self) -> Tuple[dict, Dict[int, dict]]:
+        """
+        Архив и снимки живых воркеров. Свой снимок записывается перед чтением,
+        все значения берутся из файлов: снимки только растут, поэтому сумма
+        не уменьшается от запроса к запросу, какой бы воркер его ни обработал.
+        Архив читается после снимков: воркер, перенесенный в архив между чтениями,
+        учитывается один раз
+        :return: (архив, {pid: снимок})
+        """
+        self.write()
+        snapshots = {}
+        for name in os.listdir(self.path):
+            pid, extension = os.path.splitext(name)
+            if extension != '.json' or not pid.isdigit():
+                continue
+            snapshot = _read_json(os.path.join(self.path, name))
+            if snapshot is not None:
+                snapshots[int(pid)] = snapshot
+        archive = self._archive()
+        for pid in archive['pids']:
+            snapshots.pop(pid, None)
+        return archive, snapshots
+
+    def stats(self) -> Dict[int, dict]:
+        """
+        Статистика живых воркеров (у снимка супервизора статистики нет)
+        :return: {pid: статистика}
+        """
+        _, snapshots = self.collect()
+        return {
+            pid: snapshot['stats'] for pid, snapshot in sorted(snapshots.items())
+            if snapshot['stats'] is not None
+        }
+
+    def archive(self, pids: List[int]) -> None:
+        """
+        Перенос снимков остановленных воркеров в архив (вызывает супервизор).
+        Архив с их pid записывается до удаления снимков: читатель не учтет воркер дважды
+        :param pids: pid остановленных воркеров
+        :return: None
+        """
+        archive = self._archive()
+        archive['pids'] = [
+            pid for pid in archive['pids'] if os.path.exists(self._worker_path(pid))]
+        for pid in pids:
+            snapshot = _read_json(self._worker_path(pid))
+            if snapshot is None:
+                continue
+            for metric in REGISTRY:
+                if metric.flg_additive:
+                    total = _from_state(archive['metrics'].get(metric.name, []))
+                    _add_state(metric, total, snapshot['metrics'].get(metric.name, []))
+                    archive['metrics'][metric.name] = _to_state(total)
+            archive['pids'].append(pid)
+        _write_json(archive, os.path.join(self.path, ARCHIVE_FILE))
+        for pid in pids:
+            try:
+                os.remove(self._worker_path(pid))
+            except FileNotFoundError:
+                pass
+
+    def render(self, extra: List[str] = None) -> str:
+        """
+        Метрики всех воркеров в текстовом формате Prometheus: счетчики и гистограммы
+        складываются (с архивом остановленных воркеров), gauge - с меткой worker
+        :param extra: дополнительные строки
+        :return: текст
+        """
+        archive, workers = self.collect()
+        lines = []
+        for metric in REGISTRY:
+            lines.extend(self._render_metric(metric, archive, workers))
+        lines.extend(extra or [])
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_metric(metric: Metric, archive: dict, workers: Dict[int, dict]) -> List[str]:
+        """
+        Одна метрика по снимкам воркеров
+        :param metric: метрика
+        :param archive: архив остановленных воркеров
+        :param workers: снимки живых воркеров
+        :return: строки
+        """
+        if not metric.flg_additive:
+            values = {
+                (pid, *labels): value
+                for pid, snapshot in sorted(workers.items())
+                for labels, value in _from_state(snapshot['metrics'].get(metric.name, [])).items()
+            }
+            return metric.render(values, labelnames=('worker',) + metric.labelnames)
+
+        total = _from_state(archive['metrics'].get(metric.name, []))
+        for snapshot in workers.values():
+            _add_state(metric, total, snapshot['metrics'].get(metric.name, []))
+        return metric.render(total)
+
+
+_SHARED: Optional[SharedMetrics] = None
+
+
+def configure(path: Optional[str]) -> Optional[SharedMetrics]:
+    """
+    Общий каталог метрик процесса (супервизор задает его до fork воркеров)
+    :param path: каталог снимков (None - метрики только своего процесса)
+    :return: общие метрики или None
+    """
+    global _SHARED
+    _SHARED = None if path is None else SharedMetrics(path)
+    return _SHARED
+
+
+def get_shared_metrics() -> Optional[SharedMetrics]:
+    """
+    Общие метрики воркеров
+    :return: общие метрики или None, если сервис запущен одним процессом
+    """
+    return _SHARED
+
@@ -0,0 +1,151 @@
+"""
+Программа: Инкрементальное дообучение модели на новой выгрузке данных
+Версия: 1.0
+"""
+
+import os
+import json
+import joblib
+import yaml
+import pandas as pd
+from lightgbm import LGBMRegressor
+from sklearn.metrics import mean_absolute_error
+
+from .pipeline import pipeline_training, export_model
+from ..data.get_data import get_dataset
+from ..data.convert import resolve_dataset_path
+from ..data.split_dataset import append_dataset
+from ..train.metrics import save_metrics
+from ..transform.transform import pipeline_preprocess
+from ..transform.schema import load_schema, schema_drift
+from ..transform.imputer import FillnaImputer
+
+
+def align_to_schema(data: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Порядок признаков и категории как в train: при дообучении коды категорий
+    новых данных должны совпадать с кодами, на которых строились деревья
+    :param data: объект-признаки
+    :param schema: схема признаков train
+    :return: объект-признаки
+    """
+    data = data[schema['columns']]
+    for col, categories in schema['categories'].items():
+        data[col] = data[col].cat.set_categories(categories)
+    return data
+
+
+def check_retrain_reason(
+    data_x: pd.DataFrame, data_y: pd.Series, model: LGBMRegressor, schema: dict, **kwargs
+) -> dict:
+    """
+    Проверка, нужен ли полный подбор параметров: сдвиг данных или деградация метрики
+    :param data_x: объект-признаки новых данных
+    :param data_y: целевая переменная новых данных
+    :param model: текущая модель
+    :param schema: схема признаков train
+    :param kwargs: переменная (train конфигурация)
+    :return: словарь с причинами (пустой - можно дообучать)
+    """
+    reason = {}
+
+    drift = schema_drift(data=data_x, schema=schema)
+    drifted = {
+        col: value for col, value in drift['psi'].items()
+        if value > kwargs['incremental']['psi_threshold']
+    }
+    if drifted:
+        reason['psi'] = drifted
+    if drift['unknown_categories']:
+        reason['unknown_categories'] = drift['unknown_categories']
+
+    with open(kwargs['metrics_path']) as json_file:
+        old_mae = json.load(json_file)['MAE']
+    prediction = model.predict(align_to_schema(data=data_x, schema=schema))
+    new_mae = mean_absolute_error(data_y, prediction)
+    if new_mae > old_mae * (1 + kwargs['incremental']['mae_tolerance']):
+        reason['mae'] = {'train': old_mae, 'new_data': round(new_mae, 4)}
+
+    return reason
+
+
+def pipeline_training_incremental(config_path: str, callbacks: list = None) -> dict:
+    """
+    Дообучение текущей модели на новой выгрузке (init_model) с лучшими
+    сохраненными параметрами; при сдвиге данных или деградации MAE -
+    полный цикл pipeline_training
+    :param config_path: путь до конфигурационного файла
+    :param callbacks: callbacks optuna для полного цикла
+    :return: режим обучения, причина и study optuna (если был полный цикл)
+    """
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+    preprocessing_config = config['preprocessing']
+    train_config = config['train']
+    target = preprocessing_config['target_column']
+
+    new_data_path = preprocessing_config['new_data_path']
+    if not os.path.exists(new_data_path):
+        return {'mode': 'skipped', 'reason': f'Нет новых данных: {new_data_path}'}
+
+    new_data = get_dataset(dataset_path=new_data_path)
+    # новые строки попадают в сырые данные, чтобы их учитывало и полное обучение
+    # (исходный csv сначала конвертируется: иначе parquet получил бы только новые строки)
+    append_dataset(
+        dataset=new_data,
+        dataset_path=resolve_dataset_path(preprocessing_config['train_path'], **preprocessing_config))
+    os.replace(new_data_path, f'{new_data_path}.done')
+
+    artifacts = [
+        train_config['model_path'],
+        train_config['params_path'],
+        train_config['metrics_path'],
+        preprocessing_config['schema_path'],
+        preprocessing_config['imputer_path'],
+    ]
+    if not all(os.path.exists(path) for path in artifacts):
+        study_name = pipeline_training(config_path=config_path, callbacks=callbacks)
+        return {
+            'mode': 'full', 'reason': 'Нет артефактов предыдущего обучения',
+            'study_name': study_name,
+        }
+
+    model = joblib.load(train_config['model_path'])
+    schema = load_schema(preprocessing_config['schema_path'])
+    imputer = FillnaImputer.load(preprocessing_config['imputer_path'])
+
+    df_new = pipeline_preprocess(
+        data=new_data, flg_evaluate=False, imputer=imputer, **preprocessing_config)
+    x_new, y_new = df_new.drop(target, axis=1), df_new[target]
+
+    # сдвиг проверяется до выравнивания: неизвестные станции иначе стали бы NaN
+    reason = check_retrain_reason(
+        data_x=x_new, data_y=y_new, model=model, schema=schema, **train_config)
+    if reason:
+        study_name = pipeline_training(config_path=config_path, callbacks=callbacks)
+        return {'mode': 'full', 'reason': reason, 'study_name': study_name}
+
+    append_dataset(dataset=new_data, dataset_path=preprocessing_config['train_path_proc'])
+
+    # бустинг продолжается с текущей модели только на новых строках
+    with open(train_config['params_path']) as json_file:
+        best_params = json.load(json_file)
+    best_params['n_estimators'] = train_config['incremental']['extra_rounds']
+    lgbm = LGBMRegressor(**best_params, silent=True)
+    lgbm.fit(align_to_schema(data=x_new, schema=schema), y_new, init_model=model.booster_)
+
+    df_test = pipeline_preprocess(
+        data=get_dataset(dataset_path=preprocessing_config['test_path_proc']),
+        flg_evaluate=False,
+        imputer=imputer,
+        **preprocessing_config)
+    x_test, y_test = df_test.drop(target, axis=1), df_test[target]
+    save_metrics(
+        data_x=align_to_schema(data=x_test, schema=schema),
+        data_y=y_test,
+        model=lgbm,
+        metric_path=train_config['metrics_path'])
+
+    export_model(
+        lgbm, model_path=train_config['model_path'], booster_path=train_config.get('booster_path'))
+    return {'mode': 'incremental', 'reason': None, 'rows': len(new_data)}
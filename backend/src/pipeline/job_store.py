@@ -0,0 +1,225 @@
+"""
+Программа: Общее для всех воркеров хранилище задач обучения (SQLite):
+статус, прогресс и единственная активная задача
+Версия: 1.0
+"""
+
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from typing import Optional
+
+# поля задачи, которые видит клиент (pid, worker_pid и heartbeat_at - служебные)
+JOB_FIELDS = (
+    'job_id', 'state', 'mode', 'trials_done', 'n_trials', 'best_mae',
+    'metrics', 'result', 'error', 'started_at', 'finished_at',
+)
+JSON_FIELDS = ('metrics', 'result')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    trials_done INTEGER NOT NULL DEFAULT 0,
+    n_trials INTEGER,
+    best_mae REAL,
+    metrics TEXT,
+    result TEXT,
+    error TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    pid INTEGER,
+    worker_pid INTEGER,
+    heartbeat_at REAL NOT NULL
+)
+"""
+
+
+class TrainingInProgress(Exception):
+    """
+    Попытка запустить обучение, пока идет другое
+    """
+
+    def __init__(self, job_id: str):
+        super().__init__(f'Обучение уже запущено: {job_id}')
+        self.job_id = job_id
+
+
+class JobStore:
+    """
+    Задачи обучения в SQLite: любой воркер видит статус задачи, запущенной другим,
+    а проверка "не более одной задачи" выполняется в одной транзакции записи.
+    Процесс обучения отмечается раз в heartbeat сек; задача без отметки дольше
+    timeout сек (процесс убит вместе с воркером) считается упавшей
+    """
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        """
+        :param path: путь до файла базы
+        :param timeout: время без отметки процесса, после которого задача считается упавшей (сек)
+        """
+        self.path = path
+        self.timeout = timeout
+        self._flg_created = False
+
+    @contextmanager
+    def _connect(self, flg_write: bool = False):
+        """
+        Соединение на одну операцию (запросы идут из разных потоков и процессов).
+        Запись - в транзакции BEGIN IMMEDIATE: блокировка берется до чтения
+        :param flg_write: транзакция записи
+        :return: соединение
+        """
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._flg_created:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(_SCHEMA)
+                self._flg_created = True
+            if flg_write:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+                conn.execute('COMMIT')
+            else:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        """
+        Статус задачи из строки таблицы
+        :param row: строка
+        :return: статус задачи
+        """
+        job = {field: row[field] for field in JOB_FIELDS}
+        for field in JSON_FIELDS:
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def _expire(self, conn: sqlite3.Connection) -> None:
+        """
+        Активные задачи без отметки процесса дольше timeout -> failed
+        :param conn: соединение в транзакции записи
+        :return: None
+        """
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET state = 'failed', finished_at = ?, error = ? "
+            "WHERE state = 'running' AND heartbeat_at < ?",
+            (now, f'Процесс обучения не отвечает дольше {self.timeout:g} сек',
+             now - self.timeout))
+
+    def create(self, job: dict, start) -> dict:
+        """
+        Регистрация новой задачи, если нет активной; процесс обучения запускается
+        внутри транзакции, чтобы два воркера не запустили обучение одновременно.
+        Вызывается в воркере: его pid записывается как владелец процесса обучения
+        :param job: статус новой задачи (поля JOB_FIELDS)
+        :param start: функция запуска процесса обучения, возвращает pid
+        :return: статус задачи
+        """
+        with self._connect(flg_write=True) as conn:
+            self._expire(conn)
+            active = conn.execute(
+                "SELECT job_id FROM jobs WHERE state = 'running'").fetchone()
+            if active is not None:
+                raise TrainingInProgress(active['job_id'])
+            pid = start()
+            conn.execute(
+                'INSERT INTO jobs (job_id, state, mode, n_trials, started_at, pid, worker_pid, '
+                'heartbeat_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job['job_id'], job['state'], job['mode'], job['n_trials'],
+                 job['started_at'], pid, os.getpid(), time.time()))
+            return self._to_dict(conn.execute(
+                'SELECT * FROM jobs WHERE job_id = ?', (job['job_id'],)).fetchone())
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Статус задачи
+        :param job_id: идентификатор задачи
+        :return: статус задачи или None, если задачи нет
+        """
+        with self._connect(flg_write=True) as conn:
+            self._expire(conn)
+            row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return None if row is None else self._to_dict(row)
+
+    def active(self) -> Optional[dict]:
+        """
+        Активная задача
+        :return: статус задачи с pid воркера-владельца (worker_pid)
+        или None, если обучение не идет
+        """
+        with self._connect(flg_write=True) as conn:
+            self._expire(conn)
+            row = conn.execute("SELECT * FROM jobs WHERE state = 'running'").fetchone()
+        return None if row is None else {**self._to_dict(row), 'worker_pid': row['worker_pid']}
+
+    def cancel(self, job_id: str) -> Optional[tuple]:
+        """
+        Отметка отмены активной задачи (процесс завершает вызывающий)
+        :param job_id: идентификатор задачи
+        :return: (статус задачи, pid процесса или None, если задача уже не активна)
+        или None, если задачи нет
+        """
+        with self._connect(flg_write=True) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+            if row is None:
+                return None
+            pid = None
+            if row['state'] == 'running':
+                pid = row['pid']
+                conn.execute(
+                    "UPDATE jobs SET state = 'cancelled', finished_at = ? WHERE job_id = ?",
+                    (time.time(), job_id))
+                row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._to_dict(row), pid
+
+    def update(self, job_id: str, **fields) -> bool:
+        """
+        Прогресс и отметка процесса обучения, пока задача активна
+        :param job_id: идентификатор задачи
+        :param fields: поля статуса
+        :return: задача еще активна (False - отменена или признана упавшей)
+        """
+        fields['heartbeat_at'] = time.time()
+        return self._set(job_id, fields)
+
+    def finish(self, job_id: str, state: str, **fields) -> bool:
+        """
+        Итог задачи; отмененная или уже завершенная задача не перезаписывается
+        :param job_id: идентификатор задачи
+        :param state: итоговое состояние
+        :param fields: поля статуса
+        :return: итог записан
+        """
+        return self._set(job_id, {**fields, 'state': state, 'finished_at': time.time()})
+
+    def _set(self, job_id: str, fields: dict) -> bool:
+        """
+        Обновление полей активной задачи
+        :param job_id: идентификатор задачи
+        :param fields: поля
+        :return: задача была активна
+        """
+        values = {
+            field: json.dumps(value) if field in JSON_FIELDS and value is not None else value
+            for field, value in fields.items()
+        }
+        with self._connect(flg_write=True) as conn:
+            cursor = conn.execute(
+                f'UPDATE jobs SET {", ".join(f"{field} = ?" for field in values)} '
+                "WHERE job_id = ? AND state = 'running'",
+                (*values.values(), job_id))
+            return cursor.rowcount > 0
@@ -0,0 +1,291 @@
+"""
+Программа: Асинхронные задачи обучения модели в отдельном процессе
+Версия: 1.0
+"""
+
+import os
+import time
+import uuid
+import queue
+import signal
+import warnings
+import threading
+import multiprocessing
+from typing import Optional
+
+import optuna
+
+from .pipeline import pipeline_training
+from .incremental import pipeline_training_incremental
+from .job_store import JobStore
+from ..train.metrics import load_metrics
+from ..monitoring.metrics import FOLD_SECONDS, TRAINING_JOB_SECONDS, TRIAL_SECONDS
+
+TRAINING_MODES = ('full', 'incremental')
+
+
+class _ProgressCallback:
+    """
+    Callback optuna: после каждого trial записывает прогресс в хранилище задач,
+    время trial и фолдов отправляет воркеру, запустившему обучение (для /metrics).
+    Study может быть продолжен из хранилища, поэтому trials считаются только текущего запуска
+    """
+
+    def __init__(self, store: JobStore, job_id: str, progress_queue):
+        self.store = store
+        self.job_id = job_id
+        self.progress_queue = progress_queue
+        self.trials_done = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, study: optuna.Study, trial: optuna.trial.FrozenTrial) -> None:
+        # trials выполняются параллельно в потоках
+        with self._lock:
+            self.trials_done += 1
+            try:
+                best_mae = study.best_value
+            except ValueError:  # еще нет завершенных trials
+                best_mae = None
+            self.store.update(self.job_id, trials_done=self.trials_done, best_mae=best_mae)
+            self.progress_queue.put({
+                # время trial и фолдов (CVEngine.evaluate) - для /metrics
+                'trial_seconds': trial.user_attrs.get('trial_seconds'),
+                'fold_seconds': trial.user_attrs.get('fold_seconds', []),
+            })
+
+
+def _heartbeat(store: JobStore, job_id: str, parent_pid: int, interval: float) -> None:
+    """
+    Поток процесса обучения: отметка в хранилище раз в interval сек.
+    Процесс завершается сам, если задачу отменили или воркер, запустивший его,
+    завершился (os._exit воркера не завершает дочерние процессы)
+    :param store: хранилище задач
+    :param job_id: идентификатор задачи
+    :param parent_pid: pid воркера
+    :param interval: период отметки (сек)
+    :return: None
+    """
+    while True:
+        time.sleep(interval)
+        if os.getppid() != parent_pid:
+            store.finish(job_id, state='failed', error='Воркер, запустивший обучение, завершился')
+            os._exit(1)
+        if not store.update(job_id):
+            os._exit(1)
+
+
+def _run_training(
+    config_path: str,
+    job_id: str,
+    store: JobStore,
+    progress_queue,
+    nice: int,
+    mode: str,
+    parent_pid: int,
+    heartbeat: float,
+) -> None:
+    """
+    Точка входа процесса обучения: прогресс и итог записываются в хранилище задач
+    :param config_path: путь до конфигурационного файла
+    :param job_id: идентификатор задачи
+    :param store: хранилище задач
+    :param progress_queue: очередь для отправки времени trials и фолдов
+    :param nice: понижение приоритета процесса, чтобы не отнимать CPU у предсказаний
+    :param mode: full - полный цикл, incremental - дообучение на новых данных
+    :param parent_pid: pid воркера, запустившего обучение
+    :param heartbeat: период отметки процесса в хранилище (сек)
+    :return: None
+    """
+    os.nice(nice)
+    warnings.filterwarnings('ignore')
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    threading.Thread(
+        target=_heartbeat, args=(store, job_id, parent_pid, heartbeat), daemon=True).start()
+    callbacks = [_ProgressCallback(store, job_id, progress_queue)]
+
+    try:
+        if mode == 'incremental':
+            result = pipeline_training_incremental(config_path=config_path, callbacks=callbacks)
+        else:
+            study_name = pipeline_training(config_path=config_path, callbacks=callbacks)
+            result = {'mode': 'full', 'reason': None, 'study_name': study_name}
+        metrics = load_metrics(config_path=config_path)
+    except Exception as exc:  # ошибка передается в статус задачи
+        store.finish(job_id, state='failed', error=repr(exc))
+        return
+    store.finish(job_id, state='finished', metrics=metrics, result=result)
+
+
+class TrainingJobManager:
+    """
+    Запуск обучения в отдельном процессе, статус/прогресс и отмена задач.
+    Задачи хранятся в общем хранилище (JobStore): статус и отмена доступны
+    из любого воркера, одновременно во всех воркерах выполняется не более одной задачи.
+    Процесс обучения принадлежит воркеру, который его запустил
+    """
+
+    def __init__(
+        self,
+        config_path: str,
+        n_trials: int = None,
+        nice: int = 10,
+        store: JobStore = None,
+        heartbeat: float = 5.0,
+    ):
+        """
+        :param config_path: путь до конфигурационного файла
+        :param n_trials: кол-во trials optuna (для отображения прогресса)
+        :param nice: понижение приоритета процесса обучения
+        :param store: хранилище задач (задается при старте сервиса по конфигурации)
+        :param heartbeat: период отметки процесса обучения в хранилище (сек)
+        """
+        self.config_path = config_path
+        self.n_trials = n_trials
+        self.nice = nice
+        self.store = store
+        self.heartbeat = heartbeat
+        self._ctx = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        # процесс обучения этого воркера
+        self._job_id: Optional[str] = None
+        self._process = None
+        self._queue = None
+
+    def submit(self, mode: str = 'full') -> dict:
+        """
+        Запуск новой задачи обучения
+        :param mode: full - полный цикл, incremental - дообучение на новых данных
+        :return: статус задачи
+        """
+        if mode not in TRAINING_MODES:
+            raise ValueError(f'Режим обучения: {" или ".join(TRAINING_MODES)}')
+        with self._lock:
+            self._refresh()
+            job_id = uuid.uuid4().hex
+
+            def start() -> int:
+                # вызывается в транзакции хранилища, только если активной задачи нет
+                if self._process is not None:  # процесс прежней задачи дописывает итог
+                    self._terminate(None)
+                self._queue = self._ctx.Queue()
+                self._process = self._ctx.Process(
+                    target=_run_training,
+                    args=(self.config_path, job_id, self.store, self._queue,
+                          self.nice, mode, os.getpid(), self.heartbeat),
+                    daemon=True,
+                )
+                self._job_id = job_id
+                self._process.start()
+                return self._process.pid
+
+            try:
+                return self.store.create({
+                    'job_id': job_id,
+                    'state': 'running',
+                    'mode': mode,
+                    'n_trials': self.n_trials,
+                    'started_at': time.time(),
+                }, start=start)
+            except BaseException:
+                if self._job_id == job_id:  # процесс создан, но задача не записана
+                    self._terminate(None)
+                raise
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """
+        Статус задачи
+        :param job_id: идентификатор задачи
+        :return: статус задачи или None, если задачи нет
+        """
+        with self._lock:
+            self._refresh()
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Отмена задачи: процесс обучения завершается (SIGTERM по pid из хранилища,
+        задача могла быть запущена другим воркером)
+        :param job_id: идентификатор задачи
+        :return: статус задачи или None, если задачи нет
+        """
+        with self._lock:
+            cancelled = self.store.cancel(job_id)
+            if cancelled is None:
+                return None
+            job, pid = cancelled
+            if job_id == self._job_id:
+                self._terminate(job)
+            elif pid is not None:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            return job
+
+    def refresh(self) -> None:
+        """
+        Чтение времени trials и фолдов процесса этого воркера (например, перед выдачей /metrics)
+        :return: None
+        """
+        with self._lock:
+            self._refresh()
+
+    def shutdown(self) -> None:
+        """
+        Остановка воркера: задача этого воркера отменяется, процесс обучения завершается
+        :return: None
+        """
+        with self._lock:
+            if self._job_id is not None:
+                cancelled = self.store.cancel(self._job_id)
+                self._terminate(None if cancelled is None else cancelled[0])
+
+    def _terminate(self, job: Optional[dict]) -> None:
+        """
+        Завершение процесса обучения этого воркера
+        :param job: итоговый статус задачи
+        :return: None
+        """
+        if self._process.pid is not None:  # процесс мог не успеть запуститься
+            self._process.terminate()
+            self._process.join()
+        self._release(job)
+
+    def _release(self, job: Optional[dict]) -> None:
+        """
+        Освобождение завершившегося процесса обучения этого воркера
+        :param job: итоговый статус задачи
+        :return: None
+        """
+        if job is not None and job['finished_at'] is not None:
+            TRAINING_JOB_SECONDS.observe(
+                job['finished_at'] - job['started_at'], (job['mode'], job['state']))
+        self._queue.close()
+        self._job_id, self._process, self._queue = None, None, None
+
+    def _refresh(self) -> None:
+        """
+        Чтение времени trials и фолдов из очереди и проверка завершения процесса
+        этого воркера; процесс, завершившийся без итога, отмечается как упавший
+        :return: None
+        """
+        if self._job_id is None:
+            return
+
+        flg_alive = self._process.is_alive()
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if message.get('trial_seconds') is not None:
+                TRIAL_SECONDS.observe(message['trial_seconds'])
+            for fold_seconds in message.get('fold_seconds', []):
+                FOLD_SECONDS.observe(fold_seconds)
+
+        if not flg_alive:
+            self._process.join()
+            self.store.finish(
+                self._job_id, state='failed',
+                error=f'Процесс обучения завершился с кодом {self._process.exitcode}')
+            self._release(self.store.get(self._job_id))
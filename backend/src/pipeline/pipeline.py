@@ -3,37 +3,102 @@
 """
 
 import os
+import json
 import joblib
 import yaml
+from lightgbm import LGBMRegressor
 
 from ..data.split_dataset import split_train_test
-from ..train.train import find_optimal_params, train_model
-from ..data.get_data import get_dataset
-from ..transform.transform import pipeline_preprocess
+from ..train.train import find_optimal_params, train_model, get_best_params
+from ..data.get_data import get_dataset, get_columns
+from ..data.convert import resolve_dataset_path
+from ..transform.transform import pipeline_preprocess, save_unique_for_train, get_dtype_plan
+from ..transform.schema import build_schema, save_schema
+from ..transform.imputer import FillnaImputer
 
 
-def pipeline_training(config_path: str) -> None:
+def dump_atomic(obj: object, path: str) -> None:
+    """
+    Сохранение объекта через временный файл и os.replace,
+    чтобы читатели никогда не видели недописанный файл
+    :param obj: объект для сохранения
+    :param path: путь до файла
+    :return: None
+    """
+    tmp_path = f'{path}.tmp'
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def export_model(lgbm: LGBMRegressor, model_path: str, booster_path: str = None) -> None:
+    """
+    Сохранение модели: нативный бустер LightGBM (текстовый формат, для быстрого
+    predict по numpy) и joblib (запасной путь). joblib пишется последним:
+    по его версии реестр подхватывает новые артефакты
+    :param lgbm: обученная модель
+    :param model_path: путь до joblib-модели
+    :param booster_path: путь до файла бустера (None - не сохранять)
+    :return: None
+    """
+    if booster_path:
+        tmp_path = f'{booster_path}.tmp'
+        lgbm.booster_.save_model(tmp_path)
+        os.replace(tmp_path, booster_path)
+    dump_atomic(lgbm, model_path)
+
+
+def pipeline_training(config_path: str, callbacks: list = None) -> str:
     """
     Полный цикл получения данных, предобработки и тренировки модели
     :param config_path: путь до конфигурационного файла
-    :return: None
+    :param callbacks: callbacks optuna для отслеживания прогресса подбора параметров
+    :return: название study optuna (зависит от данных train)
     """
     with open(config_path) as file:
         config = yaml.load(file, Loader=yaml.FullLoader)
     preprocessing_config = config['preprocessing']
     train_config = config['train']
 
-    train_data = get_dataset(dataset_path=preprocessing_config['train_path'])
+    # id наблюдения и бины из EDA не нужны обучению - не читаются с диска
+    skip_columns = [preprocessing_config['drop_columns'][0]] + preprocessing_config['bins_columns']
+    train_path = resolve_dataset_path(preprocessing_config['train_path'], **preprocessing_config)
+    train_data = get_dataset(
+        dataset_path=train_path,
+        columns=[col for col in get_columns(train_path) if col not in skip_columns],
+        dtype=get_dtype_plan(preprocessing_config.get('dtype_plan')))
 
-    df_train, df_test = split_train_test(dataset=train_data, **preprocessing_config)
+    df_train_raw, df_test = split_train_test(dataset=train_data, **preprocessing_config)
 
+    # статистики для пропусков обучаются на train и переиспользуются для test и инференса
+    imputer = FillnaImputer(
+        list_median=preprocessing_config['list_median'],
+        list_mean=preprocessing_config['list_mean'],
+        target_column=preprocessing_config['target_column'])
+
+    # исходный train не изменяется: по нему в схему пишутся диапазоны полей для ввода
     df_train = pipeline_preprocess(
-        data=df_train, flg_evaluate=False, **preprocessing_config)
+        data=df_train_raw, flg_evaluate=False, imputer=imputer, flg_fit=True, **preprocessing_config)
 
     df_test = pipeline_preprocess(
-        data=df_test, flg_evaluate=False, **preprocessing_config)
+        data=df_test, flg_evaluate=False, imputer=imputer, **preprocessing_config)
+
+    # схема признаков строится только по train; пишется в конце, вместе с моделью
+    schema = build_schema(
+        data=df_train,
+        drop_columns=preprocessing_config['drop_columns'],
+        target_column=preprocessing_config['target_column'],
+        raw_data=df_train_raw)
+    del df_train_raw
+
+    if preprocessing_config['flg_save_unique']:
+        save_unique_for_train(
+            data=df_train,
+            drop_columns=preprocessing_config['drop_columns'],
+            target_column=preprocessing_config['target_column'],
+            unique_values_path=preprocessing_config['unique_values_path'])
 
-    study = find_optimal_params(data_train=df_train, data_test=df_test, **train_config)
+    study = find_optimal_params(
+        data_train=df_train, data_test=df_test, callbacks=callbacks, **train_config)
 
     lgbm = train_model(
         data_train=df_train,
@@ -43,5 +108,13 @@ def pipeline_training(config_path: str) -> None:
         metric_path=train_config['metrics_path']
     )
 
-    joblib.dump(lgbm, os.path.join(train_config['model_path']))
-    joblib.dump(study, os.path.join(train_config['study_path']))
\ No newline at end of file
+    # study уже сохранен в train.study_storage; лучшие параметры - отдельным json
+    with open(train_config['params_path'], 'w') as file:
+        json.dump(get_best_params(study), file)
+    # артефакты предобработки пишутся после подбора параметров, модель - последней:
+    # реестр перечитывает схему и статистики пропусков только вместе с новой моделью
+    save_schema(schema=schema, schema_path=preprocessing_config['schema_path'])
+    imputer.save(imputer_path=preprocessing_config['imputer_path'])
+    export_model(
+        lgbm, model_path=train_config['model_path'], booster_path=train_config.get('booster_path'))
+    return study.study_name
@@ -0,0 +1,313 @@
+"""
+Программа: Многопроцессный запуск сервиса: артефакты модели загружаются один раз
+в супервизоре и разделяются воркерами после fork (страницы только для чтения),
+новая версия модели выкатывается сменой поколения воркеров без простоя
+Версия: 1.0
+"""
+
+import os
+import gc
+import time
+import select
+import signal
+import shutil
+import socket
+import logging
+import tempfile
+from typing import Dict, List, Optional
+
+import uvicorn
+from threadpoolctl import threadpool_limits
+
+from ..evaluate.registry import get_registry, load_config
+from ..monitoring.shared import configure
+from ..pipeline.job_store import JobStore
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class _WorkerServer(uvicorn.Server):
+    """
+    Сервер воркера: после startup (модель загружена, микробатчер запущен)
+    сообщает супервизору о готовности
+    """
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets: list = None) -> None:
+        await super().startup(sockets=sockets)
+        try:
+            if not self.should_exit:
+                os.write(self.ready_fd, b'1')
+        except BrokenPipeError:  # супервизор уже не ждет готовности
+            pass
+        os.close(self.ready_fd)
+
+
+class WorkerSupervisor:
+    """
+    Супервизор воркеров uvicorn на одном слушающем сокете.
+    Модель, бустер и схема загружаются до fork: воркеры разделяют эти страницы памяти,
+    а не держат по копии. При новой версии модели на диске супервизор загружает ее,
+    запускает новое поколение воркеров и после их готовности мягко (SIGTERM, дообработка
+    начатых запросов) останавливает прежнее - сокет все время принимает соединения.
+    Пока идет обучение, выкатка откладывается: процесс обучения принадлежит воркеру.
+    Воркеры пишут снимки метрик в общий каталог; снимки остановленных воркеров
+    переносятся в архив, поэтому счетчики /metrics не сбрасываются при выкатке
+    """
+
+    def __init__(
+        self,
+        app,
+        config_path: str,
+        host: str = '0.0.0.0',
+        port: int = 8000,
+        workers: int = 2,
+        reload_interval: float = 2.0,
+        graceful_timeout: float = 30.0,
+    ):
+        """
+        :param app: ASGI приложение
+        :param config_path: путь до конфигурационного файла
+        :param host: адрес
+        :param port: порт
+        :param workers: кол-во воркеров
+        :param reload_interval: период проверки новой версии модели (сек)
+        :param graceful_timeout: ожидание готовности новых и завершения старых воркеров (сек)
+        """
+        self.app = app
+        self.config_path = config_path
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.reload_interval = reload_interval
+        self.graceful_timeout = graceful_timeout
+        # версию модели определяет супервизор: реестр не перезагружается сам
+        self.registry = get_registry(config_path)
+        self.registry.check_interval = float('inf')
+        train_config = load_config(config_path)['train']
+        self.jobs = JobStore(path=train_config['jobs_path'], timeout=train_config['job_timeout'])
+        self._deferred_job = None
+        self.socket = None
+        self.metrics = None
+        # pid -> поколение воркера
+        self._workers: Dict[int, int] = {}
+        self._generation = 0
+        self._pending_version = None
+        self._should_exit = False
+        self._should_reload = False
+
+    def _bind(self) -> socket.socket:
+        """
+        Слушающий сокет, общий для всех поколений воркеров
+        :return: сокет
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _preload(self) -> None:
+        """
+        Загрузка артефактов до fork. OpenMP ограничен одним потоком: пул потоков,
+        созданный до fork, не переносится в дочерний процесс (predict зависнет).
+        Объекты Python замораживаются, чтобы сборщик мусора воркеров не копировал страницы
+        :return: None
+        """
+        with threadpool_limits(limits=1, user_api='openmp'):
+            self.registry.reload(force=True)
+        # метрики загрузки - в снимке супервизора, воркеры начинают с нуля
+        self.metrics.write()
+        gc.collect()
+        gc.freeze()
+
+    def _spawn(self) -> int:
+        """
+        Запуск одного воркера текущего поколения
+        :return: файловый дескриптор готовности (чтение)
+        """
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid:
+            os.close(ready_write)
+            self._workers[pid] = self._generation
+            return ready_read
+
+        # воркер: обработчики сигналов - у uvicorn
+        os.close(ready_read)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        self.metrics.reset()
+        exit_code = 0
+        try:
+            config = uvicorn.Config(self.app, lifespan='on', log_level='info')
+            _WorkerServer(config, ready_fd=ready_write).run(sockets=[self.socket])
+        except BaseException:  # воркер не должен возвращаться в цикл супервизора
+            logger.exception('Воркер %s завершился с ошибкой', os.getpid())
+            exit_code = 1
+        os._exit(exit_code)
+
+    def _wait_ready(self, ready_fds: List[int]) -> bool:
+        """
+        Ожидание готовности воркеров нового поколения
+        :param ready_fds: дескрипторы готовности
+        :return: все воркеры готовы
+        """
+        deadline = time.monotonic() + self.graceful_timeout
+        pending, flg_ready = list(ready_fds), True
+        while pending and time.monotonic() < deadline:
+            readable, _, _ = select.select(pending, [], [], deadline - time.monotonic())
+            for fd in readable:
+                flg_ready &= os.read(fd, 1) == b'1'
+                pending.remove(fd)
+        for fd in ready_fds:
+            os.close(fd)
+        return flg_ready and not pending
+
+    def _stop(self, generation: int = None) -> None:
+        """
+        Мягкая остановка воркеров (SIGTERM), по истечении graceful_timeout - SIGKILL
+        :param generation: поколение (None - все воркеры)
+        :return: None
+        """
+        pids = [pid for pid, gen in self._workers.items() if generation in (None, gen)]
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while pids and time.monotonic() < deadline:
+            pids = [pid for pid in pids if os.waitpid(pid, os.WNOHANG) == (0, 0)]
+            time.sleep(0.05)
+        for pid in pids:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        stopped = [pid for pid, gen in self._workers.items() if generation in (None, gen)]
+        for pid in stopped:
+            del self._workers[pid]
+        self.metrics.archive(stopped)
+
+    def _rollout(self) -> None:
+        """
+        Выкатка новой версии модели: новое поколение воркеров,
+        после его готовности - остановка прежнего
+        :return: None
+        """
+        self._generation += 1
+        gc.unfreeze()
+        self._preload()
+        ready_fds = [self._spawn() for _ in range(self.workers)]
+
+        flg_ready = self._wait_ready(ready_fds)
+        job = self.jobs.active() if flg_ready else None
+        if job is not None and self._workers.get(job['worker_pid']) == self._generation - 1:
+            # обучение запустил прежний воркер, пока поднималось новое поколение:
+            # прежнее поколение остается, повтор выкатки - после завершения обучения
+            logger.info('Идет обучение %s, выкатка отложена до его завершения', job['job_id'])
+            self._deferred_job = job['job_id']
+            self._stop(generation=self._generation)
+            self._generation -= 1
+            self._should_reload = True
+        elif flg_ready:
+            self._stop(generation=self._generation - 1)
+            logger.info('Модель обновлена, поколение воркеров %s', self._generation)
+        else:
+            # новое поколение не поднялось: продолжают работать прежние воркеры,
+            # повторная попытка - при следующей версии модели или по SIGHUP
+            logger.error('Воркеры с новой моделью не запустились, работает прежнее поколение')
+            self._stop(generation=self._generation)
+            self._generation -= 1
+
+    def _reap(self) -> None:
+        """
+        Перезапуск неожиданно завершившихся воркеров текущего поколения
+        :return: None
+        """
+        for pid in list(self._workers):
+            if os.waitpid(pid, os.WNOHANG) != (0, 0):
+                generation = self._workers.pop(pid)
+                self.metrics.archive([pid])
+                if generation == self._generation and not self._should_exit:
+                    logger.warning('Воркер %s завершился, перезапуск', pid)
+                    self._wait_ready([self._spawn()])
+
+    def _training_job(self) -> Optional[str]:
+        """
+        Активная задача обучения (в любом воркере): остановка ее воркера
+        при выкатке прервала бы обучение
+        :return: идентификатор задачи или None
+        """
+        job = self.jobs.active()
+        job_id = None if job is None else job['job_id']
+        if job_id is not None and job_id != self._deferred_job:
+            logger.info('Идет обучение %s, выкатка отложена до его завершения', job_id)
+        self._deferred_job = job_id
+        return job_id
+
+    def _handle_exit(self, signum, frame) -> None:
+        self._should_exit = True
+
+    def _handle_reload(self, signum, frame) -> None:
+        self._should_reload = True
+
+    def run(self) -> None:
+        """
+        Запуск воркеров и цикл супервизора: проверка воркеров и версии модели.
+        SIGHUP - принудительная смена поколения воркеров
+        :return: None
+        """
+        self.socket = self._bind()
+        self.metrics = configure(tempfile.mkdtemp(prefix='metrics_'))
+        self._preload()
+        self._wait_ready([self._spawn() for _ in range(self.workers)])
+        logger.info(
+            'Супервизор %s, воркеров: %s, http://%s:%s',
+            os.getpid(), self.workers, self.host, self.port)
+
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        # версия на диске должна не меняться между двумя проверками:
+        # файлы модели пишутся по очереди, выкатка - после записи всех
+        # и после завершения обучения (отложенные SIGHUP и версия сохраняются)
+        while not self._should_exit:
+            time.sleep(self.reload_interval)
+            self._reap()
+            disk_version = self.registry.disk_version()
+            if (
+                self._should_reload or (
+                    disk_version != self.registry.get().version
+                    and disk_version == self._pending_version
+                )
+            ) and self._training_job() is None:
+                self._should_reload = False
+                self._pending_version = None
+                self._rollout()
+            else:
+                self._pending_version = disk_version
+
+        self._stop()
+        self.socket.close()
+        shutil.rmtree(self.metrics.path, ignore_errors=True)
+
+
+def serve(app, config_path: str) -> None:
+    """
+    Запуск сервиса по секции serving конфигурации:
+    один воркер - uvicorn в текущем процессе, несколько - супервизор
+    :param app: ASGI приложение
+    :param config_path: путь до конфигурационного файла
+    :return: None
+    """
+    serving_config = load_config(config_path)['serving']
+    if serving_config['workers'] <= 1:
+        uvicorn.run(app, host=serving_config['host'], port=serving_config['port'])
+        return
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:     %(message)s')
+    WorkerSupervisor(app=app, config_path=config_path, **serving_config).run()
@@ -0,0 +1,146 @@
+"""
+Программа: Кросс-валидация с переиспользованием Dataset LightGBM
+и параллельным обучением фолдов
+Версия: 1.0
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import optuna
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold
+
+
+class CVEngine:
+    """
+    Разбиение на фолды и бинаризация признаков (lgb.Dataset) выполняются один раз
+    за обучение и переиспользуются всеми trials optuna.
+    Фолды одного trial обучаются параллельно в пределах заданного числа потоков
+    """
+
+    def __init__(
+        self,
+        data_x: pd.DataFrame,
+        data_y: pd.Series,
+        n_folds: int = 5,
+        random_state: int = 10,
+        n_threads: int = 1,
+        early_stopping_rounds: int = 50,
+        report_every: int = 10,
+    ):
+        """
+        :param data_x: данные объект-признаки
+        :param data_y: данные с целевой переменной
+        :param n_folds: кол-во фолдов
+        :param random_state: random_state
+        :param n_threads: кол-во потоков на один trial (делится между фолдами)
+        :param early_stopping_rounds: остановка фолда, если MAE на валидации
+        не улучшалась заданное кол-во деревьев
+        :param report_every: период (в деревьях) передачи промежуточных значений optuna;
+        каждая передача - запись в хранилище study
+        """
+        self.n_folds = n_folds
+        self.early_stopping_rounds = early_stopping_rounds
+        self.report_every = report_every
+        # фолды идут параллельно, на каждый - поровну потоков, без переподписки ядер
+        self.n_parallel = max(1, min(n_folds, n_threads))
+        self.threads_per_fold = max(1, n_threads // self.n_parallel)
+
+        cv = KFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+        self.folds = list(cv.split(data_x, data_y))
+
+        # общие бины для всех фолдов: train/valid - подмножества одного Dataset
+        full = lgb.Dataset(
+            data_x, label=data_y, free_raw_data=False, params={'verbose': -1}
+        ).construct()
+        self.datasets: List[Tuple[lgb.Dataset, lgb.Dataset]] = [
+            (full.subset(train_idx).construct(), full.subset(valid_idx).construct())
+            for train_idx, valid_idx in self.folds
+        ]
+
+    def _fit_fold(
+        self,
+        idx: int,
+        params: dict,
+        num_boost_round: int,
+        trial: optuna.Trial,
+        stop_event: threading.Event,
+    ) -> Tuple[float, int, float]:
+        """
+        Обучение одного фолда с ранней остановкой
+        :param idx: номер фолда
+        :param params: параметры LightGBM
+        :param num_boost_round: максимальное кол-во деревьев
+        :param trial: trial optuna (промежуточные значения передает только фолд 0)
+        :param stop_event: сигнал остановки, если trial отсечен
+        :return: лучшая MAE на валидации, кол-во деревьев для нее, время обучения (сек)
+        """
+        started = time.perf_counter()
+        train_set, valid_set = self.datasets[idx]
+
+        booster = lgb.Booster(params=params, train_set=train_set)
+        booster.add_valid(valid_set, 'valid')
+
+        best_score, best_iteration = np.inf, 0
+        for iteration in range(num_boost_round):
+            if stop_event.is_set():
+                break
+            booster.update()
+            score = booster.eval_valid()[0][2]
+
+            if score < best_score:
+                best_score, best_iteration = score, iteration + 1
+            elif iteration + 1 - best_iteration >= self.early_stopping_rounds:
+                break
+
+            # как LightGBMPruningCallback: значения optuna учитывает только для одного фолда
+            if idx == 0 and (iteration + 1) % self.report_every == 0:
+                trial.report(score, step=iteration)
+                if trial.should_prune():
+                    stop_event.set()
+                    break
+
+        return best_score, best_iteration, time.perf_counter() - started
+
+    def evaluate(self, trial: optuna.Trial, params: dict, num_boost_round: int) -> float:
+        """
+        Кросс-валидация набора параметров.
+        Среднее по фолдам лучшее кол-во деревьев сохраняется в trial (best_iteration)
+        :param trial: trial optuna
+        :param params: параметры LightGBM
+        :param num_boost_round: максимальное кол-во деревьев
+        :return: среднее значение MAE по фолдам
+        """
+        started = time.perf_counter()
+        params = {
+            **params,
+            'metric': 'l1',
+            'num_threads': self.threads_per_fold,
+            'verbose': -1,
+        }
+        stop_event = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=self.n_parallel) as executor:
+            futures = [
+                executor.submit(
+                    self._fit_fold, idx, params, num_boost_round, trial, stop_event
+                )
+                for idx in range(self.n_folds)
+            ]
+            results = [future.result() for future in futures]
+
+        scores = [score for score, _, _ in results]
+        trial.set_user_attr(
+            'best_iteration', int(round(np.mean([iteration for _, iteration, _ in results])))
+        )
+        trial.set_user_attr('fold_seconds', [round(seconds, 4) for _, _, seconds in results])
+        trial.set_user_attr('trial_seconds', round(time.perf_counter() - started, 4))
+
+        if stop_event.is_set():
+            raise optuna.TrialPruned()
+        return float(np.mean(scores))
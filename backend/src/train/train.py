@@ -3,36 +3,34 @@
 Версия: 1.0
 """
 
+import os
+import hashlib
 import optuna
 from optuna import Study
 from lightgbm import LGBMRegressor
 
-from sklearn.model_selection import KFold
-from sklearn.metrics import mean_absolute_error
 import pandas as pd
-import numpy as np
 from ..data.split_dataset import get_train_test_data
+from .cv import CVEngine
 from ..train.metrics import save_metrics
 
 
 def objective(
     trial,
-    data_x: pd.DataFrame,
-    data_y: pd.Series,
-    n_folds: int = 5,
+    cv_engine: CVEngine,
     random_state: int = 10,
-) -> np.array:
+    n_estimators_max: int = 2000,
+) -> float:
     """
-    Целевая функция для поиска параметров
+    Целевая функция для поиска параметров.
+    Кол-во деревьев не перебирается: его определяет ранняя остановка на фолдах
     :param trial: кол-во trials
-    :param data_x: данные объект-признаки
-    :param data_y: данные с целевой переменной
-    :param n_folds: кол-во фолдов
+    :param cv_engine: фолды и Dataset LightGBM, общие для всех trials
     :param random_state: random_state
+    :param n_estimators_max: максимальное кол-во деревьев
     :return: среднее значение метрики по фолдам
     """
     lgb_params = {
-        'n_estimators': trial.suggest_categorical('n_estimators', [100]),
         'learning_rate': trial.suggest_float('learning_rate', 0.001, 0.3, log=True),
         'num_leaves': trial.suggest_int('num_leaves', 20, 1000, step=20),
         'max_depth': trial.suggest_int('max_depth', 4, 15),
@@ -50,36 +48,68 @@ def objective(
         'random_state': trial.suggest_categorical('random_state', [random_state])
     }
 
-    cv = KFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    return cv_engine.evaluate(trial=trial, params=lgb_params, num_boost_round=n_estimators_max)
 
-    cv_predicts = np.empty(n_folds)
-    for idx, (train_idx, test_idx) in enumerate(cv.split(data_x, data_y)):
-        X_train, X_test = data_x.iloc[train_idx], data_x.iloc[test_idx]
-        y_train, y_test = data_y.iloc[train_idx], data_y.iloc[test_idx]
 
-        pruning_callback = optuna.integration.LightGBMPruningCallback(
-            trial, metric='l1')
-        model = LGBMRegressor(**lgb_params)
-        model.fit(X_train,
-                  y_train,
-                  eval_set=[(X_test, y_test)],
-                  eval_metric='mae',
-                  callbacks=[pruning_callback]
-                  )
+def get_best_params(study: Study) -> dict:
+    """
+    Лучшие параметры study вместе с кол-вом деревьев из ранней остановки
+    :param study: study optuna
+    :return: параметры для LGBMRegressor
+    """
+    best_params = dict(study.best_params)
+    # у trials до ранней остановки n_estimators был параметром перебора
+    best_iteration = study.best_trial.user_attrs.get('best_iteration')
+    if best_iteration is not None:
+        best_params['n_estimators'] = best_iteration
+    return best_params
+
+
+def data_fingerprint(data: pd.DataFrame) -> str:
+    """
+    Отпечаток датасета: столбцы, типы и значения (порядок строк учитывается)
+    :param data: датасет
+    :return: короткий хэш
+    """
+    digest = hashlib.blake2b(digest_size=6)
+    digest.update(repr([(col, str(dtype)) for col, dtype in data.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
 
-        preds = model.predict(X_test)
-        cv_predicts[idx] = mean_absolute_error(y_test, preds)
 
-    return np.mean(cv_predicts)
+def get_study(study_name: str, storage: str, flg_resume: bool = True) -> Study:
+    """
+    Study optuna в постоянном хранилище (например, sqlite-файл):
+    подбор можно продолжить, дополнить trials и просмотреть без unpickling
+    :param study_name: название study
+    :param storage: URL хранилища
+    :param flg_resume: продолжить существующий study (иначе начать заново)
+    :return: Study
+    """
+    engine_kwargs = None
+    if storage.startswith('sqlite'):
+        # параллельные trials пишут в один файл: ждем блокировку, а не падаем
+        engine_kwargs = {'connect_args': {'timeout': 60}}
+    storage = optuna.storages.RDBStorage(url=storage, engine_kwargs=engine_kwargs)
+
+    if not flg_resume and study_name in [
+        summary.study_name for summary in optuna.get_all_study_summaries(storage=storage)
+    ]:
+        optuna.delete_study(study_name=study_name, storage=storage)
+
+    return optuna.create_study(
+        direction='minimize', study_name=study_name, storage=storage, load_if_exists=True
+    )
 
 
 def find_optimal_params(
-    data_train: pd.DataFrame, data_test: pd.DataFrame, **kwargs
+    data_train: pd.DataFrame, data_test: pd.DataFrame, callbacks: list = None, **kwargs
 ) -> Study:
     """
     Пайплайн для тренировки модели
     :param data_train: датасет train
     :param data_test: датасет test
+    :param callbacks: callbacks optuna, вызываемые после каждого trial
     :param kwargs: переменная
     :return: [LGBMRegressor tuning, Study]
     """
@@ -87,11 +117,36 @@ def find_optimal_params(
         data_train=data_train, data_test=data_test, target=kwargs['target_column']
     )
 
-    study = optuna.create_study(direction='minimize', study_name='LGBM')
+    # study своего набора данных и признаков: лучшие trials прошлых выгрузок
+    # не попадают в дообучение, MAE в study сравнимы между собой.
+    # flg_resume_study продолжает только study на тех же данных (после отмены/сбоя)
+    study = get_study(
+        study_name=f'{kwargs["study_name"]}_{data_fingerprint(data_train)}',
+        storage=kwargs['study_storage'],
+        flg_resume=kwargs['flg_resume_study'],
+    )
+
+    # trials идут параллельно в потоках (LightGBM отпускает GIL),
+    # ядра делятся между ними поровну, внутри trial - между фолдами
+    n_jobs = kwargs['n_jobs']
+    cv_engine = CVEngine(
+        data_x=x_train,
+        data_y=y_train,
+        n_folds=kwargs['n_folds'],
+        random_state=kwargs['random_state'],
+        n_threads=max(1, (kwargs['n_threads'] or os.cpu_count() or 1) // n_jobs),
+        early_stopping_rounds=kwargs['early_stopping_rounds'],
+    )
     function = lambda trial: objective(
-        trial, x_train, y_train, kwargs['n_folds'], kwargs['random_state']
+        trial, cv_engine, kwargs['random_state'], kwargs['n_estimators_max']
+    )
+    study.optimize(
+        function,
+        n_trials=kwargs['n_trials'],
+        n_jobs=n_jobs,
+        callbacks=callbacks,
+        show_progress_bar=True
     )
-    study.optimize(function, n_trials=kwargs['n_trials'], show_progress_bar=True)
     return study
 
 
@@ -115,7 +170,8 @@ def train_model(
         data_train=data_train, data_test=data_test, target=target
     )
 
-    lgbm = LGBMRegressor(**study.best_params, silent=True)
+    # дообучение на всем train с усредненным по фолдам лучшим кол-вом деревьев
+    lgbm = LGBMRegressor(**get_best_params(study), silent=True)
     lgbm.fit(x_train, y_train)
 
     save_metrics(data_x=x_test, data_y=y_test, model=lgbm, metric_path=metric_path)
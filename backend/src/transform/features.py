@@ -0,0 +1,134 @@
+"""
+Программа: Единый движок признаков - одно numpy-ядро для батчей (столбцы датасета)
+и для одиночных записей (словари -> массивы): признаки совпадают побитово
+Версия: 1.0
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union
+import numpy as np
+import pandas as pd
+
+# исходные поля, из которых строятся новые признаки
+DATE_COLUMN = 'Date'
+DERIVED_SOURCES = ('NO2_trop', 'NO2_total')
+KELVIN = 273.15
+
+
+@lru_cache(maxsize=32)
+def category_dtype(categories: Tuple[str, ...]) -> pd.CategoricalDtype:
+    """
+    Тип category с категориями train; строится один раз на набор категорий,
+    а не на каждую запись
+    :param categories: категории
+    :return: тип category
+    """
+    return pd.CategoricalDtype(list(categories))
+
+
+def derive_features(columns: Dict[str, np.ndarray], dtypes: dict = None) -> Dict[str, np.ndarray]:
+    """
+    Feature engineering на массивах: месяц и год из даты, NO2_ratio,
+    Sum_Concentration, перевод LST из Кельвинов в Цельсии.
+    Массивы приводятся к типам плана до вычислений (float32 считается в float32)
+    :param columns: {признак: массив} с исходными полями (изменяется)
+    :param dtypes: {признак: тип} из плана типов (нет в плане - float64/int64)
+    :return: тот же словарь с новыми признаками и без исходных полей даты и NO2
+    """
+    dtypes = dtypes or {}
+    for col, values in columns.items():
+        if col != DATE_COLUMN and values.dtype.kind in 'fiub':
+            columns[col] = values.astype(dtypes.get(col, 'float64'), copy=False)
+
+    dates = columns.pop(DATE_COLUMN).astype('datetime64[M]')
+    months = dates.astype(np.int64)
+    columns['month'] = (months % 12 + 1).astype(dtypes.get('month', 'int64'))
+    columns['year'] = (months // 12 + 1970).astype(dtypes.get('year', 'int64'))
+
+    no2_trop = columns.pop('NO2_trop')
+    no2_total = columns.pop('NO2_total')
+    no2_strat = columns['NO2_strat']
+    # деление на 0 дает inf/NaN, как в pandas
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['NO2_ratio'] = (no2_trop / no2_strat).astype(
+            dtypes.get('NO2_ratio', 'float64'), copy=False)
+    columns['Sum_Concentration'] = (no2_strat + no2_total + no2_trop).astype(
+        dtypes.get('Sum_Concentration', 'float64'), copy=False)
+
+    lst = columns['LST']
+    columns['LST'] = lst - lst.dtype.type(KELVIN)
+    return columns
+
+
+def fill_missing(columns: Dict[str, np.ndarray], fill_values: dict) -> Dict[str, np.ndarray]:
+    """
+    Заполнение пропусков статистиками train значением того же типа, что и массив
+    :param columns: {признак: массив} (изменяется)
+    :param fill_values: {признак: значение}
+    :return: тот же словарь
+    """
+    for col, value in fill_values.items():
+        values = columns.get(col)
+        if values is None or values.dtype.kind != 'f':
+            continue
+        missing = np.isnan(values)
+        if missing.any():
+            columns[col] = np.where(missing, values.dtype.type(value), values)
+    return columns
+
+
+def frame_features(data: pd.DataFrame, dtypes: dict = None) -> pd.DataFrame:
+    """
+    Батчевый путь: столбцы датасета -> ядро -> столбцы того же датасета
+    :param data: датасет с исходными полями (изменяется на месте)
+    :param dtypes: {признак: тип} из плана типов
+    :return: тот же датасет с новыми признаками
+    """
+    sources = (DATE_COLUMN, 'NO2_strat', 'LST') + DERIVED_SOURCES
+    columns = derive_features(
+        {col: data[col].to_numpy() for col in sources}, dtypes=dtypes)
+    for col in (DATE_COLUMN,) + DERIVED_SOURCES:
+        del data[col]
+    for col, values in columns.items():
+        data[col] = values
+    return data
+
+
+def record_features(
+    records: List[dict],
+    column_sequence: list,
+    categories: Dict[str, list] = None,
+    dtypes: dict = None,
+    fill_values: dict = None,
+    flg_frame: bool = True,
+) -> Union[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Путь для одиночных записей: словари -> массивы -> ядро, без промежуточного
+    датасета с исходными полями. None в числовых полях становится NaN
+    :param records: записи с исходными полями (как в запросе)
+    :param column_sequence: порядок признаков из train
+    :param categories: {признак: категории train} для строковых признаков
+    :param dtypes: {признак: тип} из плана типов
+    :param fill_values: {признак: значение} для заполнения пропусков
+    :param flg_frame: собрать датасет (False - словарь массивов для нативного бустера,
+    без затрат на создание DataFrame)
+    :return: датасет признаков в порядке train
+    """
+    categories = categories or {}
+    columns = {}
+    for col in records[0]:
+        values = [record[col] for record in records]
+        if col == DATE_COLUMN:
+            columns[col] = np.array(values, dtype='datetime64[ns]')
+        elif col in categories:
+            columns[col] = pd.Categorical(
+                values, dtype=category_dtype(tuple(categories[col])))
+        else:
+            columns[col] = np.array(values, dtype=(dtypes or {}).get(col, 'float64'))
+
+    columns = derive_features(columns, dtypes=dtypes)
+    assert set(column_sequence) == set(columns), 'Разные признаки'
+    if fill_values:
+        fill_missing(columns, fill_values)
+    columns = {col: columns[col] for col in column_sequence}
+    return pd.DataFrame(columns) if flg_frame else columns
@@ -0,0 +1,148 @@
+"""
+Программа: Заполнение пропусков статистиками, обученными на train
+Версия: 1.0
+"""
+
+import os
+import json
+import argparse
+import yaml
+import pandas as pd
+from .features import fill_missing
+
+
+class FillnaImputer:
+    """
+    Медианы/средние считаются один раз на train (fit) и сохраняются рядом с моделью;
+    на инференсе заполнение пропусков - поиск значения по словарю (transform)
+    """
+
+    def __init__(self, list_median: list, list_mean: list, target_column: str = None):
+        """
+        :param list_median: список с признаками, необходимых заполнить медианой
+        :param list_mean: список с признаками, необходимых заполнить средними
+        :param target_column: целевая переменная (заполняется медианой)
+        """
+        self.list_median = list_median
+        self.list_mean = list_mean
+        self.target_column = target_column
+        self.fill_values = None
+
+    def fit(self, data: pd.DataFrame) -> 'FillnaImputer':
+        """
+        Расчет статистик для заполнения пропусков
+        :param data: train датасет после feature engineering
+        :return: self
+        """
+        fill_values = {col: data[col].median() for col in self.list_median}
+        fill_values.update({col: data[col].mean() for col in self.list_mean})
+        if self.target_column is not None and self.target_column in data:
+            fill_values[self.target_column] = data[self.target_column].median()
+
+        self.fill_values = {col: float(value) for col, value in fill_values.items()}
+        return self
+
+    def transform(self, data: pd.DataFrame, flg_inplace: bool = False) -> pd.DataFrame:
+        """
+        Заполнение пропусков сохраненными статистиками
+        :param data: датасет
+        :param flg_inplace: заполнить на месте, без копии датасета
+        :return: датасет без пропусков в заданных признаках
+        """
+        assert self.fill_values is not None, 'Статистики для пропусков не рассчитаны'
+        values = {col: value for col, value in self.fill_values.items() if col in data}
+        if not flg_inplace:
+            data = data.copy()
+        # общее с одиночными записями ядро: значение того же типа, что и столбец,
+        # float32 не повышается до float64
+        columns = {col: data[col].to_numpy() for col in values}
+        for col, filled in fill_missing(dict(columns), values).items():
+            if filled is not columns[col]:
+                data[col] = filled
+        return data
+
+    def save(self, imputer_path: str) -> None:
+        """
+        Сохранение статистик
+        :param imputer_path: путь до файла со статистиками
+        :return: None
+        """
+        state = {
+            'list_median': self.list_median,
+            'list_mean': self.list_mean,
+            'target_column': self.target_column,
+            'fill_values': self.fill_values,
+        }
+        tmp_path = f'{imputer_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, imputer_path)
+
+    @classmethod
+    def from_schema(cls, schema: dict, list_median: list, list_mean: list) -> 'FillnaImputer':
+        """
+        Запасные статистики из схемы train, если файла статистик нет (модель обучена
+        до FillnaImputer): медианы train (q50). Средних в схеме нет - для list_mean
+        тоже берется медиана. Без заполнения модель, обученная на данных без пропусков,
+        отправляет NaN в ветку нуля
+        :param schema: схема признаков train
+        :param list_median: список с признаками, необходимых заполнить медианой
+        :param list_mean: список с признаками, необходимых заполнить средними
+        :return: FillnaImputer со статистиками
+        """
+        imputer = cls(list_median=list_median, list_mean=list_mean)
+        imputer.fill_values = {
+            col: float(schema['numeric'][col]['q50'])
+            for col in list_median + list_mean if col in schema['numeric']
+        }
+        return imputer
+
+    @classmethod
+    def load(cls, imputer_path: str) -> 'FillnaImputer':
+        """
+        Загрузка сохраненных статистик
+        :param imputer_path: путь до файла со статистиками
+        :return: обученный FillnaImputer
+        """
+        with open(imputer_path) as file:
+            state = json.load(file)
+
+        imputer = cls(
+            list_median=state['list_median'],
+            list_mean=state['list_mean'],
+            target_column=state['target_column'],
+        )
+        imputer.fill_values = state['fill_values']
+        return imputer
+
+
+def main() -> None:
+    """
+    Расчет статистик пропусков по размеченному датасету в исходном формате
+    (тот же конвейер, что и при обучении) из командной строки
+    :return: None
+    """
+    # конвейер предобработки импортирует этот модуль
+    from .transform import pipeline_preprocess
+    from ..data.get_data import get_dataset
+
+    parser = argparse.ArgumentParser(description='статистики пропусков train -> json')
+    parser.add_argument('dataset_path', help='путь до train в исходном формате')
+    parser.add_argument('--config', default='../config/params.yml')
+    args = parser.parse_args()
+
+    with open(args.config) as file:
+        preprocessing_config = yaml.load(file, Loader=yaml.FullLoader)['preprocessing']
+
+    imputer = FillnaImputer(list_median=preprocessing_config['list_median'],
+                            list_mean=preprocessing_config['list_mean'],
+                            target_column=preprocessing_config['target_column'])
+    pipeline_preprocess(
+        data=get_dataset(dataset_path=args.dataset_path), flg_evaluate=False,
+        imputer=imputer, flg_fit=True, **preprocessing_config)
+    imputer.save(preprocessing_config['imputer_path'])
+    print(f'{args.dataset_path} -> {preprocessing_config["imputer_path"]}: {imputer.fill_values}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Программа: Компактная схема признаков обученной модели
+(порядок столбцов, типы, категории, диапазоны числовых признаков)
+Версия: 1.0
+"""
+
+import os
+import json
+import threading
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+
+SCHEMA_VERSION = 1
+QUANTILES = {'q05': 0.05, 'q25': 0.25, 'q50': 0.5, 'q75': 0.75, 'q95': 0.95}
+
+_SCHEMA_CACHE: Dict[str, Tuple[int, dict]] = {}
+_SCHEMA_LOCK = threading.Lock()
+
+
+def _bin_edges(stats: dict) -> list:
+    """
+    Границы квантильных корзин (-inf, q05], (q05, q25], ..., (q95, +inf);
+    совпадающие квантили (например, много нулевых осадков) схлопываются
+    :param stats: статистики числового признака из схемы
+    :return: возрастающий список уникальных границ
+    """
+    return sorted({stats[name] for name in QUANTILES})
+
+
+def _bin_shares(values: pd.Series, edges: list) -> np.ndarray:
+    """
+    Доли значений по квантильным корзинам
+    :param values: значения признака
+    :param edges: границы корзин
+    :return: доли по корзинам
+    """
+    bins = np.searchsorted(edges, values.to_numpy(dtype=float), side='left')
+    return np.bincount(bins, minlength=len(edges) + 1) / max(len(values), 1)
+
+
+def _level_shares(stats: dict) -> list:
+    """
+    Доли корзин по уровням квантилей - для схем без сохраненных долей
+    :param stats: статистики числового признака из схемы
+    :return: ожидаемые доли по корзинам
+    """
+    levels = {}
+    for name, level in QUANTILES.items():
+        levels[stats[name]] = level
+    return np.diff([0.0] + list(levels.values()) + [1.0]).tolist()
+
+
+def _numeric_stats(values: pd.Series) -> dict:
+    """
+    Диапазон и квантили числового признака
+    :param values: значения признака
+    :return: статистики
+    """
+    # python-типы, чтобы слайдеры streamlit получали int для целочисленных признаков
+    cast = int if pd.api.types.is_integer_dtype(values) else float
+    quantiles = values.quantile(list(QUANTILES.values())).tolist()
+    return {
+        'min': cast(values.min()),
+        'max': cast(values.max()),
+        **{name: float(value) for name, value in zip(QUANTILES, quantiles)},
+    }
+
+
+def build_schema(
+    data: pd.DataFrame, drop_columns: list, target_column: str, raw_data: pd.DataFrame = None
+) -> dict:
+    """
+    Построение схемы признаков по train датасету
+    :param data: предобработанный train датасет
+    :param drop_columns: список с признаками для удаления
+    :param target_column: целевая переменная
+    :param raw_data: исходный train датасет - диапазоны полей для ввода данных
+    (LST в Кельвинах, NO2_trop/NO2_total, дата)
+    :return: схема признаков
+    """
+    features = data.drop(
+        columns=[drop_columns[0]] + [target_column], axis=1, errors='ignore')
+
+    categories = {
+        col: features[col].cat.categories.tolist()
+        for col in features.select_dtypes(['category']).columns
+    }
+
+    numeric = {}
+    for col in features.select_dtypes(['number']).columns:
+        numeric[col] = _numeric_stats(features[col])
+        # фактические доли train по квантильным корзинам - эталон для поиска сдвига
+        # (из-за заполнения пропусков одним значением они не равны уровням квантилей)
+        numeric[col]['shares'] = [
+            round(share, 6)
+            for share in _bin_shares(features[col], _bin_edges(numeric[col])).tolist()
+        ]
+
+    schema = {
+        'version': SCHEMA_VERSION,
+        'columns': features.columns.tolist(),
+        'dtypes': {col: str(dtype) for col, dtype in features.dtypes.items()},
+        'categories': categories,
+        'numeric': numeric,
+    }
+
+    if raw_data is not None:
+        raw = raw_data.drop(
+            columns=[drop_columns[0]] + [target_column], axis=1, errors='ignore')
+        dates = pd.to_datetime(raw[drop_columns[1]])
+        schema['raw'] = {
+            'numeric': {
+                col: _numeric_stats(raw[col]) for col in raw.select_dtypes(['number']).columns
+            },
+            'dates': {
+                drop_columns[1]: {
+                    'min': dates.min().date().isoformat(),
+                    'max': dates.max().date().isoformat(),
+                }
+            },
+        }
+    return schema
+
+
+def save_schema(schema: dict, schema_path: str) -> None:
+    """
+    Сохранение схемы признаков
+    :param schema: схема признаков
+    :param schema_path: путь до файла со схемой
+    :return: None
+    """
+    tmp_path = f'{schema_path}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(schema, file)
+    os.replace(tmp_path, schema_path)
+
+
+def load_schema(schema_path: str) -> dict:
+    """
+    Загрузка схемы признаков; файл перечитывается только при изменении mtime
+    :param schema_path: путь до файла со схемой
+    :return: схема признаков
+    """
+    mtime = os.stat(schema_path).st_mtime_ns
+    with _SCHEMA_LOCK:
+        cached = _SCHEMA_CACHE.get(schema_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(schema_path) as json_file:
+        schema = json.load(json_file)
+    assert schema.get('version') == SCHEMA_VERSION, 'Неподдерживаемая версия схемы'
+
+    with _SCHEMA_LOCK:
+        _SCHEMA_CACHE[schema_path] = (mtime, schema)
+    return schema
+
+
+def schema_drift(data: pd.DataFrame, schema: dict) -> dict:
+    """
+    Сдвиг распределения новых данных относительно train.
+    Для непрерывных признаков - PSI по квантильным корзинам схемы
+    (month/year и прочие целочисленные пропускаются: новая выгрузка всегда за узкий период),
+    для категориальных - значения, которых не было в train
+    :param data: предобработанный датасет с новыми данными
+    :param schema: схема признаков train
+    :return: {'psi': {признак: PSI}, 'unknown_categories': {признак: [значения]}}
+    """
+    psi = {}
+    for col, stats in schema['numeric'].items():
+        if col not in data or schema['dtypes'][col].startswith('int'):
+            continue
+        edges = _bin_edges(stats)
+        expected = np.array(stats.get('shares') or _level_shares(stats))
+        actual = _bin_shares(data[col], edges)
+
+        # пустые корзины не дают log(0)
+        actual = np.clip(actual, 1e-4, None)
+        expected = np.clip(expected, 1e-4, None)
+        psi[col] = float(np.sum((actual - expected) * np.log(actual / expected)))
+
+    unknown_categories = {}
+    for col, categories in schema['categories'].items():
+        if col not in data:
+            continue
+        unknown = set(data[col].dropna().astype(str).unique()) - set(categories)
+        if unknown:
+            unknown_categories[col] = sorted(unknown)
+
+    return {'psi': psi, 'unknown_categories': unknown_categories}
@@ -7,6 +7,10 @@
 import json
 import warnings
 import pandas as pd
+from .schema import load_schema
+from .imputer import FillnaImputer
+from .features import frame_features, record_features
+from ..monitoring.metrics import stage_timer
 
 warnings.filterwarnings('ignore')
 
@@ -30,20 +34,22 @@ def save_unique_for_train(
 
 
 def check_columns_evaluate(data: pd.DataFrame,
-                           unique_values_path: str) -> pd.DataFrame:
+                           schema_path: str,
+                           column_sequence: list = None) -> pd.DataFrame:
     """
     Проверка на наличие признаков из train
     и упорядочивание признаков согласно train
     param: data: test датасет
-    param: unique_values_path: путь до списка с признаками из train
+    param: schema_path: путь до схемы признаков из train
+    param: column_sequence: уже загруженный порядок признаков (без чтения файла)
     return: test датасет
     """
-    with open(unique_values_path) as json_file:
-        unique_values = json.load(json_file)
-
-    column_sequence = unique_values.keys()
+    if column_sequence is None:
+        column_sequence = load_schema(schema_path)['columns']
 
     assert set(column_sequence) == set(data.columns), 'Разные признаки'
+    if list(data.columns) == list(column_sequence):
+        return data
     return data[column_sequence]
 
 
@@ -56,29 +62,48 @@ def transform_types(data: pd.DataFrame, change_type_columns: dict) -> pd.DataFra
     return data.astype(change_type_columns, errors='raise')
 
 
-def feature_engineering(data: pd.DataFrame, **kwargs):
+def get_dtype_plan(dtype_plan: dict = None) -> dict:
+    """
+    План типов из конфигурации {тип: [признаки]} -> {признак: тип}
+    param: dtype_plan: план типов (preprocessing.dtype_plan)
+    return: словарь с признаками и типами данных
+    """
+    return {col: dtype for dtype, columns in (dtype_plan or {}).items() for col in columns}
+
+
+def cast_columns(data: pd.DataFrame, change_type_columns: dict) -> pd.DataFrame:
+    """
+    Приведение типов по столбцам на месте: в отличие от astype по всему датасету
+    копируются только столбцы, у которых тип действительно меняется
+    param: data: датасет (изменяется)
+    param: change_type_columns: словарь с признаками и типами данных
+    return: тот же датасет
     """
-    Feature engineering
+    for col, dtype in change_type_columns.items():
+        if col in data and data[col].dtype != dtype:
+            data[col] = data[col].astype(dtype)
+    return data
+
+
+def feature_engineering(data: pd.DataFrame, flg_copy: bool = True, **kwargs):
+    """
+    Feature engineering (месяц/год, NO2_ratio, Sum_Concentration, LST в Цельсиях)
+    общим numpy-ядром, тем же, что и для одиночных записей
     :param data: датасет
+    :param flg_copy: работать с копией (False - датасет уже принадлежит вызывающему
+    и изменяется на месте)
     :param kwargs: переменная
     :return: новые признаки
     """
-    # разобьем столбец с датой на два: месяц и год
-    data['month'] = data['Date'].dt.month
-    data['year'] = data['Date'].dt.year
-
-    # создадим новый признак, который будет указывать на соотношение
-    # тропосфреной и стратосферной концентраций
-    data['NO2_ratio'] = data['NO2_trop'] / data['NO2_strat']
-
-    # создадим признак суммарной концентрации
-    data["Sum_Concentration"] = data["NO2_strat"] + data["NO2_total"] + data["NO2_trop"]
+    if flg_copy:
+        data = data.copy()
 
-    # переведем градусы Кельвина в градусы Цельсия
-    data['LST'] = data['LST'] - 273.15
+    data = frame_features(data, dtypes=get_dtype_plan(kwargs.get('dtype_plan')))
 
-    # удалим лишние признаки
-    data = data.drop(kwargs['drop_columns'][1:], axis=1)
+    # удалим лишние признаки (без копирования оставшихся столбцов)
+    for col in kwargs['drop_columns'][1:]:
+        if col in data:
+            del data[col]
 
     return data
 
@@ -90,62 +115,101 @@ def fillna_data(data: pd.DataFrame, list_median: list, list_mean: list):
     list_median: список с признаками, необходимых заполнить медианой
     list_mean: список с признаками, необходимых заполнить средними
     """
-    for m in list_median:
-        data[m] = data[m].fillna(data[m].median())
+    imputer = FillnaImputer(list_median=list_median, list_mean=list_mean)
+    return imputer.fit(data).transform(data)
 
-    for n in list_mean:
-        data[n] = data[n].fillna(data[n].mean())
 
-    return data
-
-
-def pipeline_preprocess(data: pd.DataFrame, flg_evaluate: bool = True, **kwargs):
+def category_columns(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Перевод строковых признаков в category на месте
+    :param data: датасет (изменяется)
+    :return: тот же датасет
     """
+    return cast_columns(
+        data, {key: 'category' for key in data.select_dtypes(['object']).columns})
+
+
+def pipeline_preprocess(
+        data: pd.DataFrame,
+        flg_evaluate: bool = True,
+        column_sequence: list = None,
+        imputer: FillnaImputer = None,
+        flg_fit: bool = False,
+        **kwargs
+):
+    """
+    Датасет копируется один раз (при удалении лишних столбцов), дальше все шаги
+    работают с этой копией на месте: исходный датасет вызывающего не изменяется
     params: data: датасет
     params: flg_evaluate: флаг для evaluate
+    params: column_sequence: порядок признаков из train (из реестра модели)
+    params: imputer: статистики для заполнения пропусков, обученные на train
+    params: flg_fit: обучить imputer на переданном датасете (только для train)
     return: итоговый датасет
     """
-    data = data.drop(kwargs['drop_columns'][0], axis=1, errors='ignore')
-    data = data.drop(kwargs['bins_columns'], axis=1, errors='ignore')
-
-    data = transform_types(data=data,
-                           change_type_columns=kwargs['change_type_columns'])
-
-    data = feature_engineering(data=data, **kwargs)
-
-    data = fillna_data(data=data, list_median=kwargs['list_median'], list_mean=kwargs['list_mean'])
-
-    if kwargs['target_column'] in data:
-        data[kwargs['target_column']] = (data[kwargs['target_column']]
-                                         .fillna(data[kwargs['target_column']].median()))
-
-    dict_category = {key: 'category' for key in data.select_dtypes(['object']).columns}
-    data = transform_types(data=data, change_type_columns=dict_category)
+    data = data.drop(
+        columns=[kwargs['drop_columns'][0]] + kwargs['bins_columns'], errors='ignore')
+
+    # спутниковые признаки в float32 до feature engineering: новые признаки
+    # сразу считаются в float32, без промежуточных float64 столбцов
+    dtype_plan = get_dtype_plan(kwargs.get('dtype_plan'))
+    cast_columns(data, {**kwargs['change_type_columns'], **dtype_plan})
+
+    data = feature_engineering(data=data, flg_copy=False, **kwargs)
+
+    if flg_fit:
+        if imputer is None:
+            imputer = FillnaImputer(list_median=kwargs['list_median'],
+                                    list_mean=kwargs['list_mean'],
+                                    target_column=kwargs['target_column'])
+        imputer.fit(data)
+    # imputer передает реестр: статистики train из файла или запасные из схемы,
+    # одни и те же для файлов и записей (статистики по самому датасету дали бы
+    # файлу и записи разные признаки). Модель обучена на данных без пропусков:
+    # незаполненный NaN LightGBM отправляет в ветку нуля
+    if imputer is not None:
+        imputer.transform(data, flg_inplace=True)
+
+    category_columns(data)
 
     if flg_evaluate:
-        data = check_columns_evaluate(
-            data=data, unique_values_path=kwargs['unique_values_path'])
-    else:
-        save_unique_for_train(
-            data=data,
-            drop_columns=kwargs['drop_columns'],
-            target_column=kwargs['target_column'],
-            unique_values_path=kwargs['unique_values_path'])
+        with stage_timer('check_columns'):
+            data = check_columns_evaluate(
+                data=data,
+                schema_path=kwargs['schema_path'],
+                column_sequence=column_sequence)
 
     return data
 
 
-def pipeline_preprocess_input(data: pd.DataFrame, **kwargs):
+def pipeline_preprocess_input(
+        records: list,
+        column_sequence: list = None,
+        imputer: FillnaImputer = None,
+        categories: dict = None,
+        flg_frame: bool = True,
+        **kwargs
+):
     """
-    Пайплайн для предсказаний по введенным значениям
-    :param data: датасет
+    Пайплайн для предсказаний по введенным значениям: записи с исходными полями
+    (Date, NO2_trop, NO2_total, LST в Кельвинах) -> массивы -> то же ядро признаков,
+    что и для файлов
+    :param records: список словарей с исходными полями
+    :param column_sequence: порядок признаков из train (из реестра модели)
+    :param imputer: статистики для заполнения пропусков, обученные на train
+    :param categories: категории строковых признаков из train (из реестра модели)
+    :param flg_frame: вернуть датасет (False - словарь массивов для нативного бустера)
     :param kwargs: переменная
     :return: итоговый датасет
     """
-    data = check_columns_evaluate(
-        data=data, unique_values_path=kwargs['unique_values_path'])
-
-    dict_category = {key: 'category' for key in data.select_dtypes(['object']).columns}
-    data = transform_types(data=data, change_type_columns=dict_category)
-
-    return data
\ No newline at end of file
+    if column_sequence is None or categories is None:
+        schema = load_schema(kwargs['schema_path'])
+        column_sequence, categories = schema['columns'], schema['categories']
+
+    return record_features(
+        records,
+        column_sequence=column_sequence,
+        categories=categories,
+        dtypes=get_dtype_plan(kwargs.get('dtype_plan')),
+        fill_values=None if imputer is None else imputer.fill_values,
+        flg_frame=flg_frame)
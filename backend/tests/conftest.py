@@ -0,0 +1,63 @@
+"""
+Программа: Общие фикстуры тестов backend
+(запуск: pip install -r requirements-dev.txt && python -m pytest -q из папки backend)
+Версия: 1.0
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from lightgbm import LGBMRegressor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CONFIG_PATH = os.path.join(BACKEND_DIR, '..', 'config', 'params.yml')
+SCHEMA_PATH = os.path.join(BACKEND_DIR, '..', 'data', 'processed', 'schema.json')
+
+STATIONS = ['PD01', 'PD04', 'RO01', 'TV01']
+
+
+def make_dataset(n_rows: int = 400, seed: int = 10) -> tuple:
+    """
+    Датасет с категориальной станцией, пропусками и целевой переменной
+    """
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'ID': pd.Categorical(rng.choice(STATIONS, n_rows), categories=STATIONS),
+        'LST': rng.normal(15, 8, n_rows).astype(np.float32),
+        'AAI': rng.normal(0, 1, n_rows),
+    })
+    data.loc[::7, 'LST'] = np.nan
+    target = data['ID'].cat.codes * 10 + data['LST'].fillna(0) + rng.normal(0, 1, n_rows)
+    return data, target
+
+
+def fit_model(n_estimators: int = 20) -> LGBMRegressor:
+    """
+    Модель LightGBM на датасете make_dataset
+    """
+    data, target = make_dataset()
+    return LGBMRegressor(n_estimators=n_estimators, min_child_samples=5).fit(data, target)
+
+
+@pytest.fixture(scope='session')
+def preprocessing() -> dict:
+    """
+    Секция preprocessing конфигурации репозитория со схемой из data/processed
+    """
+    with open(CONFIG_PATH) as file:
+        config = yaml.load(file, Loader=yaml.FullLoader)
+    return {**config['preprocessing'], 'schema_path': SCHEMA_PATH}
+
+
+@pytest.fixture(scope='session')
+def schema() -> dict:
+    """
+    Схема признаков train
+    """
+    from src.transform.schema import load_schema
+    return load_schema(SCHEMA_PATH)
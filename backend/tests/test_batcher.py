@@ -0,0 +1,50 @@
+"""
+Программа: Тесты микробатчера /predict_input: группировка одновременных запросов
+и ошибка батча в каждом запросе
+Версия: 1.0
+"""
+
+import asyncio
+from src.evaluate.batcher import MicroBatcher
+
+
+def run_batcher(predict_fn, n_requests: int, **kwargs) -> tuple:
+    """
+    Одновременные запросы к микробатчеру
+    :return: результаты (или исключения) и батчер
+    """
+    async def main():
+        batcher = MicroBatcher(predict_fn, **kwargs)
+        await batcher.start()
+        try:
+            results = await asyncio.gather(
+                *(batcher.submit({'x': idx}) for idx in range(n_requests)),
+                return_exceptions=True)
+        finally:
+            await batcher.stop()
+        return results, batcher
+
+    return asyncio.run(main())
+
+
+def test_batcher_groups_requests():
+    batches = []
+
+    def predict_fn(records):
+        batches.append(len(records))
+        return [record['x'] * 2 for record in records]
+
+    results, batcher = run_batcher(predict_fn, 10, max_rows=4, max_wait_ms=50)
+    assert results == [idx * 2 for idx in range(10)]
+    assert max(batches) <= 4 and sum(batches) == 10
+    stats = batcher.stats.to_dict()
+    assert stats['rows'] == 10 and stats['batches'] == len(batches)
+
+
+def test_batcher_error_reaches_every_request():
+    def predict_fn(records):
+        raise ValueError('bad batch')
+
+    results, batcher = run_batcher(predict_fn, 3, max_rows=8, max_wait_ms=50)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert batcher.stats.to_dict()['errors'] >= 1
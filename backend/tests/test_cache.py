@@ -0,0 +1,41 @@
+"""
+Программа: Тесты кэша предсказаний: канонический ключ, LRU, версия модели и TTL
+Версия: 1.0
+"""
+
+import time
+from src.evaluate.cache import PredictionCache
+
+
+def test_cache_key_is_canonical():
+    assert (PredictionCache.make_key({'a': 1, 'b': 2}, '1')
+            == PredictionCache.make_key({'b': 2, 'a': 1}, '1'))
+    assert (PredictionCache.make_key({'a': 1}, '1')
+            != PredictionCache.make_key({'a': 1}, '2'))
+
+
+def test_cache_lru_and_version():
+    cache = PredictionCache(max_entries=2, ttl_seconds=60)
+    cache.sync_version('1')
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)  # вытесняется b - давно неиспользованная
+    assert cache.get('b') is None and cache.get('c') == 3
+    assert cache.to_dict()['evictions'] == 1
+
+    cache.sync_version('2')
+    assert cache.get('a') is None
+    assert cache.to_dict()['invalidations'] == 1
+
+
+def test_cache_ttl_and_disabled():
+    cache = PredictionCache(max_entries=10, ttl_seconds=0.01)
+    cache.put('a', 1)
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert cache.to_dict()['expirations'] == 1
+
+    cache = PredictionCache(max_entries=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
@@ -0,0 +1,86 @@
+"""
+Программа: Тесты агрегатов графиков EDA: бины по квартилям, средние
+с доверительным интервалом и KDE по бинам
+Версия: 1.0
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import gaussian_kde
+from src.eda.aggregates import BIN_LABELS, build_aggregates, get_bins, group_means, kde_curves
+
+
+@pytest.fixture
+def dataset() -> pd.DataFrame:
+    """
+    Признак и целевая переменная, зависящая от него, по 50 дням
+    """
+    rng = np.random.default_rng(3)
+    feature = rng.normal(0, 1, 1000)
+    return pd.DataFrame({
+        'Date': np.repeat(pd.date_range('2020-01-01', periods=50).astype(str), 20),
+        'feature': feature,
+        'target': 30 + 5 * feature + rng.normal(0, 2, 1000),
+    })
+
+
+def test_get_bins():
+    values = pd.Series([1.0, 2.0, 3.0, 4.0, 5.0, np.nan])
+    bins = get_bins(values, values.quantile([0, 0.25, 0.5, 0.75, 1]).to_numpy())
+    assert bins.cat.categories.tolist() == BIN_LABELS
+    # минимум - в первом бине, пропуск остается пропуском
+    assert bins.tolist()[:5] == ['low', 'low', 'middle', 'middle+', 'high']
+    assert pd.isna(bins.iloc[5])
+
+
+def test_group_means():
+    target = pd.Series([1.0, 3.0, 10.0, 20.0, 30.0, 7.0])
+    groups = pd.Series(['a', 'a', 'b', 'b', 'b', 'c'])
+    stats = group_means(target, groups, ci=0.95)
+    assert stats['mean'].tolist() == [2.0, 20.0, 7.0]
+    assert stats['n'].tolist() == [2, 3, 1]
+    half_width = 1.959964 * 10 / np.sqrt(3)
+    assert stats.loc['b', 'ci_low'] == pytest.approx(20 - half_width, rel=1e-6)
+    assert stats.loc['b', 'ci_high'] == pytest.approx(20 + half_width, rel=1e-6)
+    # одно наблюдение - интервал нулевой ширины
+    assert stats.loc['c', 'ci_low'] == stats.loc['c', 'ci_high'] == 7.0
+
+
+def test_kde_curves_match_exact_kde(dataset):
+    edges = dataset['feature'].quantile([0, 0.25, 0.5, 0.75, 1]).to_numpy()
+    bins = get_bins(dataset['feature'], edges)
+    curves = kde_curves(dataset['target'], bins, grid_size=200)
+    grid = np.array(curves['x'])
+    assert list(curves['density']) == BIN_LABELS
+
+    for label in BIN_LABELS:
+        group = dataset.loc[bins == label, 'target'].to_numpy()
+        # ширина ядра gaussian_kde по Скотту совпадает; вес кривой - доля бина
+        expected = gaussian_kde(group)(grid) * len(group) / len(dataset)
+        curve = np.array(curves['density'][label])
+        np.testing.assert_allclose(curve, expected, atol=1e-3 * expected.max())
+        assert np.trapz(curve, grid) == pytest.approx(len(group) / len(dataset), rel=1e-2)
+
+
+def test_kde_curves_skip_degenerate_bins():
+    target = pd.Series([1.0, 2.0, 3.0, 5.0, 5.0])
+    bins = pd.Series(pd.Categorical(['low', 'low', 'middle', 'high', 'high'], categories=BIN_LABELS))
+    curves = kde_curves(target, bins, grid_size=10)
+    # один элемент (middle), постоянные значения (high) и пустой бин не рисуются
+    assert list(curves['density']) == ['low']
+    assert kde_curves(target, bins.where(bins == 'high'), grid_size=10) == {'x': [], 'density': {}}
+
+
+def test_build_aggregates(dataset):
+    aggregates = build_aggregates(
+        dataset, features=['feature'], names=['feature_bins'], target='target',
+        date_column='Date', grid_size=50, ci=0.95)
+    means = aggregates['bin_means']['feature']
+    assert means['bins'] == BIN_LABELS
+    assert means['mean'] == sorted(means['mean'])
+    assert sum(means['n']) == len(dataset)
+
+    timeseries = aggregates['timeseries']
+    assert timeseries['Date'][0] == '2020-01-01' and len(timeseries['Date']) == 50
+    assert timeseries['mean'][0] == pytest.approx(dataset['target'][:20].mean())
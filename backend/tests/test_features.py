@@ -0,0 +1,117 @@
+"""
+Программа: Батчевый путь признаков (frame_features) и путь одиночных записей
+(record_features) дают одинаковые признаки
+Версия: 1.0
+"""
+
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from src.transform.features import frame_features, record_features, category_dtype
+from src.transform.imputer import FillnaImputer
+from src.transform.transform import (
+    get_dtype_plan, pipeline_preprocess, pipeline_preprocess_input)
+
+NAN = float('nan')
+
+
+def make_records() -> list:
+    """
+    Записи с пропусками, неизвестной станцией, нулевым NO2_strat
+    и датами на границах месяца и года
+    """
+    base = {
+        'ID': 'PD01', 'LAT': 45.28937609, 'LON': 11.64239391, 'Precipitation': 3.277529,
+        'LST': 290.5, 'AAI': -0.313361478, 'CloudFraction': 0.771456236,
+        'NO2_strat': 2.4e-05, 'NO2_total': 7.53e-05, 'NO2_trop': 3.1e-05,
+        'TropopausePressure': 14440.02819,
+    }
+    dates = [
+        datetime.date(2019, 1, 1), datetime.date(2019, 12, 31), datetime.date(2020, 1, 1),
+        datetime.date(2020, 2, 29), datetime.date(2020, 3, 1), datetime.date(2021, 12, 31),
+    ]
+    records = [{**base, 'Date': day} for day in dates]
+    records[1].update(LST=NAN, NO2_trop=NAN)
+    records[2].update(ID='UNKNOWN_STATION', AAI=NAN)
+    records[3].update(NO2_strat=0.0)
+    records[4].update(NO2_strat=NAN, NO2_total=NAN, CloudFraction=NAN)
+    records[5].update(ID='UNKNOWN_STATION', TropopausePressure=NAN, Precipitation=NAN)
+    return records
+
+
+def to_dataset(records: list) -> pd.DataFrame:
+    """
+    Датасет с теми же записями, как после чтения файла
+    """
+    data = pd.DataFrame.from_records(records)
+    data['Date'] = pd.to_datetime(data['Date'])
+    return data
+
+
+@pytest.mark.parametrize('flg_dtypes', [False, True])
+def test_frame_equals_records(preprocessing, schema, flg_dtypes):
+    dtypes = get_dtype_plan(preprocessing['dtype_plan']) if flg_dtypes else None
+    records = make_records()
+
+    data = to_dataset(records)
+    if dtypes:
+        data = data.astype({col: dtype for col, dtype in dtypes.items() if col in data})
+    data = frame_features(data, dtypes=dtypes)
+    data['ID'] = data['ID'].astype(category_dtype(tuple(schema['categories']['ID'])))
+    data = data[schema['columns']]
+
+    dataset = record_features(
+        records, column_sequence=schema['columns'],
+        categories=schema['categories'], dtypes=dtypes)
+
+    pd.testing.assert_frame_equal(data, dataset, check_exact=True)
+    assert dataset['ID'].isna().tolist() == [False, False, True, False, False, True]
+    assert dataset['month'].tolist() == [1, 12, 1, 2, 3, 12]
+    assert dataset['year'].tolist() == [2019, 2019, 2020, 2020, 2020, 2021]
+    assert np.isinf(dataset['NO2_ratio'].iloc[3])
+
+
+@pytest.mark.parametrize('flg_imputer', [False, True])
+def test_pipelines_match(preprocessing, schema, flg_imputer):
+    records = make_records()
+    imputer = None
+    if flg_imputer:
+        imputer = FillnaImputer(
+            list_median=preprocessing['list_median'], list_mean=preprocessing['list_mean'])
+        imputer.fill_values = {col: 0.5 for col in preprocessing['list_median']
+                               + preprocessing['list_mean']}
+
+    data = to_dataset(records)
+    data.insert(0, 'ID_Zindi', [f'ID_{idx}' for idx in range(len(data))])
+    data = pipeline_preprocess(
+        data, flg_evaluate=True, column_sequence=schema['columns'],
+        imputer=imputer, **preprocessing)
+    # файл кодируется категориями train в модели (pandas_categorical), запись - сразу
+    data['ID'] = data['ID'].astype(category_dtype(tuple(schema['categories']['ID'])))
+
+    dataset = pipeline_preprocess_input(
+        records, column_sequence=schema['columns'], imputer=imputer,
+        categories=schema['categories'], **preprocessing)
+
+    pd.testing.assert_frame_equal(data, dataset, check_exact=True)
+    filled = preprocessing['list_median'] + preprocessing['list_mean']
+    assert dataset[filled].isna().any().any() != flg_imputer
+
+
+def test_records_as_arrays(preprocessing, schema):
+    records = make_records()
+    dtypes = get_dtype_plan(preprocessing['dtype_plan'])
+    dataset = record_features(
+        records, column_sequence=schema['columns'],
+        categories=schema['categories'], dtypes=dtypes)
+    columns = record_features(
+        records, column_sequence=schema['columns'],
+        categories=schema['categories'], dtypes=dtypes, flg_frame=False)
+
+    assert list(columns) == schema['columns']
+    for col in schema['columns']:
+        if col in schema['categories']:
+            np.testing.assert_array_equal(columns[col].codes, dataset[col].cat.codes)
+        else:
+            np.testing.assert_array_equal(columns[col], dataset[col].to_numpy())
@@ -0,0 +1,145 @@
+"""
+Программа: Чтение данных: превью и блоки feather читаются по record batch,
+загруженные файлы распознаются по сигнатуре и распаковываются (gzip, zstd)
+Версия: 1.0
+"""
+
+import gzip
+import io
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from src.data.get_data import get_dataset, get_dataset_chunks, get_format, open_upload
+
+
+@pytest.fixture
+def dataset() -> pd.DataFrame:
+    n_rows = 1000
+    return pd.DataFrame({
+        'ID': pd.Categorical(np.resize(['PD01', 'PD04', 'TV01'], n_rows)),
+        'Date': pd.date_range('2019-01-01', periods=n_rows, freq='D'),
+        'LST': np.arange(n_rows, dtype=np.float32),
+    })
+
+
+@pytest.fixture
+def feather_path(tmp_path, dataset) -> str:
+    path = str(tmp_path / 'data.feather')
+    # несколько record batch по 128 строк
+    dataset.to_feather(path, chunksize=128)
+    return path
+
+
+@pytest.fixture
+def read_batches(monkeypatch) -> list:
+    """
+    Номера record batch, прочитанных из feather-файла
+    """
+    batches = []
+    open_file = pa.ipc.open_file
+
+    class Reader:
+        def __init__(self, source):
+            self.reader = open_file(source)
+            self.num_record_batches = self.reader.num_record_batches
+            self.schema = self.reader.schema
+
+        def get_batch(self, idx):
+            batches.append(idx)
+            return self.reader.get_batch(idx)
+
+    monkeypatch.setattr(pa.ipc, 'open_file', Reader)
+    return batches
+
+
+@pytest.mark.parametrize('nrows, batches', [
+    (1, [0]), (128, [0]), (300, [0, 1, 2]), (5000, list(range(8))),
+])
+def test_feather_preview(feather_path, dataset, read_batches, nrows, batches):
+    data = get_dataset(feather_path, nrows=nrows)
+    pd.testing.assert_frame_equal(data, dataset.head(nrows))
+    # читаются только record batch с первыми nrows строками
+    assert read_batches == batches
+
+
+def test_feather_preview_columns(feather_path, dataset):
+    pd.testing.assert_frame_equal(
+        get_dataset(feather_path, nrows=10, columns=['LST', 'ID']),
+        dataset[['LST', 'ID']].head(10))
+    assert list(get_dataset(feather_path, nrows=0, columns=['LST']).columns) == ['LST']
+
+
+def test_feather_chunks(feather_path, dataset):
+    chunks = list(get_dataset_chunks(feather_path, chunksize=300, columns=['ID', 'LST']))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), dataset[['ID', 'LST']])
+
+
+def test_feather_upload(feather_path, dataset):
+    with open(feather_path, 'rb') as file:
+        upload = io.BytesIO(file.read())
+    pd.testing.assert_frame_equal(get_dataset(upload, nrows=200), dataset.head(200))
+    upload.seek(0)
+    assert sum(len(chunk) for chunk in get_dataset_chunks(upload, chunksize=256)) == 1000
+
+
+def to_bytes(dataset: pd.DataFrame, data_format: str) -> bytes:
+    """
+    Датасет в формате загружаемого файла
+    """
+    buffer = io.BytesIO()
+    if data_format == 'csv':
+        buffer.write(dataset.to_csv(index=False).encode())
+    elif data_format == 'parquet':
+        dataset.to_parquet(buffer, row_group_size=256)
+    else:
+        dataset.to_feather(buffer, chunksize=128)
+    return buffer.getvalue()
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == 'gzip':
+        return gzip.compress(data)
+    if codec == 'zstd':
+        sink = pa.BufferOutputStream()
+        with pa.CompressedOutputStream(sink, 'zstd') as stream:
+            stream.write(data)
+        return sink.getvalue().to_pybytes()
+    return data
+
+
+def test_get_format():
+    assert get_format('data/train.parquet') == 'parquet'
+    assert get_format('data/TRAIN.FEATHER') == 'feather'
+    assert get_format('data/train.csv') == 'csv'
+    assert get_format('data/train.csv.gz') == 'csv'
+
+
+@pytest.mark.parametrize('data_format', ['csv', 'parquet', 'feather'])
+def test_get_format_upload(dataset, data_format):
+    # сигнатура, а не имя файла; позиция чтения не меняется
+    upload = io.BytesIO(b'xx' + to_bytes(dataset, data_format))
+    upload.seek(2)
+    assert get_format(upload) == data_format
+    assert upload.tell() == 2
+
+
+@pytest.mark.parametrize('codec', [None, 'gzip', 'zstd'])
+@pytest.mark.parametrize('data_format', ['csv', 'parquet', 'feather'])
+def test_compressed_upload(dataset, data_format, codec):
+    raw = to_bytes(dataset, data_format)
+    expected = get_dataset(io.BytesIO(raw))
+
+    upload = open_upload(io.BytesIO(compress(raw, codec)))
+    assert get_format(upload) == data_format
+    if codec is not None and data_format != 'csv':
+        # колоночному формату нужен произвольный доступ - распакован целиком
+        assert upload.seekable() and upload.tell() == 0
+    pd.testing.assert_frame_equal(get_dataset(upload), expected)
+
+    chunks = get_dataset_chunks(io.BytesIO(compress(raw, codec)), chunksize=300)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+    preview = get_dataset(io.BytesIO(compress(raw, codec)), nrows=10)
+    pd.testing.assert_frame_equal(preview, expected.head(10))
@@ -0,0 +1,84 @@
+"""
+Программа: Тесты инкрементального дообучения: выравнивание по схеме train
+и причины полного подбора параметров (сдвиг данных, деградация MAE)
+Версия: 1.0
+"""
+
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import mean_absolute_error
+from src.pipeline.incremental import align_to_schema, check_retrain_reason
+from src.transform.schema import build_schema
+from conftest import STATIONS, fit_model, make_dataset
+
+
+@pytest.fixture(scope='module')
+def model():
+    return fit_model()
+
+
+@pytest.fixture(scope='module')
+def schema() -> dict:
+    """
+    Схема датасета, на котором обучена модель
+    """
+    data, target = make_dataset()
+    return build_schema(data.assign(target=target), drop_columns=['Date'], target_column='target')
+
+
+@pytest.fixture
+def train_config(tmp_path, model) -> dict:
+    """
+    Секция train: MAE текущей модели на отложенной выборке
+    """
+    data, target = make_dataset(seed=5)
+    metrics_path = str(tmp_path / 'metrics.json')
+    with open(metrics_path, 'w') as file:
+        json.dump({'MAE': mean_absolute_error(target, model.predict(data))}, file)
+    return {
+        'metrics_path': metrics_path,
+        'incremental': {'psi_threshold': 0.25, 'mae_tolerance': 0.1},
+    }
+
+
+def test_align_to_schema(schema):
+    data = pd.DataFrame({
+        'AAI': [0.1, 0.2, 0.3],
+        'ID': pd.Categorical(['TV01', 'PD01', 'XX01'], categories=['XX01', 'TV01', 'PD01']),
+        'LST': [1.0, 2.0, 3.0],
+    })
+    aligned = align_to_schema(data=data, schema=schema)
+    assert aligned.columns.tolist() == schema['columns']
+    assert aligned['ID'].cat.categories.tolist() == STATIONS
+    # коды категорий - как в train, неизвестная станция - пропуск
+    assert aligned['ID'].cat.codes.tolist() == [STATIONS.index('TV01'), 0, -1]
+
+
+def test_same_distribution_no_reason(model, schema, train_config):
+    data, target = make_dataset(seed=2)
+    assert check_retrain_reason(
+        data_x=data, data_y=target, model=model, schema=schema, **train_config) == {}
+
+
+def test_drift_reason(model, schema, train_config):
+    data, target = make_dataset(seed=2)
+    data['LST'] += 20
+    stations = data['ID'].cat.add_categories(['XX01'])
+    stations[:3] = 'XX01'
+    data['ID'] = stations
+    reason = check_retrain_reason(
+        data_x=data, data_y=target, model=model, schema=schema, **train_config)
+    assert list(reason['psi']) == ['LST']
+    assert reason['unknown_categories'] == {'ID': ['XX01']}
+
+
+def test_mae_reason(model, schema, train_config):
+    data, target = make_dataset(seed=2)
+    reason = check_retrain_reason(
+        data_x=data, data_y=target + 5, model=model, schema=schema, **train_config)
+    assert set(reason) == {'mae'}
+    assert reason['mae']['new_data'] > reason['mae']['train'] * 1.1
+    assert np.isclose(reason['mae']['new_data'], mean_absolute_error(
+        target + 5, model.predict(data)), atol=1e-4)
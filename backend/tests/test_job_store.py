@@ -0,0 +1,67 @@
+"""
+Программа: Общее хранилище задач обучения: одна активная задача, отмена, упавшие процессы
+Версия: 1.0
+"""
+
+import os
+import time
+import pytest
+from src.pipeline.job_store import JobStore, TrainingInProgress
+
+
+def new_job(job_id: str) -> dict:
+    return {'job_id': job_id, 'state': 'running', 'mode': 'full',
+            'n_trials': 3, 'started_at': time.time()}
+
+
+@pytest.fixture
+def store(tmp_path) -> JobStore:
+    return JobStore(path=str(tmp_path / 'jobs.db'), timeout=60)
+
+
+def test_single_active_job(store):
+    started = []
+    job = store.create(new_job('a'), start=lambda: started.append('a') or 101)
+    assert job['state'] == 'running' and 'pid' not in job
+
+    # второй воркер (другой экземпляр хранилища) видит задачу и не запускает обучение
+    other = JobStore(path=store.path)
+    with pytest.raises(TrainingInProgress) as error:
+        other.create(new_job('b'), start=lambda: started.append('b') or 102)
+    assert error.value.job_id == 'a' and started == ['a']
+    assert other.get('b') is None
+    assert other.active()['worker_pid'] == os.getpid()
+
+
+def test_progress_and_finish(store):
+    store.create(new_job('a'), start=lambda: 101)
+    assert store.update('a', trials_done=2, best_mae=1.5)
+    assert store.finish('a', state='finished', metrics={'MAE': 1.5}, result={'mode': 'full'})
+
+    job = JobStore(path=store.path).get('a')
+    assert (job['state'], job['trials_done'], job['metrics']) == ('finished', 2, {'MAE': 1.5})
+    assert job['finished_at'] is not None
+    assert store.active() is None
+    store.create(new_job('b'), start=lambda: 102)
+
+
+def test_cancel_is_final(store):
+    store.create(new_job('a'), start=lambda: 101)
+    job, pid = JobStore(path=store.path).cancel('a')
+    assert job['state'] == 'cancelled' and pid == 101
+
+    # процесс обучения не перезаписывает отмену и узнает о ней по отметке
+    assert not store.update('a', trials_done=1)
+    assert not store.finish('a', state='finished')
+    assert store.get('a')['state'] == 'cancelled'
+    assert store.cancel('a') == (store.get('a'), None)
+    assert store.cancel('missing') is None
+
+
+def test_silent_job_expires(store):
+    store.create(new_job('a'), start=lambda: 101)
+    store.timeout = 0.01
+    time.sleep(0.02)
+    job = store.get('a')
+    assert job['state'] == 'failed' and 'не отвечает' in job['error']
+    store.create(new_job('b'), start=lambda: 102)
@@ -0,0 +1,102 @@
+"""
+Программа: Тесты метрик всех воркеров супервизора: сумма счетчиков и гистограмм,
+gauge с меткой worker, счетчики не уменьшаются после остановки воркеров
+Версия: 1.0
+"""
+
+import json
+import os
+
+import pytest
+
+from src.monitoring.metrics import HTTP_LATENCY, HTTP_REQUESTS, MODEL_INFO, REGISTRY
+from src.monitoring.shared import SharedMetrics
+
+REQUEST = ('POST', '/predict_input', '200')
+
+
+@pytest.fixture
+def shared(tmp_path) -> SharedMetrics:
+    """
+    Общий каталог метрик; значения метрик процесса восстанавливаются после теста
+    """
+    saved = {metric.name: metric.snapshot() for metric in REGISTRY}
+    for metric in REGISTRY:
+        metric.clear()
+    yield SharedMetrics(str(tmp_path))
+    for metric in REGISTRY:
+        metric._values = saved[metric.name]
+
+
+def write_worker(shared: SharedMetrics, pid: int, requests: int, version: str) -> None:
+    """
+    Снимок воркера pid: requests запросов по 10 мс и версия модели
+    """
+    for metric in REGISTRY:
+        metric.clear()
+    for _ in range(requests):
+        HTTP_REQUESTS.inc(labels=REQUEST)
+        HTTP_LATENCY.observe(0.01, labels=REQUEST[:2])
+    MODEL_INFO.set(1, labels=(version, 'native'))
+    shared.stats_fn = lambda: {'requests': requests}
+    with open(os.path.join(shared.path, f'{pid}.json'), 'w') as file:
+        json.dump(shared.snapshot(), file)
+    for metric in REGISTRY:
+        metric.clear()
+    shared.stats_fn = None
+
+
+def sample(text: str, prefix: str) -> float:
+    """
+    Значение строки метрики, начинающейся с prefix
+    """
+    values = [line.rsplit(' ', 1)[1] for line in text.splitlines() if line.startswith(prefix)]
+    assert len(values) == 1, values
+    return float(values[0])
+
+
+REQUESTS_LINE = 'http_requests_total{method="POST",path="/predict_input",status="200"}'
+LATENCY_COUNT_LINE = 'http_request_duration_seconds_count{method="POST",path="/predict_input"}'
+
+
+def test_counters_summed_gauges_by_worker(shared):
+    write_worker(shared, 101, requests=3, version='v1')
+    write_worker(shared, 102, requests=5, version='v1')
+    HTTP_REQUESTS.inc(labels=REQUEST)
+
+    text = shared.render()
+    assert sample(text, REQUESTS_LINE) == 9
+    assert sample(text, LATENCY_COUNT_LINE) == 8
+    assert sample(text, 'model_info{worker="101",version="v1"') == 1
+    assert sample(text, 'model_info{worker="102",version="v1"') == 1
+    # у текущего процесса (не воркер) статистики нет
+    assert shared.stats() == {101: {'requests': 3}, 102: {'requests': 5}}
+
+
+def test_archive_keeps_counters(shared):
+    write_worker(shared, 101, requests=3, version='v1')
+    write_worker(shared, 102, requests=5, version='v1')
+    before = sample(shared.render(), REQUESTS_LINE)
+
+    # смена поколения: новые воркеры, прежние переносятся в архив
+    write_worker(shared, 201, requests=1, version='v2')
+    shared.archive([101, 102])
+
+    text = shared.render()
+    assert not os.path.exists(os.path.join(shared.path, '101.json'))
+    assert sample(text, REQUESTS_LINE) == before + 1
+    assert sample(text, LATENCY_COUNT_LINE) == before + 1
+    assert 'model_info{worker="101"' not in text
+    assert sample(text, 'model_info{worker="201",version="v2"') == 1
+
+    # снимок, оставшийся после записи архива, не учитывается повторно
+    write_worker(shared, 101, requests=3, version='v1')
+    assert sample(shared.render(), REQUESTS_LINE) == before + 1
+
+
+def test_reset_after_fork(shared):
+    HTTP_REQUESTS.inc(labels=REQUEST)
+    MODEL_INFO.set(1, labels=('v1', 'native'))
+    shared.reset()
+    assert HTTP_REQUESTS.snapshot() == {}
+    assert MODEL_INFO.snapshot() == {('v1', 'native'): 1}
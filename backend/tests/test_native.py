@@ -0,0 +1,26 @@
+"""
+Программа: Нативный бустер против joblib-модели
+Версия: 1.0
+"""
+
+import numpy as np
+from src.evaluate.native import NativePredictor
+from conftest import STATIONS, fit_model, make_dataset
+
+
+def test_native_matches_joblib(tmp_path):
+    model = fit_model()
+    booster_path = str(tmp_path / 'model_lgbm.txt')
+    model.booster_.save_model(booster_path)
+    predictor = NativePredictor(booster_path)
+
+    data, _ = make_dataset(n_rows=50, seed=1)
+    expected = model.predict(data)
+    np.testing.assert_allclose(predictor.predict(data), expected, rtol=1e-6)
+
+    # категории в другом порядке и неизвестная станция - как у LightGBM для pandas
+    stations = data['ID'].cat.set_categories(['TV01', 'UNKNOWN'] + STATIONS[:3])
+    stations[:5] = 'UNKNOWN'
+    expected = model.predict(data.assign(ID=stations.cat.set_categories(STATIONS)))
+    columns = {'ID': stations.array, 'LST': data['LST'].to_numpy(), 'AAI': data['AAI'].to_numpy()}
+    np.testing.assert_allclose(predictor.predict(columns), expected, rtol=1e-6)
@@ -0,0 +1,71 @@
+"""
+Программа: Предсказания поставляемой модели на data/check/test.csv зафиксированы:
+пропуски заполняются статистиками train одинаково для файлов и записей
+Версия: 1.0
+"""
+
+import os
+import dataclasses
+import numpy as np
+import pandas as pd
+import pytest
+from src.data.get_data import get_dataset
+from src.evaluate.evaluate import predict_bundle
+from src.evaluate.registry import ModelRegistry
+from src.transform.imputer import FillnaImputer
+from conftest import BACKEND_DIR, CONFIG_PATH
+
+CHECK_PATH = os.path.join(BACKEND_DIR, '..', 'data', 'check', 'test.csv')
+EXPECTED_PATH = os.path.join(BACKEND_DIR, 'tests', 'data', 'check_predictions.csv')
+
+
+@pytest.fixture(scope='module')
+def bundle():
+    """
+    Снимок поставляемой модели (пути конфигурации - относительно backend)
+    """
+    cwd = os.getcwd()
+    os.chdir(BACKEND_DIR)
+    try:
+        yield ModelRegistry(config_path=CONFIG_PATH).get()
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope='module')
+def check_data() -> pd.DataFrame:
+    return get_dataset(dataset_path=CHECK_PATH)
+
+
+def test_check_file_predictions(bundle, check_data):
+    assert bundle.imputer is not None
+    expected = pd.read_csv(EXPECTED_PATH)
+    assert expected['ID_Zindi'].tolist() == check_data['ID_Zindi'].tolist()
+    np.testing.assert_allclose(predict_bundle(bundle, check_data), expected['prediction'],
+                               atol=1e-5)
+
+
+def test_records_match_file(bundle, check_data):
+    data = check_data.head(500)
+    records = data.drop(columns='ID_Zindi').assign(
+        Date=lambda x: pd.to_datetime(x['Date']).dt.date).to_dict('records')
+    assert data['LST'].isna().any()
+    np.testing.assert_allclose(
+        predict_bundle(bundle, records, flg_input=True), predict_bundle(bundle, data),
+        rtol=1e-6)
+
+
+def test_missing_values_are_filled(bundle, check_data):
+    # без заполнения модель, обученная без пропусков, считает пропуск LST нулем
+    data = check_data[check_data['LST'].isna()].head(200)
+    filled = np.array(predict_bundle(bundle, data))
+    raw = np.array(predict_bundle(dataclasses.replace(bundle, imputer=None), data))
+    assert np.abs(filled - raw).max() > 1
+
+
+def test_schema_fallback(bundle):
+    config = bundle.config['preprocessing']
+    imputer = FillnaImputer.from_schema(
+        bundle.schema, list_median=config['list_median'], list_mean=config['list_mean'])
+    assert set(imputer.fill_values) == set(config['list_median'] + config['list_mean'])
+    assert imputer.fill_values['LST'] == bundle.schema['numeric']['LST']['q50']
@@ -0,0 +1,69 @@
+"""
+Программа: Подмена модели в реестре
+Версия: 1.0
+"""
+
+import os
+import shutil
+import numpy as np
+import pytest
+import yaml
+from src.evaluate.registry import ModelRegistry
+from src.pipeline.pipeline import export_model
+from conftest import SCHEMA_PATH, fit_model, make_dataset
+
+
+@pytest.fixture
+def config_path(tmp_path) -> str:
+    """
+    Конфигурация с артефактами во временной папке
+    """
+    schema_path = str(tmp_path / 'schema.json')
+    shutil.copy(SCHEMA_PATH, schema_path)
+    config = {
+        'preprocessing': {
+            'schema_path': schema_path,
+            'imputer_path': str(tmp_path / 'fill_values.json'),
+            'list_median': ['CloudFraction', 'TropopausePressure'],
+            'list_mean': ['LST'],
+        },
+        'train': {
+            'model_path': str(tmp_path / 'model_lgbm.joblib'),
+            'booster_path': str(tmp_path / 'model_lgbm.txt'),
+        },
+        'evaluate': {'predict_threads': 1},
+    }
+    path = str(tmp_path / 'params.yml')
+    with open(path, 'w') as file:
+        yaml.dump(config, file)
+    return path
+
+
+def test_registry_hot_swap(config_path):
+    registry = ModelRegistry(config_path=config_path, check_interval=0)
+    assert registry.get().model is None
+
+    with open(config_path) as file:
+        train = yaml.load(file, Loader=yaml.FullLoader)['train']
+    export_model(fit_model(10), train['model_path'], train['booster_path'])
+    old = registry.get()
+    assert old.model is not None and old.predictor is not None
+    assert old.column_sequence is not None
+    # файла статистик нет - медианы из схемы train
+    assert old.imputer.fill_values['LST'] == old.schema['numeric']['LST']['q50']
+
+    # схема без новой модели не перечитывается: снимок не смешивает обучения
+    os.utime(old.config['preprocessing']['schema_path'])
+    assert registry.get() is old
+
+    export_model(fit_model(30), train['model_path'], train['booster_path'])
+    stat = os.stat(train['model_path'])
+    os.utime(train['model_path'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    new = registry.get()
+    assert new is not old and new.model_version != old.model_version
+    assert new.model.n_estimators == 30 and old.model.n_estimators == 10
+
+    # запрос со старым снимком дорабатывает на старой модели
+    data, _ = make_dataset(n_rows=20, seed=2)
+    np.testing.assert_allclose(old.predictor.predict(data), old.model.predict(data), rtol=1e-6)
+    assert registry.reload() is new
@@ -0,0 +1,59 @@
+"""
+Программа: Тесты векторной проверки пакета записей /predict_bulk
+Версия: 1.0
+"""
+
+import datetime
+import pandas as pd
+import pytest
+from src.evaluate.validation import BulkValidationError, to_frame, validate_frame
+
+FIELDS = {
+    'ID': (str, True),
+    'Date': (datetime.date, True),
+    'LST': (float, False),
+    'NO2_strat': (float, True),
+}
+
+
+def test_to_frame_columns_and_records():
+    columns = to_frame({'ID': ['PD01', 'PD04'], 'LST': [290.0, None]})
+    records = to_frame([{'ID': 'PD01', 'LST': 290.0}, {'ID': 'PD04', 'LST': None}])
+    pd.testing.assert_frame_equal(columns, records)
+
+    with pytest.raises(BulkValidationError):
+        to_frame({'ID': ['PD01'], 'LST': [1.0, 2.0]})
+    with pytest.raises(BulkValidationError):
+        to_frame([{'ID': 'PD01'}] * 3, max_rows=2)
+
+
+def test_validate_frame_casts_types():
+    data = to_frame({
+        'ID': ['PD01', 'PD04'],
+        'Date': ['2019-01-01', '2020-02-29'],
+        'NO2_strat': ['2.4e-05', 3],
+        'extra': [1, 2],
+    })
+    data = validate_frame(data, FIELDS)
+    assert list(data.columns) == list(FIELDS)
+    assert data['LST'].isna().all()
+    assert data['NO2_strat'].tolist() == [2.4e-05, 3.0]
+    assert data['Date'].tolist() == [pd.Timestamp('2019-01-01'), pd.Timestamp('2020-02-29')]
+
+
+def test_validate_frame_reports_rows():
+    data = to_frame({
+        'ID': ['PD01', None, 'PD04'],
+        'Date': ['2019-01-01', '01/02/2019', '2019-02-30'],
+        'NO2_strat': [1.0, 'abc', 2.0],
+    })
+    with pytest.raises(BulkValidationError) as error:
+        validate_frame(data, FIELDS)
+    errors = {item['loc'][-1]: item for item in error.value.errors}
+    assert errors['ID']['rows'] == [1]
+    assert errors['Date']['rows'] == [1, 2]
+    assert errors['NO2_strat']['rows'] == [1]
+
+    with pytest.raises(BulkValidationError) as error:
+        validate_frame(to_frame({'ID': ['PD01']}), FIELDS)
+    assert {item['loc'][-1] for item in error.value.errors} == {'Date', 'NO2_strat'}
@@ -6,10 +6,11 @@
 import os
 import yaml
 import streamlit as st
-import seaborn as sns
-import geopandas as gp
-from src.data.get_data import load_data, get_dataset, get_geodataset
-from src.plotting.charts import kde_bar_plot, barplot, lineplot, get_bins, maps, data_geo
+from src.data.get_data import (
+    load_data, get_preview, get_geodataset, get_station_layer, get_chart_data, file_mtime
+)
+from src.plotting.charts import kde_bar_plot, barplot, lineplot, maps
+from src.plotting.cache import FigureCache, get_figure_cache, show_figure
 from src.train.training import start_training
 from src.evaluate.evaluate import evaluate_input, evaluate_from_file
 
@@ -70,6 +71,40 @@ def main_page():
     )
 
 
+def show_kde_bar_plot(
+    config: dict, figure_cache: FigureCache, fingerprint: int,
+    feature: str, palette: str, title: str
+) -> None:
+    """
+    График kdeplot и barplot признака по агрегатам backend (из кэша графиков)
+    :param config: конфигурационный файл
+    :param figure_cache: кэш графиков
+    :param fingerprint: отпечаток датасета
+    :param feature: признак из preprocessing.bins_features
+    :param palette: цвет рисунка
+    :param title: название рисунка
+    :return: None
+    """
+    dataset_path = config['preprocessing']['train_path']
+    kde_endpoint = config['endpoints']['eda_kde'].format(feature=feature)
+    means_endpoint = config['endpoints']['eda_bin_means'].format(feature=feature)
+    show_figure(
+        figure_cache,
+        chart='kde_bar_plot',
+        params={
+            'palette': palette, 'title': title,
+            'endpoints': [kde_endpoint, means_endpoint],
+        },
+        fingerprint=fingerprint,
+        draw=lambda: kde_bar_plot(
+            kde=get_chart_data(endpoint=kde_endpoint, dataset_path=dataset_path),
+            means=get_chart_data(endpoint=means_endpoint, dataset_path=dataset_path),
+            palette=palette,
+            title=title
+        )
+    )
+
+
 def exploratory():
     """
     Exploratory data analysis
@@ -81,10 +116,17 @@ def exploratory():
     with open(CONFIG_PATH) as file:
         config = yaml.load(file, Loader=yaml.FullLoader)
 
-    data = get_dataset(dataset_path=config['preprocessing']['train_path'])
-    prov_data = get_geodataset(geodataset_path=config['preprocessing']['geodata_path'])
+    # графики распределений строятся по агрегатам backend (/eda/*), а не по датасету;
+    # для превью читаются только первые строки, весь датасет - только при отрисовке
+    # карт (слой станций и геоданные кэшируются между перезапусками страницы и сессиями)
+    dataset_path = config['preprocessing']['train_path']
+    geodataset_path = config['preprocessing']['geodata_path']
+    # готовые графики - с диска, перерисовываются при изменении данных или параметров
+    figure_cache = get_figure_cache(**config['figure_cache'])
+    fingerprint = file_mtime(dataset_path)
 
-    st.write(data.head())
+    st.write(get_preview(
+        dataset_path=dataset_path, columns=config['preprocessing']['eda_columns']))
 
     map_station = st.sidebar.checkbox('Координаты станций мониторинга')
     map_concentration = st.sidebar.checkbox('Наземная концентрация NO2 по станциям мониторинга')
@@ -96,125 +138,119 @@ def exploratory():
     month_year = st.sidebar.checkbox('Динамика во времени')
 
     if map_station:
-        geo_data = data_geo(data=data)
-
-        st.pyplot(
-            maps(
-                prov_data=prov_data,
-                geo_data=geo_data,
-                title='Координаты станций мониторинга (Ломбардия и Венето)',
-                color='darkred',
+        params = {
+            'title': 'Координаты станций мониторинга (Ломбардия и Венето)',
+            'color': 'darkred',
+        }
+        show_figure(
+            figure_cache,
+            chart='maps',
+            params=params,
+            fingerprint=(fingerprint, file_mtime(geodataset_path)),
+            draw=lambda: maps(
+                prov_data=get_geodataset(geodataset_path=geodataset_path),
+                geo_data=get_station_layer(
+                    dataset_path=dataset_path,
+                    columns=config['preprocessing']['eda_columns']),
+                **params
             )
         )
 
 
     if map_concentration:
-        geo_data = data_geo(data=data)
-
-        st.pyplot(
-            maps(
-                prov_data=prov_data,
-                geo_data=geo_data,
-                title='Наземная концентрация NO2 по станциям мониторинга',
-                column='GT_NO2',
-                marker='D',
-                markersize=100,
-                cmap='hot'
+        params = {
+            'title': 'Наземная концентрация NO2 по станциям мониторинга',
+            'column': 'GT_NO2',
+            'marker': 'D',
+            'markersize': 100,
+            'cmap': 'hot',
+        }
+        show_figure(
+            figure_cache,
+            chart='maps',
+            params=params,
+            fingerprint=(fingerprint, file_mtime(geodataset_path)),
+            draw=lambda: maps(
+                prov_data=get_geodataset(geodataset_path=geodataset_path),
+                geo_data=get_station_layer(
+                    dataset_path=dataset_path,
+                    columns=config['preprocessing']['eda_columns']),
+                **params
             )
         )
-        st.write("Чем темнее оттенок, тем ниже концентрация (по шкале cmap='hot')")
+        st.write("Средняя концентрация за период. "
+                 "Чем темнее оттенок, тем ниже концентрация (по шкале cmap='hot')")
 
     if daily_temperature:
-        data = get_bins(data=data,
-                        col='LST',
-                        name=config['preprocessing']['bins_columns'][0])
-        st.pyplot(
-            kde_bar_plot(
-                data=data,
-                x=config['preprocessing']['bins_columns'][0],
-                y=config['preprocessing']['target_column'],
-                palette='afmhot_r',
-                title='Суточная температура поверхности'
-            )
+        show_kde_bar_plot(
+            config, figure_cache, fingerprint,
+            feature='LST',
+            palette='afmhot_r',
+            title='Суточная температура поверхности'
         )
         st.write('Чем выше температура на поверхности, тем меньше концентрация оксида азота.')
 
     if aerosol_index:
-        data = get_bins(data=data,
-                        col='AAI',
-                        name=config['preprocessing']['bins_columns'][1])
-        st.pyplot(
-            kde_bar_plot(
-                data=data,
-                x=config['preprocessing']['bins_columns'][1],
-                y=config['preprocessing']['target_column'],
-                palette='Dark2',
-                title='Аэрозольный индекс'
-            )
+        show_kde_bar_plot(
+            config, figure_cache, fingerprint,
+            feature='AAI',
+            palette='Dark2',
+            title='Аэрозольный индекс'
         )
         st.write('При самом низком аэрозольном индексе содержание NO2 наименьшее.')
 
     if cloud_fraction:
-        data = get_bins(data=data,
-                        col='CloudFraction',
-                        name=config['preprocessing']['bins_columns'][2])
-        st.pyplot(
-            kde_bar_plot(
-            data=data,
-            x=config['preprocessing']['bins_columns'][2],
-            y=config['preprocessing']['target_column'],
+        show_kde_bar_plot(
+            config, figure_cache, fingerprint,
+            feature='CloudFraction',
             palette='cool',
             title='Эффективная доля облаков'
-            )
         )
         st.write('Cначала можно увидеть, что чем меньше облачность, тем ниже концентрация оксида азота,'
                  'но далее последовательность нарушается.')
         st.write('Концентрация оксида не зависит от доли доли облаков.')
 
     if tropopause_pressure:
-        data = get_bins(data=data,
-                        col='TropopausePressure',
-                        name=config['preprocessing']['bins_columns'][3])
-        st.pyplot(
-            kde_bar_plot(
-                data=data,
-                x=config['preprocessing']['bins_columns'][3],
-                y=config['preprocessing']['target_column'],
-                palette='rocket',
-                title='Давление в тропопаузе'
-            )
+        show_kde_bar_plot(
+            config, figure_cache, fingerprint,
+            feature='TropopausePressure',
+            palette='rocket',
+            title='Давление в тропопаузе'
         )
         st.write('Чем меньше давление в тропопаузе, тем ниже концентрация NO2.')
 
     if NO2_strat:
-        data = get_bins(data=data,
-                        col='NO2_strat',
-                        name=config['preprocessing']['bins_columns'][4])
-        st.pyplot(
-            barplot(
-                data=data,
-                x=config['preprocessing']['target_column'],
-                y=config['preprocessing']['bins_columns'][4],
-                palette='ocean',
-                title='Концентрация NO2 в стратосфере'
+        params = {'palette': 'ocean', 'title': 'Концентрация NO2 в стратосфере'}
+        endpoint = config['endpoints']['eda_bin_means'].format(feature='NO2_strat')
+        show_figure(
+            figure_cache,
+            chart='barplot',
+            params={**params, 'endpoint': endpoint},
+            fingerprint=fingerprint,
+            draw=lambda: barplot(
+                means=get_chart_data(endpoint=endpoint, dataset_path=dataset_path),
+                **params
             )
         )
         st.write('Поверхностная концентрация оксида азота обратнопропорциональна стратосферной.')
 
     if month_year:
-        st.pyplot(
-            lineplot(
-                data=data,
-                x=config['preprocessing']['drop_columns'][1],
-                y=config['preprocessing']['target_column'],
-                title='Динамика во времени'
+        params = {'title': 'Динамика во времени'}
+        endpoint = config['endpoints']['eda_timeseries']
+        show_figure(
+            figure_cache,
+            chart='lineplot',
+            params={**params, 'endpoint': endpoint},
+            fingerprint=fingerprint,
+            draw=lambda: lineplot(
+                series=get_chart_data(endpoint=endpoint, dataset_path=dataset_path),
+                **params
             )
         )
         st.write('При более высокой температуре концентрация оксида азота ниже, '
                  'следовательно в зимние месяцы концентрация должна быть выше.')
 
 
-
 def training():
     """
     Тренировка модели
@@ -223,9 +259,13 @@ def training():
     with open(CONFIG_PATH) as file:
         config = yaml.load(file, Loader=yaml.FullLoader)
     endpoint = config['endpoints']['train']
+    mode = st.radio(
+        'Режим обучения', ['full', 'incremental'],
+        help='incremental - дообучение текущей модели на новой выгрузке данных'
+    )
 
     if st.button('Start training'):
-        start_training(config=config, endpoint=endpoint)
+        start_training(config=config, endpoint=endpoint, mode=mode)
 
 
 def prediction():
@@ -236,11 +276,11 @@ def prediction():
     with open(CONFIG_PATH) as file:
         config = yaml.load(file, Loader=yaml.FullLoader)
     endpoint = config['endpoints']['prediction_input']
-    unique_data_path = config['preprocessing']['unique_values_path']
+    schema_path = config['preprocessing']['schema_path']
 
     # проверка на наличие сохраненной модели
     if os.path.exists(config['train']['model_path']):
-        evaluate_input(unique_data_path=unique_data_path, endpoint=endpoint)
+        evaluate_input(schema_path=schema_path, endpoint=endpoint)
     else:
         st.error('Сначала обучите модель')
 
@@ -253,16 +293,21 @@ def prediction_from_file():
     with open(CONFIG_PATH) as file:
         config = yaml.load(file, Loader=yaml.FullLoader)
     endpoint = config['endpoints']['prediction_from_file']
+    endpoint_batch = config['endpoints']['prediction_batch']
 
     upload_file = st.file_uploader(
-        'Выберите файл:', type=['csv', 'xlsx'], accept_multiple_files=False
+        'Выберите файл:', type=['csv', 'gz', 'zst', 'parquet', 'feather'],
+        accept_multiple_files=False
     )
     # проверка загружен ли файл
     if upload_file:
-        dataset_csv_df, files = load_data(data=upload_file, type_data='Test')
+        dataset_csv_df, files = load_data(
+            data=upload_file, type_data='Test', nrows=config['evaluate']['preview_rows'])
         # проверка на наличие сохраненной модели
         if os.path.exists(config['train']['model_path']):
-            evaluate_from_file(data=dataset_csv_df, endpoint=endpoint, files=files)
+            evaluate_from_file(
+                data=dataset_csv_df, endpoint=endpoint, files=files, endpoint_batch=endpoint_batch
+            )
         else:
             st.error('Сначала обучите модель')
 
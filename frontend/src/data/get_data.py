@@ -4,49 +4,274 @@
 """
 
 import io
-from io import BytesIO
-from typing import Dict, Tuple
+import os
+import glob
+import gzip
+import json
+from typing import Dict, List, Optional, Tuple
+import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import geopandas as gp
 import streamlit as st
+from ..plotting.charts import data_geo
 
 
-def get_dataset(dataset_path: str) -> pd.DataFrame:
+def file_mtime(path: str) -> int:
     """
-    Получение данных по заданному пути
+    Время изменения файла; у шейп-файла - самое позднее из его частей (.shp, .dbf, ...)
+    :param path: путь до файла
+    :return: mtime (нс)
+    """
+    stem = os.path.splitext(path)[0]
+    return max(os.stat(part).st_mtime_ns for part in glob.glob(f'{glob.escape(stem)}.*'))
+
+
+def resolve_dataset_path(dataset_path: str) -> str:
+    """
+    Путь до датасета: если колоночного файла (.parquet/.feather) еще нет,
+    а рядом лежит исходный csv - читается csv
+    :param dataset_path: путь до данных из конфигурации
+    :return: путь до существующего файла
+    """
+    stem, extension = os.path.splitext(dataset_path)
+    if extension.lower() == '.csv' or os.path.exists(dataset_path):
+        return dataset_path
+    csv_path = f'{stem}.csv'
+    return csv_path if os.path.exists(csv_path) else dataset_path
+
+
+@st.experimental_singleton
+def _read_dataset(
+    dataset_path: str, columns: Optional[Tuple[str, ...]], mtime: int
+) -> pd.DataFrame:
+    """
+    Чтение датасета (csv, parquet, feather); путь, столбцы и mtime - ключ кэша.
+    Один объект на все сессии (без копирования): только для чтения
     :param dataset_path: путь до данных
+    :param columns: какие столбцы прочитать (None - все)
+    :param mtime: время изменения файла
     :return: датасет
     """
-    return pd.read_csv(dataset_path)
+    columns = list(columns) if columns else None
+    extension = os.path.splitext(dataset_path)[1].lower()
+    if extension == '.parquet':
+        return pd.read_parquet(dataset_path, columns=columns)
+    if extension == '.feather':
+        return pd.read_feather(dataset_path, columns=columns)
+    return pd.read_csv(dataset_path, usecols=columns)
+
+
+def get_dataset(dataset_path: str, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Получение данных по заданному пути (кэшируется до изменения файла)
+    :param dataset_path: путь до данных
+    :param columns: какие столбцы прочитать (None - все)
+    :return: датасет
+    """
+    dataset_path = resolve_dataset_path(dataset_path)
+    return _read_dataset(
+        dataset_path, tuple(columns) if columns else None, file_mtime(dataset_path))
+
+
+@st.experimental_memo
+def _read_preview(
+    dataset_path: str, columns: Optional[Tuple[str, ...]], nrows: int, mtime: int
+) -> pd.DataFrame:
+    """
+    Первые строки датасета: у parquet и feather читаются только первые
+    row group / record batch, csv разбирается до nrows строк
+    :param dataset_path: путь до данных
+    :param columns: какие столбцы прочитать (None - все)
+    :param nrows: кол-во строк
+    :param mtime: время изменения файла
+    :return: первые строки датасета
+    """
+    columns = list(columns) if columns else None
+    extension = os.path.splitext(dataset_path)[1].lower()
+    if extension == '.parquet':
+        parquet_file = pq.ParquetFile(dataset_path)
+        schema = parquet_file.schema_arrow
+        batches = parquet_file.iter_batches(batch_size=max(nrows, 1), columns=columns)
+    elif extension == '.feather':
+        reader = pa.ipc.open_file(dataset_path)
+        schema = reader.schema
+        batches = (reader.get_batch(idx) for idx in range(reader.num_record_batches))
+    else:
+        return pd.read_csv(dataset_path, nrows=nrows, usecols=columns)
+
+    head, rows = [], 0
+    while rows < nrows:
+        batch = next(batches, None)
+        if batch is None:
+            break
+        head.append(batch)
+        rows += batch.num_rows
+    table = pa.Table.from_batches(head) if head else schema.empty_table()
+    if columns:
+        table = table.select(columns)
+    return table.slice(0, nrows).to_pandas()
+
+
+def get_preview(dataset_path: str, nrows: int = 5, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Первые строки датасета без чтения всего файла (кэшируется до изменения файла)
+    :param dataset_path: путь до данных
+    :param nrows: кол-во строк
+    :param columns: какие столбцы прочитать (None - все)
+    :return: первые строки датасета
+    """
+    dataset_path = resolve_dataset_path(dataset_path)
+    return _read_preview(
+        dataset_path, tuple(columns) if columns else None, nrows, file_mtime(dataset_path))
+
+
+@st.experimental_singleton
+def _read_geodataset(
+    geodataset_path: str, regions: Optional[Tuple[str, ...]], mtime: int
+) -> gp.GeoDataFrame:
+    """
+    Чтение, перепроецирование и отбор регионов; путь, регионы и mtime - ключ кэша.
+    Один объект на все сессии (без копирования): только для чтения
+    :param geodataset_path: путь до данных
+    :param regions: оставляемые регионы (DEN_REG), None - все
+    :param mtime: время изменения файла
+    :return: геодатасет
+    """
+    geodata = gp.read_file(geodataset_path)
+    if regions:
+        geodata = geodata[geodata['DEN_REG'].isin(regions)]
+    return geodata.to_crs({'init': 'epsg:4326'})
 
 
-def get_geodataset(geodataset_path: str) -> gp.GeoDataFrame:
+def get_geodataset(
+    geodataset_path: str, regions: Tuple[str, ...] = ('Lombardia', 'Veneto')
+) -> gp.GeoDataFrame:
     """
-    Получение геоданных по заданному пути
+    Получение геоданных регионов по заданному пути (кэшируется до изменения файла)
     :param geodataset_path: путь до данных
+    :param regions: оставляемые регионы (DEN_REG), None - все
     :return: геодатасет
     """
-    return gp.read_file(geodataset_path).to_crs({'init':'epsg:4326'})
+    return _read_geodataset(
+        geodataset_path, tuple(regions) if regions else None, file_mtime(geodataset_path))
+
+
+@st.experimental_singleton
+def _read_station_layer(
+    dataset_path: str, columns: Optional[Tuple[str, ...]], mtime: int
+) -> gp.GeoDataFrame:
+    """
+    Слой станций для карт, построенный по датасету; ключ - как у датасета
+    :param dataset_path: путь до данных
+    :param columns: какие столбцы прочитать (None - все)
+    :param mtime: время изменения файла
+    :return: геодатасет станций
+    """
+    return data_geo(data=_read_dataset(dataset_path, columns, mtime))
+
+
+def get_station_layer(dataset_path: str, columns: List[str] = None) -> gp.GeoDataFrame:
+    """
+    Слой станций для карт (кэшируется до изменения файла датасета)
+    :param dataset_path: путь до данных
+    :param columns: какие столбцы прочитать (None - все)
+    :return: геодатасет станций
+    """
+    dataset_path = resolve_dataset_path(dataset_path)
+    return _read_station_layer(
+        dataset_path, tuple(columns) if columns else None, file_mtime(dataset_path))
+
+
+@st.experimental_memo
+def _request_chart_data(endpoint: str, mtime: int) -> dict:
+    """
+    Агрегаты графика с backend; endpoint и mtime датасета - ключ кэша
+    :param endpoint: endpoint агрегатов (/eda/...)
+    :param mtime: время изменения датасета
+    :return: агрегаты
+    """
+    response = requests.get(endpoint, timeout=600)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_chart_data(endpoint: str, dataset_path: str) -> dict:
+    """
+    Агрегаты графика EDA (считаются на backend, запрашиваются заново
+    только после изменения файла датасета)
+    :param endpoint: endpoint агрегатов (/eda/...)
+    :param dataset_path: путь до датасета, по которому считаются агрегаты
+    :return: агрегаты
+    """
+    return _request_chart_data(endpoint, file_mtime(dataset_path))
+
+
+@st.experimental_memo
+def _read_schema(schema_path: str, mtime: int) -> dict:
+    """
+    Чтение схемы признаков; mtime участвует в ключе кэша
+    :param schema_path: путь до схемы
+    :param mtime: время изменения файла
+    :return: схема признаков
+    """
+    with open(schema_path) as file:
+        return json.load(file)
+
+
+def get_schema(schema_path: str) -> dict:
+    """
+    Получение схемы признаков обученной модели (кэшируется до изменения файла)
+    :param schema_path: путь до схемы
+    :return: схема признаков
+    """
+    return _read_schema(schema_path, os.stat(schema_path).st_mtime_ns)
+
+
+def read_preview(content: bytes, nrows: int) -> pd.DataFrame:
+    """
+    Первые строки загруженного файла: csv, parquet или feather, в том числе сжатые
+    gzip/zstd. csv распаковывается и разбирается только до nrows строк
+    :param content: содержимое файла
+    :param nrows: кол-во строк
+    :return: первые строки датасета
+    """
+    stream = io.BytesIO(content)
+    if content[:2] == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream, mode='rb')
+    elif content[:4] == b'\x28\xb5\x2f\xfd':
+        stream = io.BufferedReader(
+            pa.CompressedInputStream(pa.PythonFile(stream, mode='r'), 'zstd'))
+
+    magic = stream.peek(6)[:6] if hasattr(stream, 'peek') else content[:6]
+    if magic[:4] == b'PAR1':
+        return pd.read_parquet(io.BytesIO(stream.read())).head(nrows)
+    if magic == b'ARROW1':
+        return pd.read_feather(io.BytesIO(stream.read())).head(nrows)
+    return pd.read_csv(stream, nrows=nrows)
 
 
 def load_data(
-    data: str, type_data: str
-) -> Tuple[pd.DataFrame, Dict[str, Tuple[str, BytesIO, str]]]:
+    data, type_data: str, nrows: int = 5
+) -> Tuple[pd.DataFrame, Dict[str, Tuple[str, bytes, str]]]:
     """
-    Получение данных и преобразование в тип BytesIO для обработки в streamlit
-    :param data: данные
+    Превью загруженного файла и исходные байты для отправки в сервис:
+    файл не разбирается целиком и не сериализуется заново.
+    Несжатый csv сжимается gzip (сервис распаковывает по сигнатуре)
+    :param data: загруженный файл streamlit
     :param type_data: тип датасета (train/test)
-    :return: датасет, датасет в формате BytesIO
+    :param nrows: кол-во строк превью (столько же размечает /predict)
+    :return: первые строки датасета, файл для запроса
     """
-    dataset = pd.read_csv(data)
+    content = data.getvalue()
+    dataset = read_preview(content, nrows=nrows)
     st.write('Dataset load')
-    st.write(dataset.head())
-
-    dataset_bytes_obj = io.BytesIO()
-    dataset.to_csv(dataset_bytes_obj, index=False)
-    dataset_bytes_obj.seek(0)
+    st.write(dataset)
 
-    files = {
-        'file': (f'{type_data}_dataset.csv', dataset_bytes_obj, 'multipart/form-data')
-    }
+    file_name = data.name or f'{type_data}_dataset.csv'
+    if os.path.splitext(file_name)[1].lower() == '.csv':
+        content = gzip.compress(content, compresslevel=1)
+        file_name = f'{file_name}.gz'
+    files = {'file': (file_name, content, 'application/octet-stream')}
     return dataset, files
\ No newline at end of file
@@ -4,83 +4,106 @@
 Версия: 1.0
 """
 
-from io import BytesIO
+from datetime import date
 import json
 import streamlit as st
 import requests
 import pandas as pd
+from ..data.get_data import get_schema
 
 
-def evaluate_input(unique_data_path: str, endpoint: object) -> None:
+def evaluate_input(schema_path: str, endpoint: object) -> None:
     """
-    Получение входных данных путем ввода в UI -> вывод результатов
-    :param unique_data_path: путь до уникальных значений
+    Получение входных данных путем ввода в UI -> вывод результатов.
+    Вводятся исходные поля наблюдения, новые признаки считает backend
+    :param schema_path: путь до схемы признаков обученной модели
     :param endpoint: endpoint
     :return: None
     """
-    with open(unique_data_path) as file:
-        unique_df = json.load(file)
+    schema = get_schema(schema_path)
+    if 'raw' not in schema:
+        st.error('В схеме нет диапазонов исходных полей - переобучите модель')
+        return
+    numeric = schema['raw']['numeric']
+    dates = schema['raw']['dates']['Date']
 
-    ID = st.sidebar.selectbox('ID станции', unique_df['ID'])
+    ID = st.sidebar.selectbox('ID станции', schema['categories']['ID'])
+    Date = st.sidebar.date_input(
+        'Дата',
+        value=date.fromisoformat(dates['max']),
+        min_value=date.fromisoformat(dates['min']),
+        max_value=date.fromisoformat(dates['max'])
+    )
     LAT = st.sidebar.slider(
         'Широта',
-        min_value=min(unique_df['LAT']),
-        max_value=max(unique_df['LAT'])
+        min_value=numeric['LAT']['min'],
+        max_value=numeric['LAT']['max'],
+        value=numeric['LAT']['q50']
     )
     LON = st.sidebar.slider(
         'Долгота',
-        min_value=min(unique_df['LON']),
-        max_value=max(unique_df['LON'])
+        min_value=numeric['LON']['min'],
+        max_value=numeric['LON']['max'],
+        value=numeric['LON']['q50']
     )
     Precipitation = st.sidebar.slider(
         'Осадки',
-        min_value=min(unique_df['Precipitation']),
-        max_value=max(unique_df['Precipitation'])
+        min_value=numeric['Precipitation']['min'],
+        max_value=numeric['Precipitation']['max'],
+        value=numeric['Precipitation']['q50']
     )
     LST = st.sidebar.slider(
-        'Среднесуточная температура',
-        min_value=min(unique_df['LST']),
-        max_value=max(unique_df['LST'])
+        'Среднесуточная температура (K)',
+        min_value=numeric['LST']['min'],
+        max_value=numeric['LST']['max'],
+        value=numeric['LST']['q50']
     )
     AAI = st.sidebar.slider(
         'Аэрозольный индекс',
-        min_value=min(unique_df['AAI']),
-        max_value=max(unique_df['AAI'])
+        min_value=numeric['AAI']['min'],
+        max_value=numeric['AAI']['max'],
+        value=numeric['AAI']['q50']
     )
     CloudFraction = st.sidebar.slider(
         'Облачность',
-        min_value=min(unique_df['CloudFraction']),
-        max_value=max(unique_df['CloudFraction'])
+        min_value=numeric['CloudFraction']['min'],
+        max_value=numeric['CloudFraction']['max'],
+        value=numeric['CloudFraction']['q50']
     )
-    NO2_strat = st.sidebar.selectbox(
+    # концентрации порядка 1e-5: слайдер с шагом 0.01 для них не подходит
+    NO2_strat = st.sidebar.number_input(
         'NO2_strat',
-        unique_df['NO2_strat']
-        # min_value=min(unique_df['NO2_strat']),
-        # max_value=max(unique_df['NO2_strat'])
+        min_value=numeric['NO2_strat']['min'],
+        max_value=numeric['NO2_strat']['max'],
+        value=numeric['NO2_strat']['q50'],
+        format='%.8f'
     )
+    # поля без диапазона в схеме не вводятся: пропуск в NO2_ratio/Sum_Concentration
+    # backend обрабатывает так же, как пропуск в файле
+    NO2_total = st.sidebar.number_input(
+        'NO2_total',
+        min_value=numeric['NO2_total']['min'],
+        max_value=numeric['NO2_total']['max'],
+        value=numeric['NO2_total']['q50'],
+        format='%.8f'
+    ) if 'NO2_total' in numeric else None
+    NO2_trop = st.sidebar.number_input(
+        'NO2_trop',
+        min_value=numeric['NO2_trop']['min'],
+        max_value=numeric['NO2_trop']['max'],
+        value=numeric['NO2_trop']['q50'],
+        format='%.8f'
+    ) if 'NO2_trop' in numeric else None
     TropopausePressure = st.sidebar.slider(
         'Тропопаузное давление',
-        min_value=min(unique_df['TropopausePressure']),
-        max_value=max(unique_df['TropopausePressure'])
-    )
-    month = st.sidebar.slider(
-        'month', min_value=min(unique_df['month']), max_value=max(unique_df['month'])
-    )
-    year = st.sidebar.slider(
-        'year', min_value=min(unique_df['year']), max_value=max(unique_df['year'])
-    )
-    NO2_ratio = st.sidebar.slider(
-        'NO2_ratio',
-        min_value=min(unique_df['NO2_ratio']),
-        max_value=max(unique_df['NO2_ratio'])
-    )
-    Sum_Concentration = st.sidebar.selectbox(
-        'Суммарная концентрация',
-        unique_df['Sum_Concentration']
+        min_value=numeric['TropopausePressure']['min'],
+        max_value=numeric['TropopausePressure']['max'],
+        value=numeric['TropopausePressure']['q50']
     )
 
     dict_data = {
         'ID': ID,
+        'Date': Date.isoformat(),
         'LAT': LAT,
         'LON': LON,
         'Precipitation': Precipitation,
@@ -88,28 +111,25 @@ def evaluate_input(unique_data_path: str, endpoint: object) -> None:
         'AAI': AAI,
         'CloudFraction': CloudFraction,
         'NO2_strat': NO2_strat,
+        'NO2_total': NO2_total,
+        'NO2_trop': NO2_trop,
         'TropopausePressure': TropopausePressure,
-        'month': month,
-        'year': year,
-        'NO2_ratio': NO2_ratio,
-        'Sum_Concentration': Sum_Concentration
     }
 
     st.write(
         f'''### Данные:\n
     1) ID станции: {dict_data['ID']}
-    2) Широта: {dict_data['LAT']}
-    3) Долгота: {dict_data['LON']}
-    4) Осадки: {dict_data['Precipitation']}
-    5) Среднесуточная температура: {dict_data['LST']}
-    6) Аэрозольный индекс: {dict_data['AAI']}
-    7) Облачность: {dict_data['CloudFraction']}
-    8) NO2_strat: {dict_data['NO2_strat']}
-    9) Тропопаузное давление: {dict_data['TropopausePressure']}
-    10) month: {dict_data['month']}
-    11) year: {dict_data['year']}
-    12) NO2_ratio: {dict_data['NO2_ratio']}
-    13) Суммарная концентрация: {dict_data['Sum_Concentration']}
+    2) Дата: {dict_data['Date']}
+    3) Широта: {dict_data['LAT']}
+    4) Долгота: {dict_data['LON']}
+    5) Осадки: {dict_data['Precipitation']}
+    6) Среднесуточная температура (K): {dict_data['LST']}
+    7) Аэрозольный индекс: {dict_data['AAI']}
+    8) Облачность: {dict_data['CloudFraction']}
+    9) NO2_strat: {dict_data['NO2_strat']}
+    10) NO2_total: {dict_data['NO2_total']}
+    11) NO2_trop: {dict_data['NO2_trop']}
+    12) Тропопаузное давление: {dict_data['TropopausePressure']}
     '''
     )
 
@@ -122,16 +142,29 @@ def evaluate_input(unique_data_path: str, endpoint: object) -> None:
         st.success('Success!')
 
 
-def evaluate_from_file(data: pd.DataFrame, endpoint: object, files: BytesIO):
+def evaluate_from_file(
+    data: pd.DataFrame, endpoint: object, files: dict, endpoint_batch: object = None
+):
     """
     Получение входных данных в качестве файла -> вывод результата в виде таблицы
-    :param data: датасет
+    :param data: первые строки датасета
     :param endpoint: endpoint
-    :param files: формат файла
+    :param files: файл для запроса (исходные байты)
+    :param endpoint_batch: endpoint потокового предсказания по всему файлу
     """
     button_ok = st.button('Predict')
     if button_ok:
-        data_ = data[:5]
         output = requests.post(endpoint, files=files, timeout=8000)
-        data_['predict'] = output.json()['prediction']
-        st.write(data_.head())
\ No newline at end of file
+        prediction = output.json()['prediction']
+        data_ = data[:len(prediction)]
+        data_['predict'] = prediction
+        st.write(data_.head())
+
+    if endpoint_batch and st.button('Predict all'):
+        output = requests.post(
+            endpoint_batch, files=files, params={'output_format': 'csv'}, timeout=8000
+        )
+        st.download_button(
+            'Download predictions', data=output.content,
+            file_name='predictions.csv', mime='text/csv'
+        )
@@ -0,0 +1,195 @@
+"""
+Программа: Дисковый кэш отрисованных графиков (PNG/SVG) с ограничением размера
+Версия: 1.0
+"""
+
+import io
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from typing import Callable, Optional, Union
+import matplotlib
+import matplotlib.pyplot as plt
+import streamlit as st
+
+FORMATS = ('png', 'svg')
+
+
+class FigureCache:
+    """
+    Отрисованные графики на диске: ключ - тип графика, его параметры и отпечаток
+    данных (версии файлов, по которым он построен). Рисунок строится только при
+    промахе; общий размер файлов ограничен max_bytes - вытесняются давно
+    неиспользованные (mtime файла обновляется при каждом попадании)
+    """
+
+    def __init__(
+        self, cache_dir: str, max_bytes: int, image_format: str = 'png', dpi: int = 100
+    ):
+        """
+        :param cache_dir: папка кэша
+        :param max_bytes: максимальный общий размер файлов (байт)
+        :param image_format: png или svg
+        :param dpi: разрешение PNG
+        """
+        if image_format not in FORMATS:
+            raise ValueError(f'Формат {image_format} не поддерживается: {FORMATS}')
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.image_format = image_format
+        self.dpi = dpi
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, chart: str, params: dict, fingerprint: object) -> str:
+        """
+        Канонический ключ графика (порядок параметров не важен)
+        :param chart: тип графика
+        :param params: параметры графика
+        :param fingerprint: отпечаток данных
+        :return: хэш
+        """
+        payload = json.dumps(
+            [chart, params, fingerprint, self.image_format, self.dpi],
+            sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.{self.image_format}')
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Отрисованный график из кэша
+        :param key: ключ
+        :return: байты изображения или None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:  # нет или вытеснен другой сессией
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Запись графика (атомарно: читатели не видят недописанный файл)
+        и вытеснение давно неиспользованных сверх max_bytes
+        :param key: ключ
+        :param data: байты изображения
+        :return: None
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Удаление давно неиспользованных файлов, пока размер кэша больше max_bytes
+        :return: None
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(FORMATS):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def render(self, fig: matplotlib.figure.Figure) -> bytes:
+        """
+        Рисунок в байты изображения; рисунок закрывается
+        :param fig: рисунок
+        :return: байты изображения
+        """
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=self.image_format, dpi=self.dpi, bbox_inches='tight')
+        plt.close(fig)
+        return buffer.getvalue()
+
+    def get_or_render(
+        self,
+        chart: str,
+        params: dict,
+        fingerprint: object,
+        draw: Callable[[], matplotlib.figure.Figure],
+    ) -> bytes:
+        """
+        График из кэша; при промахе - отрисовка и запись в кэш
+        :param chart: тип графика
+        :param params: параметры графика
+        :param fingerprint: отпечаток данных
+        :param draw: построение рисунка (данные загружаются только при промахе)
+        :return: байты изображения
+        """
+        key = self.make_key(chart, params, fingerprint)
+        data = self.get(key)
+        if data is None:
+            data = self.render(draw())
+            self.put(key, data)
+        return data
+
+    def to_image(self, data: bytes) -> Union[bytes, str]:
+        """
+        Изображение для st.image: PNG - байты, SVG - разметка
+        (без XML-пролога: st.image распознает SVG по тегу <svg)
+        :param data: байты изображения
+        :return: изображение
+        """
+        if self.image_format == 'svg':
+            markup = data.decode()
+            return markup[markup.find('<svg'):]
+        return data
+
+
+@st.experimental_singleton
+def get_figure_cache(
+    cache_dir: str, max_mb: float, image_format: str = 'png', dpi: int = 100
+) -> FigureCache:
+    """
+    Кэш графиков, общий для всех сессий
+    :param cache_dir: папка кэша
+    :param max_mb: максимальный размер кэша (МБ)
+    :param image_format: png или svg
+    :param dpi: разрешение PNG
+    :return: кэш
+    """
+    return FigureCache(
+        cache_dir=cache_dir, max_bytes=int(max_mb * 2 ** 20), image_format=image_format, dpi=dpi)
+
+
+def show_figure(
+    figure_cache: FigureCache,
+    chart: str,
+    params: dict,
+    fingerprint: object,
+    draw: Callable[[], matplotlib.figure.Figure],
+) -> None:
+    """
+    Вывод графика на страницу: из кэша, а при изменении данных или параметров -
+    после отрисовки
+    :param figure_cache: кэш графиков
+    :param chart: тип графика
+    :param params: параметры графика
+    :param fingerprint: отпечаток данных
+    :param draw: построение рисунка
+    :return: None
+    """
+    data = figure_cache.get_or_render(chart, params, fingerprint, draw)
+    st.image(figure_cache.to_image(data), use_column_width=True)
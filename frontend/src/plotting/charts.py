@@ -3,129 +3,122 @@
 Версия: 1.0
 """
 
+import numpy as np
 import pandas as pd
 import geopandas as gp
 import matplotlib
 import matplotlib.pyplot as plt
-from shapely.geometry import Point
 import seaborn as sns
 
 
 def kde_bar_plot(
-    data: pd.DataFrame, x: str, y:str, palette: str, title: str
+    kde: dict, means: dict, palette: str, title: str
 ) -> matplotlib.figure.Figure:
     """
-    Отрисовка графиков kdeplot и barplot
-    :param data: датасет
-    :param x: признак для анализа
-    :param y: целевая переменная
+    Отрисовка графиков kdeplot и barplot по агрегатам backend
+    :param kde: плотности целевой переменной по бинам признака (/eda/kde)
+    :param means: средние по бинам с доверительным интервалом (/eda/bin_means)
     :param palette: цвет рисунка
     :param title: название рисунка
     :return: рисунок
     """
     fig, axes = plt.subplots(nrows=2, figsize=(12, 12))
+    colors = sns.color_palette(palette, len(means['bins']))
 
-    sns.kdeplot(data=data, x=y, hue=x, palette=palette, ax=axes[0])
-
-    axes[0].set_xlabel(y)
+    for label, color in zip(means['bins'], colors):
+        if label in kde['density']:
+            axes[0].plot(kde['x'], kde['density'][label], color=color, label=label)
+    axes[0].legend(title=kde['name'])
+    axes[0].set_xlabel(kde['target'])
     axes[0].set_ylabel('Dentsity')
 
-    sns.barplot(y=y, x=x, data=data, palette=palette, ax=axes[1])
-
-    axes[1].set_xlabel(x.split('_')[0])
-    axes[1].set_ylabel(y)
+    mean = np.array(means['mean'])
+    axes[1].bar(
+        means['bins'], mean, color=colors,
+        yerr=[mean - means['ci_low'], np.array(means['ci_high']) - mean])
+    axes[1].set_xlabel(means['name'].split('_')[0])
+    axes[1].set_ylabel(means['target'])
 
     plt.suptitle(title, fontsize=16)
     plt.tight_layout()
     return fig
 
 
-def barplot(
-        data: pd.DataFrame, x: str, y: str, palette: str, title: str
-) -> matplotlib.figure.Figure:
+def barplot(means: dict, palette: str, title: str) -> matplotlib.figure.Figure:
     """
-    Отрисовка графика barplot
-    :param data: датасет
-    :param x: целевая переменая
-    :param y: признак
+    Отрисовка графика barplot по агрегатам backend
+    :param means: средние по бинам с доверительным интервалом (/eda/bin_means)
     :param palette: цвет рисунка
     :param title: название рисунка
     :return: рисунок
     """
     fig = plt.figure(figsize=(15, 7))
-    sns.barplot(x=x,
-                y=y,
-                data=data,
-                palette=palette)
+    mean = np.array(means['mean'])
+    plt.barh(
+        means['bins'], mean, color=sns.color_palette(palette, len(means['bins'])),
+        xerr=[mean - means['ci_low'], np.array(means['ci_high']) - mean])
+    plt.gca().invert_yaxis()
 
     plt.title(title, fontsize=18)
-    plt.xlabel(x, fontsize=14)
-    plt.ylabel(y, fontsize=14)
+    plt.xlabel(means['target'], fontsize=14)
+    plt.ylabel(means['name'], fontsize=14)
     return fig
 
 
-def lineplot(
-        data: pd.DataFrame, x: str, y: str, title: str
-) -> matplotlib.figure.Figure:
+def lineplot(series: dict, title: str) -> matplotlib.figure.Figure:
     """
-    Отрисовка графика lineplot
-    :param data: датасет
-    :param x: признак
-    :param y: целевая переменная
+    Отрисовка графика lineplot по агрегатам backend
+    :param series: средняя целевая переменная по датам (/eda/timeseries)
+    :param title: название рисунка
     :return: рисунок
     """
     fig = plt.figure(figsize=(12, 6))
+    dates = pd.to_datetime(series[series['name']])
 
-    sns.lineplot(x=x, y=y, data=data)
+    plt.plot(dates, series['mean'])
+    plt.fill_between(dates, series['ci_low'], series['ci_high'], alpha=0.2)
 
     plt.xticks(rotation=45, fontsize=5)
-    plt.xlabel(x)
-    plt.ylabel(y)
+    plt.xlabel(series['name'])
+    plt.ylabel(series['target'])
     plt.title(title)
     return fig
 
 
-def get_bins(
-    data: pd.DataFrame, col: str, name: str
-) -> pd.DataFrame:
-    """
-    Функция разделения признака по квартилям
-    для разведочного анализа распределения
-    :param col: название столбца
-    :param name: название нового бинаризованного столбца
-    """
-    bin_min = data[col].describe().loc['min']
-    bin_25 = data[col].describe().loc['25%']
-    bin_50 = data[col].describe().loc['50%']
-    bin_75 = data[col].describe().loc['75%']
-    bin_max = data[col].describe().loc['max']
-
-    data[name] = pd.cut(data[col],
-                      bins=[bin_min, bin_25, bin_50, bin_75, bin_max],
-                      labels=['low', 'middle', 'middle+', 'high'])
-    return data
-
-
 def maps(
     prov_data: gp.GeoDataFrame, geo_data: gp.GeoDataFrame, title: str, color: str = None,
     column: str = None, marker: str = None, markersize: str = None, cmap: str = None
 ) -> matplotlib.figure.Figure:
     """
     Отрисовка карты Италии в Ломбардии и Венето
-    :param prov_data: геодатасет с провинциями
-    :param geo_data: геодатасет с исходными данными
+    :param prov_data: геодатасет с провинциями Ломбардии и Венето
+    :param geo_data: слой станций (data_geo)
     :param title: заголовок
     :return: карта
     """
     fig, ax = plt.subplots(1, figsize=(20, 10))
-    base = prov_data[prov_data['DEN_REG'].isin(['Lombardia', 'Veneto']) == True].plot(ax=ax, color='green')
+    # регионы отобраны при загрузке геоданных (get_geodataset)
+    base = prov_data.plot(ax=ax, color='green')
     geo_data.plot(ax=base, color=color, column=column, marker=marker, markersize=markersize, cmap=cmap)
     ax.set_title(title, fontsize=25)
     return fig
 
-def data_geo(data: pd.DataFrame,) -> gp.GeoDataFrame:
-    geo_data = data.copy()
-    geo_data['coordinates'] = geo_data[['LON', 'LAT']].values.tolist()
-    geo_data['coordinates'] = geo_data['coordinates'].apply(Point)
-    geo_data = gp.GeoDataFrame(geo_data, geometry='coordinates')
-    return geo_data
+
+def data_geo(data: pd.DataFrame, target: str = 'GT_NO2') -> gp.GeoDataFrame:
+    """
+    Слой станций для карт: одна точка на станцию (ID, LAT, LON) со средней,
+    медианой и 90-м перцентилем целевой переменной и кол-вом наблюдений.
+    Размер слоя - кол-во станций, а не наблюдений
+    :param data: датасет
+    :param target: целевая переменная
+    :return: геодатасет станций
+    """
+    grouped = data.groupby(['ID', 'LAT', 'LON'], observed=True, sort=False)[target]
+    stations = grouped.agg(['mean', 'median', 'size']).rename(
+        columns={'mean': target, 'median': f'{target}_median', 'size': 'n_obs'})
+    stations[f'{target}_p90'] = grouped.quantile(0.9)
+    stations = stations.reset_index()
+    return gp.GeoDataFrame(
+        stations,
+        geometry=gp.points_from_xy(stations['LON'], stations['LAT']),
+        crs='EPSG:4326')
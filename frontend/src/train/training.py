@@ -6,17 +6,63 @@
 
 import os
 import json
-import joblib
+import time
+from typing import Optional
+import optuna
 import requests
 import streamlit as st
 from optuna.visualization import plot_optimization_history
 
 
-def start_training(config: dict, endpoint: object) -> None:
+def get_status(status_endpoint: str, job_id: str) -> Optional[dict]:
+    """
+    Статус задачи обучения
+    :param status_endpoint: endpoint статуса задачи (шаблон с {job_id})
+    :param job_id: идентификатор задачи
+    :return: статус задачи или None, если сервис временно не ответил
+    """
+    try:
+        response = requests.get(status_endpoint.format(job_id=job_id), timeout=60)
+    except requests.RequestException:
+        return None
+    if response.status_code == 404:
+        return {'job_id': job_id, 'state': 'not found', 'error': 'задача не найдена'}
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+
+def wait_training(job: dict, status_endpoint: str, poll_interval: float = 2.0) -> dict:
+    """
+    Ожидание завершения задачи обучения с отображением прогресса.
+    Ошибки опроса (перезапуск воркеров сервиса) не прерывают ожидание
+    :param job: статус запущенной задачи
+    :param status_endpoint: endpoint статуса задачи (шаблон с {job_id})
+    :param poll_interval: период опроса статуса (сек)
+    :return: итоговый статус задачи
+    """
+    progress_bar = st.progress(0)
+    progress_text = st.empty()
+    while job['state'] == 'running':
+        time.sleep(poll_interval)
+        status = get_status(status_endpoint, job['job_id'])
+        if status is None:
+            continue
+        job = status
+        if job.get('n_trials'):
+            progress_bar.progress(min(job['trials_done'] / job['n_trials'], 1.0))
+        if job.get('best_mae') is not None:
+            progress_text.write(
+                f'Trials: {job["trials_done"]}, лучшая MAE: {job["best_mae"]:.4f}')
+    return job
+
+
+def start_training(config: dict, endpoint: object, mode: str = 'full') -> None:
     """
     Тренировка модели с выводом результатов
     :param config: конфигурационный файл
     :param endpoint: endpoint
+    :param mode: full - полный цикл, incremental - дообучение на новых данных
     :return: None
     """
     if os.path.exists(config['train']['metrics_path']):
@@ -25,11 +71,29 @@ def start_training(config: dict, endpoint: object) -> None:
     else:
         old_metrics = {'MAE': 0, 'MSE': 0, 'RMSE': 0, 'WAPE': 0}
 
+    output = requests.post(endpoint, params={'mode': mode}, timeout=60)
+    if output.status_code == 409:
+        st.warning('Обучение уже запущено, ожидаем его завершения')
+        job_id = output.json()['detail']['job_id']
+        job = get_status(config['endpoints']['train_status'], job_id) or {
+            'job_id': job_id, 'state': 'running'}
+    elif output.status_code != 202:
+        st.error(f'Обучение не запущено: {output.status_code} {output.text}')
+        return
+    else:
+        job = output.json()
+
     with st.spinner('Модель подбирает параметры'):
-        output = requests.post(endpoint, timeout=8000)
+        job = wait_training(job=job, status_endpoint=config['endpoints']['train_status'])
+
+    if job['state'] != 'finished':
+        st.error(f'Обучение не завершено: {job["state"]} {job.get("error") or ""}')
+        return
     st.success('Succes!')
+    if job['result'] and job['result']['mode'] != mode:
+        st.info(f'Выполнено обучение {job["result"]["mode"]}: {job["result"]["reason"]}')
 
-    new_metrics = output.json()['metrics']
+    new_metrics = job['metrics']
 
     MAE, MSE, RMSE, WAPE = st.columns(4)
     MAE.metric(
@@ -53,7 +117,17 @@ def start_training(config: dict, endpoint: object) -> None:
         f'{new_metrics["WAPE"]-old_metrics["WAPE"]:.4f}'
     )
 
-    study = joblib.load(os.path.join(config['train']['study_path']))
+    # история подбора есть только у полного цикла: study своего набора данных
+    study_name = (job['result'] or {}).get('study_name')
+    if study_name is None:
+        st.info('Параметры не подбирались - истории optuna для этого обучения нет')
+        return
+    try:
+        study = optuna.load_study(
+            study_name=study_name, storage=config['train']['study_storage'])
+    except KeyError:
+        st.warning(f'Study {study_name} не найден в {config["train"]["study_storage"]}')
+        return
     fig_history = plot_optimization_history(study)
 
     st.plotly_chart(fig_history, use_container_width=True)
@@ -0,0 +1,11 @@
+"""
+Программа: Общие настройки тестов frontend
+(запуск: pip install -r requirements-dev.txt && python -m pytest -q из папки frontend)
+Версия: 1.0
+"""
+
+import os
+import sys
+
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FRONTEND_DIR)
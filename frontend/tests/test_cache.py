@@ -0,0 +1,69 @@
+"""
+Программа: Тесты дискового кэша графиков: ключ, промах и попадание,
+вытеснение давно неиспользованных сверх max_bytes
+Версия: 1.0
+"""
+
+import os
+import matplotlib.pyplot as plt
+import pytest
+from src.plotting.cache import FigureCache
+
+
+def set_mtime(cache: FigureCache, key: str, seconds_ago: int) -> None:
+    """
+    Время последнего использования графика
+    """
+    path = cache._path(key)
+    mtime = os.stat(path).st_mtime - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+def test_make_key(tmp_path):
+    cache = FigureCache(str(tmp_path), max_bytes=1000)
+    key = cache.make_key('kde', {'feature': 'LST', 'bins': 4}, {'train': 1})
+    assert key == cache.make_key('kde', {'bins': 4, 'feature': 'LST'}, {'train': 1})
+    assert key != cache.make_key('kde', {'bins': 4, 'feature': 'LST'}, {'train': 2})
+    svg = FigureCache(str(tmp_path), max_bytes=1000, image_format='svg')
+    assert key != svg.make_key('kde', {'bins': 4, 'feature': 'LST'}, {'train': 1})
+
+    with pytest.raises(ValueError):
+        FigureCache(str(tmp_path), max_bytes=1000, image_format='jpg')
+
+
+def test_eviction_lru(tmp_path):
+    cache = FigureCache(str(tmp_path), max_bytes=250)
+    cache.put('a', b'a' * 100)
+    cache.put('b', b'b' * 100)
+    set_mtime(cache, 'a', seconds_ago=20)
+    set_mtime(cache, 'b', seconds_ago=10)
+
+    # попадание обновляет mtime: вытесняется b, а не более старый a
+    assert cache.get('a') == b'a' * 100
+    cache.put('c', b'c' * 100)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert sorted(os.listdir(tmp_path)) == ['a.png', 'c.png']
+
+    # график больше max_bytes не остается в кэше
+    cache.put('d', b'd' * 300)
+    assert cache.get('d') is None
+
+
+def test_get_or_render(tmp_path):
+    cache = FigureCache(str(tmp_path), max_bytes=10 ** 6, image_format='svg')
+    calls = []
+
+    def draw():
+        calls.append(1)
+        fig, ax = plt.subplots(figsize=(2, 2))
+        ax.plot([0, 1], [1, 0])
+        return fig
+
+    data = cache.get_or_render('line', {'x': 1}, 'v1', draw)
+    assert cache.get_or_render('line', {'x': 1}, 'v1', draw) == data
+    assert len(calls) == 1
+    # новая версия данных - новая отрисовка
+    cache.get_or_render('line', {'x': 1}, 'v2', draw)
+    assert len(calls) == 2
+    assert cache.to_image(data).startswith('<svg')
@@ -0,0 +1,75 @@
+"""
+Программа: Тесты превью датасета страницы EDA: читаются только первые строки
+Версия: 1.0
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from src.data.get_data import get_preview
+
+
+@pytest.fixture
+def dataset() -> pd.DataFrame:
+    n_rows = 1000
+    return pd.DataFrame({
+        'ID': pd.Categorical(np.resize(['PD01', 'PD04', 'TV01'], n_rows)),
+        'Date': pd.date_range('2019-01-01', periods=n_rows, freq='D'),
+        'LST': np.arange(n_rows, dtype=np.float32),
+    })
+
+
+@pytest.fixture
+def read_batches(monkeypatch) -> list:
+    """
+    Размеры батчей, прочитанных из parquet; чтение файла целиком запрещено
+    """
+    batches = []
+    parquet_file = pq.ParquetFile
+
+    class ParquetFile(parquet_file):
+        def iter_batches(self, *args, **kwargs):
+            for batch in super().iter_batches(*args, **kwargs):
+                batches.append(batch.num_rows)
+                yield batch
+
+    def read_whole(*args, **kwargs):
+        raise AssertionError('Файл прочитан целиком')
+
+    monkeypatch.setattr(pq, 'ParquetFile', ParquetFile)
+    monkeypatch.setattr(pd, 'read_parquet', read_whole)
+    monkeypatch.setattr(pd, 'read_feather', read_whole)
+    return batches
+
+
+@pytest.mark.parametrize('nrows, batches', [(5, [5]), (250, [100, 100, 50])])
+def test_parquet_preview(tmp_path, dataset, read_batches, nrows, batches):
+    path = str(tmp_path / 'train.parquet')
+    dataset.to_parquet(path, row_group_size=100)
+    preview = get_preview(path, nrows=nrows, columns=['LST', 'ID'])
+    pd.testing.assert_frame_equal(preview, dataset[['LST', 'ID']].head(nrows))
+    # читаются только row group с первыми nrows строками
+    assert read_batches == batches
+
+    preview = get_preview(path, nrows=0, columns=['LST', 'ID'])
+    assert preview.empty and list(preview.columns) == ['LST', 'ID']
+    assert read_batches == batches
+
+
+@pytest.mark.parametrize('nrows', [5, 300, 5000])
+def test_feather_preview(tmp_path, dataset, read_batches, nrows):
+    path = str(tmp_path / 'train.feather')
+    dataset.to_feather(path, chunksize=128)
+    pd.testing.assert_frame_equal(get_preview(path, nrows=nrows), dataset.head(nrows))
+    pd.testing.assert_frame_equal(
+        get_preview(path, nrows=nrows, columns=['LST', 'ID']),
+        dataset[['LST', 'ID']].head(nrows))
+
+
+def test_csv_preview(tmp_path, dataset):
+    # колоночного файла нет - читается csv рядом
+    dataset.to_csv(tmp_path / 'train.csv', index=False)
+    preview = get_preview(str(tmp_path / 'train.parquet'), nrows=5, columns=['ID', 'LST'])
+    pd.testing.assert_frame_equal(
+        preview, pd.read_csv(tmp_path / 'train.csv', usecols=['ID', 'LST']).head(5))